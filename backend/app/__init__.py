@@ -1,12 +1,13 @@
 import os
 import secrets
 import sys
+import time
 import logging
+from contextlib import contextmanager
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_migrate import Migrate
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
 from platformdirs import PlatformDirs
 
 # ====================================
@@ -22,6 +23,39 @@ naming_convention = {
 metadata = MetaData(naming_convention=naming_convention)
 db = SQLAlchemy(metadata=metadata)
 
+
+def listen_once(target, name, fn):
+    """
+    イベントリスナーを登録する。create_app が同一プロセスで複数回呼ばれても
+    （ベンチマークなど）同じリスナーを二重に登録しない。
+    """
+    if not event.contains(target, name, fn):
+        event.listen(target, name, fn)
+
+@contextmanager
+def startup_phase(app, name):
+    """
+    create_app の各段階の所要時間を app.extensions['startup_phases'] に (名前, ミリ秒) で記録する。
+    main.py --profile-startup で表示する。
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        app.extensions.setdefault('startup_phases', []).append((name, elapsed))
+
+
+def init_migrate(app):
+    """
+    Flask-Migrate を登録する（flask db コマンドと flask_migrate.upgrade に必要）。
+    Alembic の import を伴うので、LAZY_MIGRATE=True の場合は必要になるまで呼ばない。
+    """
+    if 'migrate' in app.extensions:
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
 # ====================================
 # OS推奨ディレクトリにDBを配置
 # ====================================
@@ -40,7 +74,7 @@ def get_os_db_path():
 # ====================================
 # Flaskアプリ生成
 # ====================================
-def create_app():
+def create_app(config_overrides=None):
     # ログ設定
     logging.basicConfig(
         level=logging.INFO,
@@ -63,6 +97,13 @@ def create_app():
         template_folder=frontend_dist
     )
 
+    # orjson があれば使う JSON プロバイダ（app.json_provider を参照）
+    from .json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    from .rollup import detect_local_timezone, rollup_cli
+    from .db_tuning import apply_sqlite_pragmas, default_profile_name, resolve_pragmas
+
     # DBパスは OS推奨ディレクトリに強制配置
     db_path = get_os_db_path()
 
@@ -70,8 +111,20 @@ def create_app():
     app.config.from_mapping(
         SECRET_KEY=secrets.token_hex(16),
         SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.abspath(db_path),
-        SQLALCHEMY_TRACK_MODIFICATIONS=False
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # daily_rollup の集計に使うタイムゾーン（IANA名）
+        ROLLUP_TIMEZONE=detect_local_timezone(),
+        # SQLite の PRAGMA プロファイル（app.db_tuning を参照）
+        SQLITE_PROFILE=default_profile_name(),
+        SQLITE_PRAGMAS={},
+        # この大きさ（バイト）以上の JSON レスポンスを gzip / br で圧縮する
+        COMPRESS_MIN_SIZE=1024,
+        # True の場合 Flask-Migrate の登録を遅延する（main.py の起動高速化用、app.schema を参照）
+        LAZY_MIGRATE=False
     )
+    # ベンチマークなどで DB の場所や設定を差し替える場合に使う
+    if config_overrides:
+        app.config.from_mapping(config_overrides)
 
     # instanceフォルダ（Flaskのinstance_path）を作成
     try:
@@ -80,15 +133,48 @@ def create_app():
         pass
 
     # CORSとDBを初期化
-    CORS(app)
-    db.init_app(app)
+    with startup_phase(app, 'database'):
+        CORS(app)
+        db.init_app(app)
+        with app.app_context():
+            apply_sqlite_pragmas(db.engine, resolve_pragmas(app.config))
+
+    with startup_phase(app, 'session listeners'):
+        # 一覧系エンドポイントの ETag 用にテーブルごとの変更を追跡
+        from .versioning import init_versioning
+        init_versioning(db.session)
+
+        # 差分同期用のリビジョン付与
+        from .sync import init_sync
+        init_sync(db.session)
+
+        # アクティビティ・グループ・タグのメタデータキャッシュ
+        from .metadata_cache import init_metadata_cache
+        init_metadata_cache(app, db.session)
+
+        # /api/events で配信する変更通知
+        from .events import init_events
+        init_events(app, db.session)
 
     # Flask-Migrate
-    migrate = Migrate(app, db)
+    if not app.config['LAZY_MIGRATE']:
+        with startup_phase(app, 'flask-migrate'):
+            init_migrate(app)
+
+    # レスポンス圧縮と静的ファイルのキャッシュヘッダ
+    from .compression import init_compression, send_static_asset
+    init_compression(app)
 
     # Blueprint登録
-    from .routes import register_routes
-    register_routes(app)
+    with startup_phase(app, 'blueprints'):
+        from .routes import register_routes
+        register_routes(app)
+
+    # CLIコマンド登録
+    with startup_phase(app, 'cli commands'):
+        app.cli.add_command(rollup_cli)
+        from .record_io import records_cli
+        app.cli.add_command(records_cli)
 
     # エラーハンドラ
     @app.errorhandler(Exception)
@@ -99,6 +185,6 @@ def create_app():
     # ルート
     @app.route("/")
     def index():
-        return app.send_static_file("index.html")
+        return send_static_asset(app, "index.html")
 
     return app
\ No newline at end of file
@@ -0,0 +1,124 @@
+import gzip
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli が無い環境では gzip のみ
+    brotli = None
+
+# ====================================
+# レスポンス圧縮と静的ファイルの配信
+# ====================================
+# JSON レスポンスは COMPRESS_MIN_SIZE バイト以上のとき Accept-Encoding に応じて
+# br（brotli モジュールがある場合）または gzip で圧縮する。
+# 静的ファイルは tools/precompress_static.py で事前に作った .br / .gz があればそれを返し、
+# ファイル名にハッシュを含む Vite のバンドル（assets/ 以下）には長期キャッシュを付ける。
+
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = ('application/json',)
+
+# 事前圧縮ファイルの拡張子（優先順）
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# Vite の既定の出力名 assets/[name]-[hash].[ext]
+HASHED_ASSET_RE = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.\w+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _accepts(encoding):
+    return request.accept_encodings[encoding] > 0
+
+
+def _negotiate_encoding():
+    if brotli is not None and _accepts('br'):
+        return 'br'
+    if _accepts('gzip'):
+        return 'gzip'
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, min_size):
+    """after_request 用。条件を満たす JSON レスポンスの本文を圧縮する。"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    if response.content_length is not None and response.content_length < min_size:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    response.set_data(_compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    # 本文のバイト列が変わるので ETag は弱い比較用にする
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _find_precompressed(static_folder, filename):
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+        if not _accepts(encoding):
+            continue
+        path = safe_join(static_folder, filename + suffix)
+        if path and os.path.isfile(path):
+            return encoding, filename + suffix
+    return None, None
+
+
+def send_static_asset(app, filename):
+    """
+    app.static_folder 以下のファイルを返す。事前圧縮版があればそれを Content-Encoding 付きで返す。
+    """
+    static_folder = app.static_folder
+    encoding, compressed_name = _find_precompressed(static_folder, filename)
+    if encoding:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(static_folder, compressed_name, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(static_folder, filename)
+    response.vary.add('Accept-Encoding')
+
+    if HASHED_ASSET_RE.match(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # index.html などは名前が変わらないので毎回再検証させる
+        response.cache_control.no_cache = True
+    return response
+
+
+def init_compression(app):
+    min_size = app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+
+    @app.after_request
+    def _compress_after_request(response):
+        return compress_response(response, min_size)
+
+    if app.has_static_folder:
+        app.view_functions['static'] = lambda filename: send_static_asset(app, filename)
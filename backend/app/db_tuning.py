@@ -0,0 +1,68 @@
+import os
+from sqlalchemy import event
+
+# ====================================
+# SQLite 接続チューニング
+# ====================================
+# 接続ごとに PRAGMA を発行してジャーナルモードや同期レベルを設定する。
+# プロファイルは app.config['SQLITE_PROFILE']（環境変数 CHRONOLOFT_SQLITE_PROFILE）で選択し、
+# app.config['SQLITE_PRAGMAS'] で個別の値を上書きできる。
+
+SQLITE_PROFILES = {
+    # SQLite の既定値のまま（rollback journal, synchronous=FULL）
+    'default': {},
+    # WAL + synchronous=NORMAL。電源断時に直近のコミットを失う可能性はあるが DB は壊れない
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # 負の値は KiB 単位
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # WAL で読み書きの競合は避けつつ、コミットごとに fsync する
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16 * 1024,
+        'busy_timeout': 5000,
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+# journal_mode は DB ファイルに永続化されるため、最初に設定する
+PRAGMA_ORDER = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store', 'busy_timeout')
+
+
+def default_profile_name():
+    return os.environ.get('CHRONOLOFT_SQLITE_PROFILE') or DEFAULT_PROFILE
+
+
+def resolve_pragmas(config):
+    """app.config からプロファイルと個別上書きを合成した PRAGMA の辞書を返す。"""
+    profile = config.get('SQLITE_PROFILE') or DEFAULT_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """engine の新規接続ごとに pragmas を発行するリスナーを登録する。"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    ordered = sorted(
+        pragmas.items(),
+        key=lambda item: PRAGMA_ORDER.index(item[0]) if item[0] in PRAGMA_ORDER else len(PRAGMA_ORDER)
+    )
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in ordered:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
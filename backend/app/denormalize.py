@@ -0,0 +1,31 @@
+from sqlalchemy import func, select, update
+from . import db
+from .models import Activity, Record
+from .sync import revision_values
+
+# ====================================
+# 非正規化カラムの更新
+# ====================================
+# Activity.last_record_at はレコードの書き込み経路から更新する。
+# 更新・削除で最大値が過去に戻るケースもあるため、差分ではなく
+# (activity_id, created_at) インデックスを使った MAX で都度求め直す。
+
+def refresh_last_record_at(activity_ids):
+    """
+    指定したアクティビティの last_record_at を record の最新 created_at に合わせる。
+    呼び出し元のトランザクション内で実行され、commit は呼び出し元が行う。
+    """
+    activity_ids = {activity_id for activity_id in activity_ids if activity_id is not None}
+    if not activity_ids:
+        return
+    latest = (
+        select(func.max(Record.created_at))
+        .where(Record.activity_id == Activity.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(Activity)
+        .where(Activity.id.in_(activity_ids))
+        .values(last_record_at=latest, **revision_values(db.session))
+        .execution_options(synchronize_session='fetch')
+    )
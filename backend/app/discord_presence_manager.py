@@ -1,19 +1,40 @@
 import atexit
+import collections
 import logging
-import os
+import queue
+import socket
+import sys
+import threading
 import time
 
-from pypresence import Presence
-from pypresence.payloads import Payload
-from pypresence.utils import remove_none
-from pypresence.types import StatusDisplayType
-
-from .models import ActivityGroup
-from . import db
+from .metadata_cache import get_metadata
 
 logger = logging.getLogger(__name__)
-# アプリ全体で常に1つのインスタンスのみを使用するためのグローバル変数
-_instance = None
+
+# pypresence（requirements.txt で 4.6.1 に固定）の公開 API には、IPC ソケットを閉じる手段も
+# 接続が生きているかを確かめる手段も無いため、BaseClient の内部の属性を使う。
+# 属性が見つからない（pypresence の実装が変わった）場合は公開 API だけで動くようにする。
+_IPC_INTERNALS = ('send_data', 'sock_writer', 'loop')
+
+
+def _has_ipc_internals(rpc):
+    return all(hasattr(rpc, name) for name in _IPC_INTERNALS)
+
+
+def _close_rpc(rpc, client_id):
+    """CLOSE を送ってソケットとイベントループを閉じる。"""
+    if not _has_ipc_internals(rpc) or rpc.sock_writer is None:
+        rpc.close()
+        return
+    # Presence.close() は CLOSE を送ってイベントループを閉じるだけなので、ソケットも明示的に閉じる
+    try:
+        rpc.send_data(2, {"v": 1, "client_id": client_id})
+        rpc.sock_writer.close()
+        rpc.loop.run_until_complete(rpc.sock_writer.wait_closed())
+    finally:
+        if not rpc.loop.is_closed():
+            rpc.loop.close()
+
 
 class DiscordRPCManager:
     def __init__(self, client_id):
@@ -24,6 +45,8 @@ class DiscordRPCManager:
     def connect(self):
         if not self.rpc:
             try:
+                # pypresence は起動時ではなく最初に接続するときに import する
+                from pypresence import Presence
                 self.rpc = Presence(self.client_id)
                 self.rpc.connect()
                 self.start_time = time.time()  # 接続成功時に開始時刻を記録
@@ -32,9 +55,13 @@ class DiscordRPCManager:
                 logger.error("Failed to connect to Discord RPC: %s", e)
 
     def update_presence(self, state, large_text, details, large_image, application_name=None):
+        """プレゼンスを更新する。成功したら True を返す。"""
         if self.rpc:
             try:
                 if application_name:
+                    from pypresence.payloads import Payload
+                    from pypresence.types import StatusDisplayType
+                    from pypresence.utils import remove_none
                     payload = Payload.set_activity(
                         state=state,
                         details=details,
@@ -58,34 +85,409 @@ class DiscordRPCManager:
                         large_image=large_image,
                         start=self.start_time,  # 接続開始時刻を利用
                     )
+                return True
             except Exception as e:
                 logger.error("Failed to update Discord RPC: %s", e)
+        return False
 
-    def close(self):
+    def begin_session(self):
+        """経過時間の表示の起点を今にする（接続を使い回して新しいセッションを始めるとき）。"""
+        self.start_time = time.time()
+
+    def clear_presence(self):
+        """接続は維持したままプレゼンスの表示を消す。成功したら True を返す。"""
         if self.rpc:
             try:
                 self.rpc.clear()
+                return True
+            except Exception as e:
+                logger.error("Failed to clear Discord RPC: %s", e)
+        return False
+
+    def close(self):
+        if self.rpc:
+            rpc = self.rpc
+            self.rpc = None
+            try:
+                rpc.clear()
+            except Exception as e:
+                logger.error("Failed to clear Discord RPC: %s", e)
+            try:
+                _close_rpc(rpc, self.client_id)
                 logger.info("Discord RPC disconnected")
             except Exception as e:
                 logger.error("Error while closing Discord RPC: %s", e)
-            finally:
-                self.rpc = None
-    
+
     def is_connected(self):
         """
-        実際に rpc オブジェクトが存在し、連携が切れていないかどうかを確認。
-        「切れていれば」基本的に self.rpc.update() で例外が起き、close()されているはずと判断。
+        IPC ソケットが Discord 側から閉じられていないかを実際に確認する。
+        POSIX ではソケットを MSG_PEEK で覗き、EOF なら切断とみなす（データは消費しない）。
+        ソケットを確認できない pypresence では接続済みとみなす（更新に失敗したら接続し直す）。
+        """
+        if self.rpc is None:
+            return False
+        if not _has_ipc_internals(self.rpc):
+            return True
+        if self.rpc.sock_writer is None:
+            return False
+        writer = self.rpc.sock_writer
+        if writer.is_closing():
+            return False
+        transport_socket = writer.get_extra_info('socket')
+        if sys.platform == 'win32' or transport_socket is None:
+            return True
+        try:
+            with socket.fromfd(transport_socket.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) != b''
+        except BlockingIOError:
+            # 読めるデータが無いだけで接続は生きている
+            return True
+        except OSError:
+            return False
+
+def get_client_id_for_group(group):
+    """グループに設定された Discord の client_id を返す（未設定なら None）。"""
+    activity_group = get_metadata().groups_by_name.get(group)
+    if activity_group and activity_group['client_id']:
+        return activity_group['client_id']
+    print(f"No Discord CLIENT_ID set for group {group}.")
+    return None
+
+
+# ====================================
+# プレゼンス更新用のワーカースレッド
+# ====================================
+# pypresence の IPC 接続は Discord が遅い・起動していない場合に数秒ブロックするため、
+# リクエストのスレッドでは接続・更新を行わず、コマンドをキューに積んですぐに返す。
+# ワーカーはキューに溜まったコマンドをまとめて取り出して最終的な状態だけを適用し（途中の更新は捨てる）、
+# Discord のレート制限（SET_ACTIVITY は 20 秒に 5 回まで）を超える更新は間隔が空くまで待たせる。
+
+RATE_LIMIT_CALLS = 5
+RATE_LIMIT_PERIOD = 20.0
+_SHUTDOWN = object()
+
+
+class RateLimiter:
+    def __init__(self, max_calls=RATE_LIMIT_CALLS, period=RATE_LIMIT_PERIOD, clock=time.monotonic):
+        self.max_calls = max_calls
+        self.period = period
+        self.clock = clock
+        self._calls = collections.deque()
+
+    def delay(self):
+        """次の呼び出しまでに待つべき秒数（すぐ呼べるなら 0）。"""
+        now = self.clock()
+        while self._calls and now - self._calls[0] >= self.period:
+            self._calls.popleft()
+        if len(self._calls) < self.max_calls:
+            return 0.0
+        return self.period - (now - self._calls[0])
+
+    def record(self):
+        self._calls.append(self.clock())
+
+
+# ====================================
+# client_id ごとの IPC 接続プール
+# ====================================
+# グループ（client_id）を切り替えるたびに接続し直すと IPC のハンドシェイクがやり直しになるため、
+# 接続は client_id ごとにプールしておき、使っていない接続は表示を消したうえで保持する。
+# 一定時間使われなかった接続と、上限を超えた分（古いものから）は閉じる。
+
+POOL_MAX_SIZE = 4
+POOL_IDLE_TIMEOUT = 300.0
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+
+class ConnectionPool:
+    def __init__(self, manager_factory=DiscordRPCManager, max_size=POOL_MAX_SIZE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, clock=time.monotonic):
+        self._manager_factory = manager_factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        # client_id -> [manager, 最後に使った時刻]（古い順）
+        self._entries = collections.OrderedDict()
+        self.connects = 0
+        self.reuses = 0
+
+    def acquire(self, client_id):
         """
-        return (self.rpc is not None)
-
-def get_discord_manager_for_group(group):
-    global _instance
-    # 指定された group に該当する ActivityGroup を取得
-    activity_group = ActivityGroup.query.filter_by(name=group).first()
-    if activity_group and activity_group.client_id:
-        if _instance is None or _instance.client_id != activity_group.client_id:
-            _instance = DiscordRPCManager(activity_group.client_id)
-        return _instance
-    else:
-        print(f"No Discord CLIENT_ID set for group {group}.")
+        client_id の接続済みマネージャーを返す。プールに生きている接続があればそれを使い、
+        無ければ新しく接続する。接続できなければ None。
+        """
+        entry = self._entries.get(client_id)
+        if entry is not None:
+            if entry[0].is_connected():
+                entry[1] = self.clock()
+                self._entries.move_to_end(client_id)
+                self.reuses += 1
+                return entry[0]
+            self.discard(client_id)
+
+        manager = self._manager_factory(client_id)
+        manager.connect()
+        self.connects += 1
+        if not manager.is_connected():
+            return None
+        self._entries[client_id] = [manager, self.clock()]
+        while len(self._entries) > self.max_size:
+            _, (oldest, _) = self._entries.popitem(last=False)
+            oldest.close()
+        return manager
+
+    def touch(self, client_id):
+        entry = self._entries.get(client_id)
+        if entry is not None:
+            entry[1] = self.clock()
+
+    def release(self, client_id):
+        """使い終わった接続の表示を消してプールに戻す。"""
+        entry = self._entries.get(client_id)
+        if entry is None:
+            return
+        if entry[0].clear_presence():
+            entry[1] = self.clock()
+        else:
+            self.discard(client_id)
+
+    def discard(self, client_id):
+        entry = self._entries.pop(client_id, None)
+        if entry is not None:
+            entry[0].close()
+
+    def evict_idle(self, in_use=None):
+        """idle_timeout を過ぎた接続を閉じ、次に期限が来るまでの秒数（無ければ None）を返す。"""
+        now = self.clock()
+        next_expiry = None
+        for client_id, (_, last_used) in list(self._entries.items()):
+            if client_id == in_use:
+                continue
+            remaining = self.idle_timeout - (now - last_used)
+            if remaining <= 0:
+                self.discard(client_id)
+            elif next_expiry is None or remaining < next_expiry:
+                next_expiry = remaining
+        return next_expiry
+
+    def close_all(self):
+        for client_id in list(self._entries):
+            self.discard(client_id)
+
+    def stats(self):
+        return {'size': len(self._entries), 'connects': self.connects, 'reuses': self.reuses}
+
+
+class PresenceWorker:
+    """
+    ConnectionPool を専有するバックグラウンドスレッド。
+    start / update / stop はキューに積むだけで、受け付けたかどうかを即座に返す。
+    接続に失敗した場合はセッションが続いている間、間隔を倍々に延ばしながら再接続する。
+    """
+
+    def __init__(self, manager_factory=DiscordRPCManager, rate_limiter=None, pool=None):
+        self._pool = pool or ConnectionPool(manager_factory)
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._commands = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        # リクエスト側から見たセッション（受け付け済みの start / stop を反映）
+        self._active_group = None
+        # ワーカー側の状態
+        self._manager = None
+        self._applied = None
+        self._retry_delay = None
+        self._status = {
+            'state': 'idle',
+            'group': None,
+            'last_error': None,
+            'last_update_at': None,
+            'updates_sent': 0,
+            'coalesced': 0,
+            'throttled': False,
+            'retry_in': None,
+        }
+
+    # ---- リクエストのスレッドから呼ぶ ----
+
+    def start(self, group, client_id, presence):
+        with self._lock:
+            if self._active_group is not None:
+                return False
+            self._active_group = group
+            self._submit(('start', group, client_id, presence))
+        return True
+
+    def update(self, group, presence):
+        with self._lock:
+            if self._active_group != group:
+                return False
+            self._submit(('update', group, None, presence))
+        return True
+
+    def stop(self, group):
+        with self._lock:
+            if self._active_group != group:
+                return False
+            self._active_group = None
+            self._submit(('stop', group, None, None))
+        return True
+
+    def status(self):
+        with self._lock:
+            return dict(
+                self._status,
+                active=self._active_group is not None,
+                active_group=self._active_group,
+                pending=not self._commands.empty(),
+                pool=self._pool.stats(),
+            )
+
+    def shutdown(self, timeout=2.0):
+        if self._thread is None:
+            return
+        self._commands.put(_SHUTDOWN)
+        self._thread.join(timeout)
+
+    def _submit(self, command):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='discord-presence', daemon=True)
+            self._thread.start()
+        self._commands.put(command)
+
+    # ---- ワーカースレッド ----
+
+    def _set_status(self, **values):
+        with self._lock:
+            self._status.update(values)
+
+    def _run(self):
+        desired = None
+        wait = None
+        while True:
+            try:
+                commands = [self._commands.get(timeout=wait)]
+            except queue.Empty:
+                commands = []
+            # 溜まっているコマンドをまとめて取り出し、最後の状態だけを適用する
+            while True:
+                try:
+                    commands.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            if _SHUTDOWN in commands:
+                self._pool.close_all()
+                self._set_status(state='idle', group=None)
+                return
+            for command in commands:
+                previous = desired
+                desired = self._fold(desired, command)
+                if desired is not previous and (desired is None or command[0] == 'start'):
+                    # セッションが変わったら再接続の待ち時間をリセットする
+                    self._retry_delay = None
+            if len(commands) > 1:
+                with self._lock:
+                    self._status['coalesced'] += len(commands) - 1
+            try:
+                wait = self._apply(desired)
+            except Exception as e:
+                logger.error("Discord presence worker failed: %s", e, exc_info=True)
+                self._drop_manager()
+                self._set_status(state='error', last_error=str(e))
+                wait = None
+            idle_expiry = self._pool.evict_idle(in_use=self._manager.client_id if self._manager else None)
+            if idle_expiry is not None and (wait is None or idle_expiry < wait):
+                wait = idle_expiry
+
+    @staticmethod
+    def _fold(desired, command):
+        action, group, client_id, presence = command
+        if action == 'start':
+            return {'group': group, 'client_id': client_id, 'presence': presence, 'new_session': True}
+        if desired is None or desired['group'] != group:
+            return desired
+        if action == 'update':
+            return dict(desired, presence=presence)
         return None
+
+    def _release_manager(self):
+        if self._manager is not None:
+            self._pool.release(self._manager.client_id)
+        self._manager = None
+        self._applied = None
+
+    def _drop_manager(self):
+        if self._manager is not None:
+            self._pool.discard(self._manager.client_id)
+        self._manager = None
+        self._applied = None
+
+    def _retry_later(self, error):
+        """再試行までの待ち秒数を倍々に延ばし（上限 RETRY_MAX_DELAY）、その秒数を返す。"""
+        self._retry_delay = min((self._retry_delay or RETRY_INITIAL_DELAY / 2) * 2, RETRY_MAX_DELAY)
+        self._set_status(state='error', last_error=error, retry_in=self._retry_delay)
+        return self._retry_delay
+
+    def _apply(self, desired):
+        """desired の状態にする。待ってから再試行する必要があれば待ち秒数を返す。"""
+        if desired is None:
+            self._release_manager()
+            self._set_status(state='idle', group=None, throttled=False, retry_in=None)
+            return None
+
+        manager = self._manager
+        if desired.pop('new_session', False) or manager is None or manager.client_id != desired['client_id']:
+            # 別の client_id（または新しいセッション）に切り替える。前の接続は表示を消してプールに戻す
+            self._release_manager()
+            manager = None
+        elif not manager.is_connected():
+            self._drop_manager()
+            manager = None
+
+        if manager is None:
+            self._set_status(state='connecting', group=desired['group'])
+            manager = self._pool.acquire(desired['client_id'])
+            if manager is None:
+                return self._retry_later('Failed to connect to Discord')
+            manager.begin_session()
+            self._manager = manager
+
+        if self._applied == desired['presence']:
+            self._set_status(state='connected', group=desired['group'], throttled=False, retry_in=None)
+            return None
+
+        delay = self._rate_limiter.delay()
+        if delay > 0:
+            self._set_status(throttled=True)
+            return delay
+
+        self._rate_limiter.record()
+        if not manager.update_presence(**desired['presence']):
+            # 接続が切れていた可能性があるので捨てて接続し直す。
+            # 接続できても更新に失敗し続ける場合に備えて、接続の失敗と同じく間隔を延ばしながら再試行する
+            self._drop_manager()
+            return self._retry_later('Failed to update Discord presence')
+        # 更新できるまでは待ち時間をリセットしない（接続だけ成功して更新に失敗するのを繰り返さないため）
+        self._retry_delay = None
+        self._pool.touch(manager.client_id)
+        self._applied = desired['presence']
+        with self._lock:
+            self._status.update(state='connected', group=desired['group'], throttled=False,
+                                retry_in=None, last_update_at=time.time())
+            self._status['updates_sent'] += 1
+        return None
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_presence_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PresenceWorker()
+            # 終了時に Discord 側の表示を消す
+            atexit.register(_worker.shutdown)
+        return _worker
@@ -0,0 +1,153 @@
+import collections
+import enum
+import secrets
+import threading
+
+from flask import current_app
+from sqlalchemy import inspect
+
+from . import listen_once
+from .models import ActiveSession, Activity, ActivityGroup, Record, Tag
+
+# ====================================
+# 変更通知（Server-Sent Events）
+# ====================================
+# レコード・アクティビティ・タグ・グループ・計測中セッションの変更を、
+# commit されたときにイベントとして発行し、/api/events の購読者に配信する。
+# 複数のウィンドウ（webview と外部ブラウザ）が互いの変更を全件の再取得なしに反映できる。
+#
+# ORM を通した書き込みは after_flush で自動的に拾う。Core の insert / delete など
+# ORM を通さない書き込みでは、呼び出し元が record_change() で明示的に積むこと。
+# ロールバックされたトランザクションのイベントは発行しない。
+#
+# イベントIDは "<起動ごとのID>-<連番>"。直近 EVENT_BUFFER_SIZE 件を保持し、
+# 再接続したクライアントが Last-Event-ID で渡したID以降を再送する。
+# 再送できない場合（再起動した、保持件数を超えた）は reset イベントで全件の再取得を促す。
+
+EVENT_BUFFER_SIZE = 1000
+PENDING_KEY = 'pending_events'
+
+TRACKED_MODELS = {
+    Record: 'record',
+    Activity: 'activity',
+    Tag: 'tag',
+    ActivityGroup: 'group',
+    ActiveSession: 'session',
+}
+
+Event = collections.namedtuple('Event', ['seq', 'type', 'action', 'data'])
+
+
+class EventBus:
+    def __init__(self, capacity=EVENT_BUFFER_SIZE):
+        self.boot_id = secrets.token_hex(4)
+        self._events = collections.deque(maxlen=capacity)
+        self._last_seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_seq(self):
+        with self._condition:
+            return self._last_seq
+
+    def publish(self, event_type, action, data):
+        with self._condition:
+            self._last_seq += 1
+            self._events.append(Event(self._last_seq, event_type, action, data))
+            self._condition.notify_all()
+            return self._last_seq
+
+    def format_id(self, seq):
+        return f"{self.boot_id}-{seq}"
+
+    def parse_id(self, value):
+        """クライアントが送ってきたイベントIDを連番に変換する。別の起動のIDや不正な値なら None。"""
+        boot_id, _, seq = (value or '').partition('-')
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _events_after(self, seq):
+        """(seq より後のイベント, 取りこぼしがあるか)。ロックを取った状態で呼ぶ。"""
+        if seq >= self._last_seq:
+            return [], False
+        oldest = self._events[0].seq if self._events else self._last_seq + 1
+        missed = seq + 1 < oldest
+        return [event for event in self._events if event.seq > seq], missed
+
+    def can_resume(self, seq):
+        """seq の次のイベントから欠けずに再送できるか。"""
+        with self._condition:
+            return seq <= self._last_seq and not self._events_after(seq)[1]
+
+    def wait(self, seq, timeout):
+        """seq より後のイベントが来るまで最大 timeout 秒待ち、(イベント, 取りこぼしがあるか) を返す。"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_seq > seq, timeout)
+            return self._events_after(seq)
+
+
+def get_event_bus(app=None):
+    app = app or current_app
+    return app.extensions['event_bus']
+
+
+def _row_data(obj):
+    data = {}
+    for attr in inspect(obj).mapper.column_attrs:
+        value = getattr(obj, attr.key)
+        data[attr.key] = value.value if isinstance(value, enum.Enum) else value
+    return data
+
+
+def record_change(session, event_type, action, data):
+    """
+    commit 時に発行するイベントを積む。同じ行への変更は1つにまとめる
+    （作成→更新は作成、作成→削除は発行しない、更新→削除は削除）。
+    """
+    pending = session.info.setdefault(PENDING_KEY, {})
+    row_id = data.get('id')
+    key = (event_type, row_id) if row_id is not None else (event_type, action, len(pending))
+    previous = pending.get(key)
+    if previous is not None:
+        if previous[0] == 'created' and action == 'deleted':
+            del pending[key]
+            return
+        if previous[0] == 'created':
+            action = 'created'
+    pending[key] = (action, data)
+
+
+def _on_after_flush(session, flush_context):
+    for obj in session.new:
+        event_type = TRACKED_MODELS.get(type(obj))
+        if event_type:
+            record_change(session, event_type, 'created', _row_data(obj))
+    for obj in session.dirty:
+        event_type = TRACKED_MODELS.get(type(obj))
+        if event_type and session.is_modified(obj):
+            record_change(session, event_type, 'updated', _row_data(obj))
+    for obj in session.deleted:
+        event_type = TRACKED_MODELS.get(type(obj))
+        if event_type:
+            record_change(session, event_type, 'deleted', {'id': obj.id})
+
+
+def _on_after_commit(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    bus = get_event_bus()
+    for (event_type, *_), (action, data) in pending.items():
+        bus.publish(event_type, action, data)
+
+
+def _on_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_events(app, session):
+    app.extensions['event_bus'] = EventBus()
+    listen_once(session, 'after_flush', _on_after_flush)
+    listen_once(session, 'after_commit', _on_after_commit)
+    listen_once(session, 'after_rollback', _on_after_rollback)
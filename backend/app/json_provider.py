@@ -0,0 +1,51 @@
+import datetime
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson が無い環境では標準の json を使う
+    orjson = None
+
+# ====================================
+# JSON プロバイダ
+# ====================================
+# orjson がインストールされていればそれでエンコードし、無ければ Flask 標準の json にフォールバックする。
+# どちらの経路でも datetime / date は ISO 8601 文字列になるので、
+# シリアライザは isoformat() を呼ばずに datetime をそのまま渡してよい。
+
+
+def _iso_default(o):
+    if isinstance(o, (datetime.date, datetime.datetime)):
+        return o.isoformat()
+    return _default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_iso_default)
+
+    def _orjson_option(self):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option()).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self._orjson_option()
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        # str を経由せず bytes のままレスポンスにする
+        body = orjson.dumps(obj, default=self.default, option=option | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def json_backend():
+    return 'orjson' if orjson is not None else 'json'
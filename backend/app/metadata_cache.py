@@ -0,0 +1,153 @@
+import threading
+
+from flask import current_app
+
+from . import db, listen_once
+from .models import Activity, ActivityGroup, Tag, activity_tags
+
+# ====================================
+# アクティビティ・グループ・タグのメタデータキャッシュ
+# ====================================
+# 件数が少なく頻繁に参照され、めったに書き換わらないテーブルを、
+# ORM インスタンスではなくプレーンな辞書としてプロセス内に保持する。
+# これらのモデルを変更したトランザクションが commit されたときにだけ破棄し、
+# 次のアクセスで作り直す（Activity.last_record_at は含めないので、レコードの書き込みでは破棄されない）。
+
+CACHED_MODELS = (Activity, ActivityGroup, Tag)
+DIRTY_KEY = 'metadata_dirty'
+
+
+class MetadataSnapshot:
+    """ある時点のメタデータ。各値は読み取り専用として扱うこと。"""
+
+    def __init__(self, activities, groups, tags, tags_by_activity):
+        self.activities = activities
+        self.groups = groups
+        self.groups_by_name = {group['name']: group for group in groups.values()}
+        self.tags = tags
+        self.tags_by_activity = tags_by_activity
+
+    def activity_tags(self, activity_id):
+        return self.tags_by_activity.get(activity_id, [])
+
+    def group_name(self, group_id):
+        group = self.groups.get(group_id)
+        return group['name'] if group else None
+
+
+class MetadataCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = self._snapshot
+            generation = self._generation
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        snapshot = _load_snapshot()
+        with self._lock:
+            # 読み込み中に破棄された場合は保存しない（古い内容を残さないため）
+            if self._generation == generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'cached': self._snapshot is not None,
+            }
+
+
+def _load_snapshot():
+    groups = {}
+    for group in db.session.query(
+        ActivityGroup.id, ActivityGroup.name, ActivityGroup.client_id,
+        ActivityGroup.icon_name, ActivityGroup.icon_color, ActivityGroup.position
+    ):
+        groups[group.id] = {
+            'id': group.id,
+            'name': group.name,
+            'client_id': group.client_id,
+            'icon_name': group.icon_name,
+            'icon_color': group.icon_color,
+            'position': group.position,
+        }
+
+    tags = {}
+    for tag in db.session.query(Tag.id, Tag.name, Tag.color):
+        tags[tag.id] = {'id': tag.id, 'name': tag.name, 'color': tag.color}
+
+    tags_by_activity = {}
+    for activity_id, tag_id in db.session.query(activity_tags.c.activity_id, activity_tags.c.tag_id):
+        if tag_id in tags:
+            tags_by_activity.setdefault(activity_id, []).append(tags[tag_id])
+
+    activities = {}
+    for activity in db.session.query(
+        Activity.id, Activity.name, Activity.is_active, Activity.group_id,
+        Activity.unit, Activity.asset_key, Activity.created_at
+    ):
+        activities[activity.id] = {
+            'id': activity.id,
+            'name': activity.name,
+            'is_active': activity.is_active,
+            'group_id': activity.group_id,
+            'unit': activity.unit.value if activity.unit else None,
+            'asset_key': activity.asset_key,
+            'created_at': activity.created_at.isoformat() if activity.created_at else None,
+        }
+    return MetadataSnapshot(activities, groups, tags, tags_by_activity)
+
+
+def get_metadata_cache(app=None):
+    app = app or current_app
+    return app.extensions['metadata_cache']
+
+
+def get_metadata():
+    """現在のアプリのメタデータスナップショットを返す。"""
+    return get_metadata_cache().snapshot()
+
+
+def _on_after_flush(session, flush_context):
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, CACHED_MODELS):
+            session.info[DIRTY_KEY] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, CACHED_MODELS) and session.is_modified(obj):
+            session.info[DIRTY_KEY] = True
+            return
+
+
+def _on_after_commit(session):
+    if session.info.pop(DIRTY_KEY, False):
+        get_metadata_cache().invalidate()
+
+
+def _on_after_rollback(session):
+    session.info.pop(DIRTY_KEY, None)
+
+
+def init_metadata_cache(app, session):
+    app.extensions['metadata_cache'] = MetadataCache()
+    listen_once(session, 'after_flush', _on_after_flush)
+    listen_once(session, 'after_commit', _on_after_commit)
+    listen_once(session, 'after_rollback', _on_after_rollback)
@@ -5,7 +5,9 @@ import enum
 activity_tags = db.Table(
     'activity_tags',
     db.Column('activity_id', db.Integer, db.ForeignKey('activity.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    # タグからアクティビティを逆引きするためのインデックス
+    db.Index('ix_activity_tags_tag_id', 'tag_id')
 )
 
 class ActivityUnitType(enum.Enum):
@@ -47,6 +49,9 @@ class Activity(db.Model):
         asset_key (str): Discord Developer Portalで設定した画像に対応するアセットキー。
         created_at (datetime): アクティビティ作成日時。デフォルトは現在時刻。
         group_id: アクティビティが所属するグループのID。
+        last_record_at (datetime): 最新レコードの created_at。レコードの書き込み時に更新される非正規化カラム。
+        revision (int): 最後に変更されたときの同期リビジョン。
+        updated_at (datetime): 最終更新日時。
     """
     id = db.Column(db.Integer, primary_key=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
@@ -54,6 +59,9 @@ class Activity(db.Model):
     unit = db.Column(db.Enum(ActivityUnitType), nullable=True)
     asset_key = db.Column(db.String(80))
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    last_record_at = db.Column(db.DateTime, nullable=True, index=True)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
     records = db.relationship('Record', back_populates='activity', lazy=True)
     group_id = db.Column(db.Integer, db.ForeignKey('activity_group.id'), nullable=False)
     group = db.relationship('ActivityGroup', backref='activities')
@@ -75,11 +83,15 @@ class Tag(db.Model):
         id (int): 自動採番される主キー。
         name (str): タグの名称。
         color (str): UI表示などに用いるタグの色。
+        revision (int): 最後に変更されたときの同期リビジョン。
+        updated_at (datetime): 最終更新日時。
     """
     __tablename__ = 'tag'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
     color = db.Column(db.String(50), nullable=True)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
     
     activities = db.relationship(
         "Activity",
@@ -100,14 +112,136 @@ class Record(db.Model):
         activity_id (int): 記録の対象のアクティビティのid(外部キー)。
         value (float): アクティビティの時間または回数を表す実数。
         created_at (datetime): アクティビティ作成日時または開始時刻。デフォルトは現在日時。
+        revision (int): 最後に変更されたときの同期リビジョン。
+        updated_at (datetime): 最終更新日時。
     """
+    __table_args__ = (
+        # アクティビティごとの最新レコード取得・期間指定の絞り込み用
+        db.Index('ix_record_activity_id_created_at', 'activity_id', 'created_at'),
+        db.Index('ix_record_created_at', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     activity_id = db.Column(db.Integer, db.ForeignKey('activity.id'), nullable=False)
     activity = db.relationship('Activity', back_populates='records')
     value = db.Column(db.Float)
     memo = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
 
     def __repr__(self):
         return f"<Record id={self.id}>"
 
+
+class ActiveSession(db.Model):
+    """
+    計測中のストップウォッチ。経過時間はこの行から求め、ブラウザ側では保持しない。
+    slot ごとに1件（main: メインのストップウォッチ、sub: サブストップウォッチ）。
+    停止すると同じトランザクションで Record を書き込み、行は削除される（app.sessions を参照）。
+
+    Attributes:
+        id (int): 自動採番される主キー。
+        slot (str): ストップウォッチの種類（main / sub）。
+        activity_id (int): 計測対象のアクティビティのid(外部キー)。
+        started_at (datetime): 計測の開始時刻。
+        paused_at (datetime): 一時停止した時刻。動作中は None。
+        paused_seconds (float): 再開済みの一時停止の合計秒数。経過時間から除く。
+        memo (str): メモ。
+        updated_at (datetime): 最終更新日時。
+    """
+    __tablename__ = 'active_session'
+    id = db.Column(db.Integer, primary_key=True)
+    slot = db.Column(db.String(20), nullable=False, unique=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activity.id'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    paused_at = db.Column(db.DateTime, nullable=True)
+    paused_seconds = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    memo = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ActiveSession slot={self.slot} activity_id={self.activity_id}>"
+
+
+class DailyRollup(db.Model):
+    """
+    レコードをローカル日付・アクティビティ・単位ごとに集計したマテリアライズドテーブル。
+    レコードの作成・更新・削除時に差分で更新される（app.rollup を参照）。
+
+    Attributes:
+        tz (str): 集計に用いたタイムゾーン（IANA名）。
+        local_date (date): ローカル日付。
+        activity_id (int): 対象アクティビティのid(外部キー)。
+        unit (enum): 集計時点でのアクティビティの記録単位。
+        minutes (float): その日に含まれる経過時間（分）。日跨ぎのレコードは按分される。
+        count (float): 回数単位のレコードの value の合計。
+        record_count (int): その日に終了したレコードの件数。
+    """
+    __tablename__ = 'daily_rollup'
+    tz = db.Column(db.String(64), primary_key=True)
+    local_date = db.Column(db.Date, primary_key=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activity.id'), primary_key=True)
+    unit = db.Column(db.Enum(ActivityUnitType), primary_key=True)
+    minutes = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    count = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    record_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<DailyRollup {self.local_date} activity_id={self.activity_id}>"
+
+
+class RollupState(db.Model):
+    """
+    daily_rollup がどのタイムゾーンで集計されているか（1行のみ）。
+    行が無い場合は daily_rollup をまだ作っていない（または作り直しが必要）ことを表す。
+
+    Attributes:
+        id (int): 常に1。
+        tz (str): daily_rollup を作成・維持しているタイムゾーン（IANA名）。
+        built_at (datetime): 最後に全件を作り直した日時。
+    """
+    __tablename__ = 'rollup_state'
+    id = db.Column(db.Integer, primary_key=True)
+    tz = db.Column(db.String(64), nullable=False)
+    built_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<RollupState tz={self.tz}>"
+
+
+class SyncState(db.Model):
+    """
+    差分同期用のグローバルなリビジョンカウンタ（1行のみ）。
+
+    Attributes:
+        id (int): 常に1。
+        revision (int): 最後に払い出したリビジョン。
+    """
+    __tablename__ = 'sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<SyncState revision={self.revision}>"
+
+
+class Tombstone(db.Model):
+    """
+    削除された行の記録。差分同期でクライアントに削除を伝えるために使う。
+
+    Attributes:
+        id (int): 自動採番される主キー。
+        table_name (str): 削除された行のテーブル名（record, activity, tag）。
+        row_id (int): 削除された行のid。
+        revision (int): 削除時の同期リビジョン。
+        deleted_at (datetime): 削除日時。
+    """
+    __tablename__ = 'tombstone'
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    revision = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Tombstone {self.table_name} id={self.row_id}>"
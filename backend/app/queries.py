@@ -0,0 +1,25 @@
+from sqlalchemy import select
+from . import db
+from .models import Activity, Record
+
+# ====================================
+# 一覧系エンドポイント共通のクエリ
+# ====================================
+# アクティビティ・グループ・タグの情報は app.metadata_cache から引くため、
+# 一覧のクエリは自テーブルの列だけを読む。
+# レコードは件数が多いので ORM インスタンスを作らず、列のタプルとして取得する。
+
+RECORD_COLUMNS = (Record.id, Record.activity_id, Record.value, Record.created_at, Record.memo)
+
+
+def record_list_query():
+    """
+    Record 一覧用の select 文。db.session.execute() の結果の各行は
+    RECORD_COLUMNS の順のタプルで、serializers.serialize_records にそのまま渡せる。
+    """
+    return select(*RECORD_COLUMNS)
+
+
+def activity_list_query():
+    """Activity 一覧用のクエリ。(id, last_record_at) のタプルを返す。"""
+    return db.session.query(Activity.id, Activity.last_record_at)
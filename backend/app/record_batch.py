@@ -0,0 +1,150 @@
+from . import db
+from . import rollup
+from .denormalize import refresh_last_record_at
+from .models import Activity, Record
+from .record_io import parse_datetime, parse_memo, parse_record_value
+
+# ====================================
+# レコードの一括変更
+# ====================================
+# create / update / delete の操作のリストを1つのトランザクションで適用する。
+# 対象のレコードとアクティビティはそれぞれ IN 句の1クエリで読み込み、
+# daily_rollup と last_record_at の更新も最後に1回ずつまとめて行う。
+# 1つでも不正な操作があれば何も書き込まない（BatchError に操作ごとの結果を持たせる）。
+# 関数は呼び出し元のトランザクション内で実行され、commit は呼び出し元が行う。
+
+MAX_OPERATIONS = 1000
+OPERATIONS = ('create', 'update', 'delete')
+RECORD_FIELDS = ('activity_id', 'value', 'created_at', 'memo')
+
+
+class BatchError(Exception):
+    """不正な操作を含むため適用しなかった。results は操作ごとの結果。"""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+def _parse_fields(op):
+    """操作の中のレコードの項目を取り出して型を揃える。不正な値は ValueError。"""
+    values = {}
+    if 'activity_id' in op:
+        values['activity_id'] = int(op['activity_id'])
+    if 'value' in op:
+        values['value'] = parse_record_value(op['value'])
+    if op.get('created_at'):
+        values['created_at'] = parse_datetime(op['created_at'])
+    if 'memo' in op:
+        values['memo'] = parse_memo(op['memo'])
+    return values
+
+
+def _parse_operation(op):
+    """(操作の種類, 対象の id, 項目) を返す。不正な操作は ValueError。"""
+    if not isinstance(op, dict):
+        raise ValueError('each operation must be an object')
+    kind = op.get('op')
+    if kind not in OPERATIONS:
+        raise ValueError(f"op must be one of {', '.join(OPERATIONS)}")
+    record_id = None
+    if kind != 'create':
+        if op.get('id') is None:
+            raise ValueError('id is required')
+        record_id = int(op['id'])
+    values = _parse_fields(op) if kind != 'delete' else {}
+    if kind == 'create' and ('activity_id' not in values or 'value' not in values):
+        raise ValueError('activity_id and value are required')
+    return kind, record_id, values
+
+
+def _rollup_entry(record, units, sign):
+    return (record.created_at, record.value, record.activity_id, units.get(record.activity_id), sign)
+
+
+def apply_batch(operations):
+    """
+    operations を順に適用し、操作ごとの結果 [{index, op, id, status}] を返す。
+    同じレコードへの複数の操作も書いた順に適用する（更新してから削除する、など）。
+    不正な操作があれば BatchError を送出し、何も変更しない。
+    """
+    if not isinstance(operations, list):
+        raise BatchError('operations must be a list', [])
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'Too many operations (max {MAX_OPERATIONS})', [])
+
+    results = []
+    parsed = []
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        try:
+            kind, record_id, values = _parse_operation(op)
+        except (ValueError, TypeError) as e:
+            results.append({'index': index, 'op': kind, 'id': None, 'status': 'error', 'error': str(e)})
+            parsed.append(None)
+            continue
+        results.append({'index': index, 'op': kind, 'id': record_id, 'status': 'pending'})
+        parsed.append((kind, record_id, values))
+
+    # 必要な行だけを IN 句でまとめて読み込む
+    record_ids = {item[1] for item in parsed if item and item[1] is not None}
+    records = {}
+    if record_ids:
+        records = {record.id: record for record in Record.query.filter(Record.id.in_(record_ids))}
+    activity_ids = {item[2]['activity_id'] for item in parsed if item and 'activity_id' in item[2]}
+    activity_ids.update(record.activity_id for record in records.values())
+    units = {}
+    if activity_ids:
+        units = dict(db.session.query(Activity.id, Activity.unit).filter(Activity.id.in_(activity_ids)))
+
+    # 検証（書いた順に、前の操作で削除されたレコードは存在しないものとして扱う）
+    deleted = set()
+    for result, item in zip(results, parsed):
+        if item is None:
+            continue
+        kind, record_id, values = item
+        error = None
+        if record_id is not None and (record_id not in records or record_id in deleted):
+            error = 'Record not found'
+        elif 'activity_id' in values and values['activity_id'] not in units:
+            error = 'Activity not found'
+        if error:
+            result.update(status='error', error=error)
+        elif kind == 'delete':
+            deleted.add(record_id)
+    if any(result['status'] == 'error' for result in results):
+        for result in results:
+            if result['status'] == 'pending':
+                result['status'] = 'skipped'
+        raise BatchError('Batch contains invalid operations; no changes were applied', results)
+
+    # 適用。daily_rollup は変更前の寄与を引き、最後に残ったレコードの寄与を足す
+    rollup_entries = [_rollup_entry(records[record_id], units, -1) for record_id in record_ids]
+    touched_activity_ids = {records[record_id].activity_id for record_id in record_ids}
+    created = []
+    for result, (kind, record_id, values) in zip(results, parsed):
+        if kind == 'create':
+            record = Record(**values)
+            db.session.add(record)
+            created.append((result, record))
+            result['status'] = 'created'
+        elif kind == 'update':
+            record = records[record_id]
+            for field in RECORD_FIELDS:
+                if field in values:
+                    setattr(record, field, values[field])
+            result['status'] = 'updated'
+        else:
+            db.session.delete(records[record_id])
+            result['status'] = 'deleted'
+    db.session.flush()
+
+    for result, record in created:
+        result['id'] = record.id
+    surviving = [record for record_id, record in records.items() if record_id not in deleted]
+    surviving.extend(record for _, record in created)
+    rollup_entries.extend(_rollup_entry(record, units, 1) for record in surviving)
+    touched_activity_ids.update(record.activity_id for record in surviving)
+    rollup.apply_records(rollup_entries)
+    refresh_last_record_at(touched_activity_ids)
+    return results
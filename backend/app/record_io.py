@@ -0,0 +1,300 @@
+import csv
+import datetime
+import io
+import json
+import math
+from collections import defaultdict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import db
+from . import rollup
+from .denormalize import refresh_last_record_at
+from .events import record_change
+from .models import Activity, Record
+from .sync import revision_values
+
+# ====================================
+# レコードの一括インポート
+# ====================================
+# CSV / NDJSON を1行ずつ読み、アクティビティ名→id の辞書で検証してから
+# batch_size 件ごとに executemany で INSERT する。
+# 不正な行はエラーとして記録し、バッチ全体は中断しない。
+# バッチは1つずつ commit するので、途中で DB エラーなどにより中断した場合は、
+# それまでに commit した件数を ImportAborted に持たせて呼び出し元に知らせる。
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_COLUMNS = ('id', 'activity_id', 'activity_name', 'value', 'created_at', 'memo')
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_datetime(value):
+    """
+    ISO 8601 文字列を naive UTC の datetime に変換する。
+    タイムゾーン付きの場合は UTC に変換してから tzinfo を外す（DBは naive UTC で保存している）。
+    JSON から渡された数値など、文字列以外の値は ValueError にする。
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid datetime: {value!r} (expected an ISO 8601 string)")
+    dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class ImportAborted(Exception):
+    """インポートを途中で中断した。summary はそれまでの結果（inserted は commit 済みの件数）。"""
+
+    def __init__(self, message, summary):
+        super().__init__(message)
+        self.summary = summary
+
+
+def parse_record_value(value):
+    """
+    レコードの value を float にする。有限でない値（nan / inf）や、絶対値が rollup.MAX_RECORD_VALUE を
+    超える値は daily_rollup の按分で扱えないので ValueError にする。
+    """
+    number = float(value)
+    if not math.isfinite(number) or abs(number) > rollup.MAX_RECORD_VALUE:
+        raise ValueError(f"value must be a finite number between -{rollup.MAX_RECORD_VALUE} and {rollup.MAX_RECORD_VALUE}")
+    return number
+
+
+def parse_memo(value):
+    """メモは文字列か null。JSON から渡されたオブジェクトや数値は ValueError にする。"""
+    if value is not None and not isinstance(value, str):
+        raise ValueError("memo must be a string or null")
+    return value
+
+
+def _iter_csv_rows(text_stream):
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_ndjson_rows(text_stream):
+    for line_no, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_no, ValueError("each line must be a JSON object")
+            continue
+        yield line_no, row
+
+
+class _ActivityLookup:
+    """アクティビティの id と名前の対応を1度だけ読み込んで保持する。"""
+
+    def __init__(self):
+        self.units = {}
+        self.ids_by_name = defaultdict(list)
+        for activity_id, name, unit in db.session.query(Activity.id, Activity.name, Activity.unit):
+            self.units[activity_id] = unit
+            self.ids_by_name[name].append(activity_id)
+
+    def resolve(self, row):
+        raw_id = row.get('activity_id')
+        if raw_id not in (None, ''):
+            # NDJSON の 1.5 などを int() で黙って切り捨てない
+            if isinstance(raw_id, float) and not raw_id.is_integer():
+                raise ValueError(f"activity_id must be an integer: {raw_id}")
+            activity_id = int(raw_id)
+            if activity_id not in self.units:
+                raise ValueError(f"activity_id {activity_id} does not exist")
+            return activity_id
+        name = row.get('activity_name') or row.get('activity')
+        if not name:
+            raise ValueError("activity_id or activity_name is required")
+        ids = self.ids_by_name.get(name)
+        if not ids:
+            raise ValueError(f"activity '{name}' does not exist")
+        if len(ids) > 1:
+            raise ValueError(f"activity name '{name}' is ambiguous; use activity_id")
+        return ids[0]
+
+
+def _validate_row(row, lookup, now):
+    # NDJSON では任意の JSON 値が来るので、型の誤りも行ごとのエラーとして扱う（INSERT 時に失敗させない）
+    if not isinstance(row, dict):
+        raise ValueError("each row must be an object")
+    activity_id = lookup.resolve(row)
+    if row.get('value') in (None, ''):
+        raise ValueError("value is required")
+    value = parse_record_value(row['value'])
+    created_at = row.get('created_at')
+    return {
+        'activity_id': activity_id,
+        'value': value,
+        'memo': parse_memo(row.get('memo')) or None,
+        'created_at': parse_datetime(created_at) if created_at else now,
+    }
+
+
+def _flush_batch(batch, lookup):
+    revision = revision_values(db.session)
+    db.session.execute(Record.__table__.insert(), [dict(row, **revision) for row in batch])
+    rollup.apply_records(
+        (row['created_at'], row['value'], row['activity_id'], lookup.units[row['activity_id']], 1)
+        for row in batch
+    )
+    activity_ids = {row['activity_id'] for row in batch}
+    refresh_last_record_at(activity_ids)
+    # Core の insert は ORM のイベントで拾えないので、件数だけを通知する（クライアントは取得し直す）
+    record_change(db.session, 'record', 'bulk_imported', {'count': len(batch), 'activity_ids': sorted(activity_ids)})
+    db.session.commit()
+
+
+def import_records(text_stream, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    text_stream から fmt（'csv' または 'ndjson'）のレコードを取り込む。
+    戻り値は {'inserted': 件数, 'error_count': 件数, 'errors': [{'line', 'error'}, ...]}。
+    行ごとの検証以外のエラー（DB エラー、入力の文字コードや CSV の構文の誤り）で中断した場合は
+    ロールバックして ImportAborted を送出する。それより前のバッチは commit 済みで、件数は summary['inserted']。
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    rows = _iter_csv_rows(text_stream) if fmt == 'csv' else _iter_ndjson_rows(text_stream)
+    now = datetime.datetime.utcnow()
+    inserted = 0
+    errors = []
+    error_count = 0
+    batch = []
+
+    try:
+        lookup = _ActivityLookup()
+        for line_no, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append(_validate_row(row, lookup, now))
+            except (ValueError, TypeError) as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_no, 'error': str(e)})
+                continue
+            if len(batch) >= batch_size:
+                _flush_batch(batch, lookup)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            _flush_batch(batch, lookup)
+            inserted += len(batch)
+    except (SQLAlchemyError, UnicodeDecodeError, csv.Error, ValueError, OverflowError) as e:
+        db.session.rollback()
+        summary = {'inserted': inserted, 'error_count': error_count, 'errors': errors}
+        raise ImportAborted(f"Import aborted after {inserted} committed records: {e}", summary) from e
+
+    return {'inserted': inserted, 'error_count': error_count, 'errors': errors}
+
+
+def detect_format(filename=None, mimetype=None):
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    if filename:
+        if filename.endswith('.csv'):
+            return 'csv'
+        if filename.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+    return None
+
+
+# ====================================
+# レコードのストリーミングエクスポート
+# ====================================
+# サーバーサイドカーソル（yield_per）で chunk_size 件ずつ読み、
+# ORM インスタンスを作らずに列タプルから直接 CSV / NDJSON の文字列を生成する。
+# 出力はそのまま import_records で取り込める形式になっている。
+
+def iter_export_chunks(fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """fmt（'csv' または 'ndjson'）で全レコードを chunk_size 件ごとの文字列として返すジェネレータ。"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    stmt = (
+        select(Record.id, Record.activity_id, Activity.name, Record.value, Record.created_at, Record.memo)
+        .join(Activity, Record.activity_id == Activity.id)
+        .order_by(Record.created_at, Record.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = db.session.execute(stmt)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+    for rows in result.partitions():
+        for record_id, activity_id, activity_name, value, created_at, memo in rows:
+            created_at = created_at.isoformat()
+            if writer:
+                writer.writerow((record_id, activity_id, activity_name, value, created_at, memo))
+            else:
+                buffer.write(json.dumps({
+                    'id': record_id,
+                    'activity_id': activity_id,
+                    'activity_name': activity_name,
+                    'value': value,
+                    'created_at': created_at,
+                    'memo': memo,
+                }, ensure_ascii=False))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    chunk = buffer.getvalue()
+    if chunk:
+        yield chunk
+
+
+records_cli = AppGroup('records', help='レコードのインポート・エクスポート。')
+
+
+@records_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='入力形式（省略時は拡張子から判定）')
+@click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, show_default=True)
+def import_command(path, fmt, batch_size):
+    """CSV / NDJSON ファイルからレコードを一括インポートする。"""
+    fmt = fmt or detect_format(filename=path)
+    if fmt is None:
+        raise click.UsageError('Cannot detect format; use --format')
+    with io.open(path, encoding='utf-8-sig', newline='') as f:
+        try:
+            summary = import_records(f, fmt, batch_size)
+        except ImportAborted as e:
+            raise click.ClickException(str(e)) from e
+    click.echo(f"Inserted {summary['inserted']} records, {summary['error_count']} errors")
+    for error in summary['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+
+@records_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='出力形式（省略時は拡張子から判定）')
+def export_command(path, fmt):
+    """全レコードを CSV / NDJSON ファイルにバックアップする。"""
+    fmt = fmt or detect_format(filename=path)
+    if fmt is None:
+        raise click.UsageError('Cannot detect format; use --format')
+    with io.open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in iter_export_chunks(fmt):
+            f.write(chunk)
+    click.echo(f"Exported records to {path}")
@@ -0,0 +1,290 @@
+import datetime
+import logging
+import math
+import os
+from collections import defaultdict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from . import db
+from .models import Activity, ActivityUnitType, DailyRollup, Record, RollupState
+
+# ====================================
+# daily_rollup の差分メンテナンス
+# ====================================
+# レコードの書き込みごとに、そのレコードがどの日付にどれだけ寄与するかを計算し、
+# daily_rollup に加算（削除・更新前の値は減算）する。
+#
+# 集計は rollup_state に記録したタイムゾーン（最後に全件を作り直したときの ROLLUP_TIMEZONE）で維持する。
+# ROLLUP_TIMEZONE は起動ごとに検出し直すので、旅行などで変わっても既存の集計はそのタイムゾーンのまま
+# 差分更新を続け、起動時（main.py）に sync_rollup_timezone で全件を作り直す。
+# 作り直すまでの間、/api/stats は records から直接集計する（GET では書き込まない）。
+
+EPSILON = 1e-9
+# レコードの value の上限（絶対値）。minutes レコードは created_at から value 分さかのぼった期間を日ごとに按分するので、
+# 期間が datetime の範囲を超えたり、1件で膨大な日数の行を作ったりしないようにする（1000万分は約19年）。
+# 書き込み経路では record_io.parse_record_value でこの範囲外の値を拒否する。
+MAX_RECORD_VALUE = 10_000_000
+_MIN_UTC = datetime.datetime(1, 1, 2, tzinfo=datetime.timezone.utc)
+
+
+def _tzlocal_zone_name():
+    """tzlocal で OS のタイムゾーン名を得る（Windows ではレジストリの名前を IANA 名に変換する）。"""
+    try:
+        import tzlocal
+    except ImportError:  # pragma: no cover - tzlocal が無い環境では環境変数と /etc/localtime だけで判定する
+        return None
+    try:
+        return tzlocal.get_localzone_name()
+    except Exception as e:  # 設定が壊れている・対応表に無いなど、判定できない理由は環境によって様々
+        logging.getLogger(__name__).warning("Failed to detect the local timezone with tzlocal: %s", e)
+        return None
+
+
+def detect_local_timezone():
+    """
+    ローカルのタイムゾーン名（IANA）を推定する。
+    フロントエンドはブラウザのタイムゾーンで /api/stats を要求するので、daily_rollup もそれと同じ OS の
+    タイムゾーンで作っておく必要がある（Windows でも UTC にならないよう tzlocal を使う）。
+    環境変数 CHRONOLOFT_TIMEZONE、tzlocal、環境変数 TZ、/etc/localtime のリンク先の順に調べ、
+    分からなければ UTC とする。
+    """
+    for name in (os.environ.get('CHRONOLOFT_TIMEZONE'), _tzlocal_zone_name(), os.environ.get('TZ')):
+        if name:
+            return name
+    try:
+        target = os.path.realpath('/etc/localtime')
+        if 'zoneinfo/' in target:
+            return target.split('zoneinfo/', 1)[1]
+    except OSError:
+        pass
+    return 'UTC'
+
+
+def get_rollup_timezone():
+    name = current_app.config.get('ROLLUP_TIMEZONE') or 'UTC'
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        current_app.logger.warning("Unknown ROLLUP_TIMEZONE %s, falling back to UTC", name)
+        return ZoneInfo('UTC')
+
+
+def record_contributions(created_at, value, unit, tz):
+    """
+    1件のレコードがローカル日付ごとに寄与する (minutes, count, record_count) を返す。
+
+    minutes レコードは created_at（naive UTC）を終了時刻とし、ローカル時刻の0時を跨ぐ場合は
+    各日に按分する（フロントエンドの forEachLocalDayMinuteSegment と同じ扱い）。
+    範囲外の value（検証を入れる前に保存された値など）でも例外にしないよう、
+    有限でない値は 0、大きすぎる値は MAX_RECORD_VALUE として扱う。
+    """
+    result = defaultdict(lambda: [0.0, 0.0, 0])
+    if created_at is None or unit is None:
+        return result
+    value = value or 0
+    if not math.isfinite(value):
+        value = 0
+    # aware datetime の加減算は同一 tzinfo だと壁時計で行われるため、計算は UTC で行う
+    end_utc = created_at.replace(tzinfo=datetime.timezone.utc)
+    end_entry = result[end_utc.astimezone(tz).date()]
+    end_entry[2] += 1
+
+    if unit == ActivityUnitType.COUNT:
+        end_entry[1] += value
+        return result
+
+    minutes = min(value, MAX_RECORD_VALUE)
+    if minutes <= 0:
+        return result
+    try:
+        cursor = max(end_utc - datetime.timedelta(minutes=minutes), _MIN_UTC)
+    except OverflowError:
+        cursor = _MIN_UTC
+    while cursor < end_utc:
+        local_date = cursor.astimezone(tz).date()
+        next_day = datetime.datetime.combine(
+            local_date + datetime.timedelta(days=1), datetime.time(), tzinfo=tz
+        ).astimezone(datetime.timezone.utc)
+        segment_end = next_day if next_day < end_utc else end_utc
+        segment_minutes = (segment_end - cursor).total_seconds() / 60
+        if segment_minutes > 0:
+            result[local_date][0] += segment_minutes
+        cursor = segment_end
+    return result
+
+
+def apply_records(entries):
+    """
+    複数レコードの寄与をまとめて daily_rollup に反映する。
+    entries は (created_at, value, activity_id, unit, sign) の反復可能オブジェクトで、
+    sign=-1 のものは減算される。同じ日付・アクティビティへの寄与は先に合算してから
+    1回の executemany で UPSERT する。
+    呼び出し元のトランザクション内で実行され、commit は呼び出し元が行う。
+    """
+    tz_name = built_timezone_name()
+    if tz_name is None:
+        # まだ作っていない。作り直すときに全件から集計する
+        return
+    tz = ZoneInfo(tz_name)
+    deltas = defaultdict(lambda: [0.0, 0.0, 0])
+    removed_activity_ids = set()
+    for created_at, value, activity_id, unit, sign in entries:
+        if activity_id is None or unit is None:
+            continue
+        if sign < 0:
+            removed_activity_ids.add(activity_id)
+        for local_date, (minutes, count, record_count) in record_contributions(created_at, value, unit, tz).items():
+            entry = deltas[(local_date, activity_id, unit)]
+            entry[0] += sign * minutes
+            entry[1] += sign * count
+            entry[2] += sign * record_count
+    if not deltas:
+        return
+
+    table = DailyRollup.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['tz', 'local_date', 'activity_id', 'unit'],
+        set_={
+            'minutes': table.c.minutes + stmt.excluded.minutes,
+            'count': table.c.count + stmt.excluded.count,
+            'record_count': table.c.record_count + stmt.excluded.record_count,
+        },
+    )
+    db.session.execute(stmt, [
+        {
+            'tz': tz_name,
+            'local_date': local_date,
+            'activity_id': activity_id,
+            'unit': unit,
+            'minutes': minutes,
+            'count': count,
+            'record_count': record_count,
+        }
+        for (local_date, activity_id, unit), (minutes, count, record_count) in deltas.items()
+    ])
+    if removed_activity_ids:
+        # 寄与がなくなった行は削除しておく
+        DailyRollup.query.filter(
+            DailyRollup.tz == tz_name,
+            DailyRollup.activity_id.in_(removed_activity_ids),
+            DailyRollup.record_count <= 0,
+            db.func.abs(DailyRollup.minutes) < EPSILON,
+            db.func.abs(DailyRollup.count) < EPSILON,
+        ).delete(synchronize_session=False)
+
+
+def apply_record(created_at, value, activity_id, unit, sign=1):
+    """レコード1件分の寄与を daily_rollup に加算する（sign=-1 で減算）。"""
+    apply_records([(created_at, value, activity_id, unit, sign)])
+
+
+def _activity_unit(activity_id):
+    if activity_id is None:
+        return None
+    return db.session.query(Activity.unit).filter(Activity.id == activity_id).scalar()
+
+
+def add_record(record):
+    apply_record(record.created_at, record.value, record.activity_id, _activity_unit(record.activity_id), 1)
+
+
+def remove_record(record):
+    apply_record(record.created_at, record.value, record.activity_id, _activity_unit(record.activity_id), -1)
+
+
+def built_timezone_name():
+    """daily_rollup を維持しているタイムゾーン名。まだ作っていなければ None。"""
+    state = db.session.get(RollupState, 1)
+    return state.tz if state is not None else None
+
+
+def rebuild_daily_rollup(activity_id=None):
+    """
+    records から daily_rollup を再構築する。activity_id を指定するとそのアクティビティのみ。
+    差分更新とのずれを修復する場合や、アクティビティの単位を変更した場合に使う。
+    全件の場合は現在の ROLLUP_TIMEZONE で作り直し、rollup_state をそのタイムゾーンにする。
+    アクティビティ単位の場合は rollup_state のタイムゾーンのまま作り直す。
+    """
+    if activity_id is None:
+        tz = get_rollup_timezone()
+    else:
+        tz_name = built_timezone_name()
+        if tz_name is None:
+            return 0
+        tz = ZoneInfo(tz_name)
+    tz_name = str(tz)
+    query = db.session.query(
+        Record.created_at, Record.value, Record.activity_id, Activity.unit
+    ).join(Activity, Record.activity_id == Activity.id)
+    delete_query = DailyRollup.query
+    if activity_id is not None:
+        query = query.filter(Record.activity_id == activity_id)
+        delete_query = delete_query.filter(DailyRollup.activity_id == activity_id)
+    delete_query.delete(synchronize_session=False)
+
+    totals = defaultdict(lambda: [0.0, 0.0, 0])
+    for created_at, value, rec_activity_id, unit in query.yield_per(1000):
+        for local_date, (minutes, count, record_count) in record_contributions(created_at, value, unit, tz).items():
+            entry = totals[(local_date, rec_activity_id, unit)]
+            entry[0] += minutes
+            entry[1] += count
+            entry[2] += record_count
+
+    rows = [
+        {
+            'tz': tz_name,
+            'local_date': local_date,
+            'activity_id': rec_activity_id,
+            'unit': unit,
+            'minutes': minutes,
+            'count': count,
+            'record_count': record_count,
+        }
+        for (local_date, rec_activity_id, unit), (minutes, count, record_count) in totals.items()
+    ]
+    if rows:
+        db.session.execute(DailyRollup.__table__.insert(), rows)
+    if activity_id is None:
+        state = db.session.get(RollupState, 1)
+        if state is None:
+            state = RollupState(id=1, tz=tz_name)
+            db.session.add(state)
+        state.tz = tz_name
+        state.built_at = datetime.datetime.utcnow()
+        db.session.flush()
+    return len(rows)
+
+
+def rollup_available(tz):
+    """指定タイムゾーンの集計が daily_rollup で賄えるかどうか。"""
+    return str(tz) == built_timezone_name()
+
+
+def sync_rollup_timezone():
+    """
+    daily_rollup が現在の ROLLUP_TIMEZONE で作られていなければ、全件を作り直して commit する。
+    作り直した場合は True。起動時に呼ぶ。
+    """
+    if rollup_available(get_rollup_timezone()):
+        return False
+    rebuild_daily_rollup()
+    db.session.commit()
+    return True
+
+
+rollup_cli = AppGroup('rollup', help='daily_rollup テーブルの管理コマンド。')
+
+
+@rollup_cli.command('rebuild')
+@click.option('--activity-id', type=int, default=None, help='対象アクティビティのid（省略時は全件）')
+def rebuild_command(activity_id):
+    """records から daily_rollup を再構築する。"""
+    count = rebuild_daily_rollup(activity_id)
+    db.session.commit()
+    click.echo(f"Rebuilt daily_rollup ({built_timezone_name()}): {count} rows")
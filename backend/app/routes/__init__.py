@@ -4,6 +4,11 @@ from .activity_routes import activity_bp
 from .record_routes import record_bp
 from .discord_routes import discord_bp
 from .tag_routes import tag_bp
+from .stats_routes import stats_bp
+from .sync_routes import sync_bp
+from .system_routes import system_bp
+from .session_routes import session_bp
+from .event_routes import event_bp
 
 def register_routes(app):
     app.register_blueprint(activity_group_bp)
@@ -11,3 +16,8 @@ def register_routes(app):
     app.register_blueprint(record_bp)
     app.register_blueprint(discord_bp)
     app.register_blueprint(tag_bp)
+    app.register_blueprint(stats_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(session_bp)
+    app.register_blueprint(event_bp)
@@ -1,27 +1,21 @@
 from flask import Blueprint, request, jsonify, current_app
 from ..models import ActivityGroup
 from .. import db
+from ..metadata_cache import get_metadata
+from ..versioning import conditional_get
 from sqlalchemy.exc import SQLAlchemyError
 
 activity_group_bp = Blueprint('activity_group', __name__)
 
 @activity_group_bp.route('/api/activity_groups', methods=['GET'])
+@conditional_get('activity_group')
 def get_activity_groups():
     """
     ActivityGroup テーブルの全グループを取得して JSON で返す
     """
     try:
-        groups = ActivityGroup.query.order_by(ActivityGroup.position).all()
-        result = []
-        for group in groups:
-            result.append({
-                'id': group.id,
-                'name': group.name,
-                'client_id': group.client_id,
-                'icon_name': group.icon_name,
-                'icon_color': group.icon_color,
-                'position': group.position
-            })
+        groups = get_metadata().groups.values()
+        result = sorted(groups, key=lambda group: (group['position'], group['id']))
         return jsonify(result), 200
     except SQLAlchemyError as e:
         current_app.logger.error("Error in get_activity_groups: %s", e, exc_info=True)
@@ -1,45 +1,26 @@
 from flask import Blueprint, request, jsonify, current_app
-from ..models import Activity, ActivityUnitType, Record, Tag
+from ..models import Activity, ActivityUnitType, Tag
 from .. import db
+from ..queries import activity_list_query
+from ..metadata_cache import get_metadata
+from ..serializers import serialize_activities
+from ..versioning import conditional_get
+from .. import rollup
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.exc import SQLAlchemyError 
-from sqlalchemy import func, desc
+from sqlalchemy import inspect
 
 activity_bp = Blueprint('activity', __name__)
 
 @activity_bp.route('/api/activities', methods=['GET'])
+@conditional_get('activity', 'tag', 'activity_group')
 def get_activities():
     try:
-        # Activity と Record を外部結合して、各 Activity に対して最新の Record.created_at を取得
-        query = db.session.query(
-            Activity,
-            func.max(Record.created_at).label('last_record')
-        ).outerjoin(Record).group_by(Activity.id).order_by(desc('last_record'))
-        
-        activities_with_last = query.all()
+        # 最新レコード日時は Activity.last_record_at に非正規化してあるので、activity テーブルだけで並べ替える
+        activities = activity_list_query().order_by(Activity.last_record_at.desc()).all()
 
-        result = []
-        for activity, last_record in activities_with_last:
-            tag_list = []
-            for t in activity.tags:
-                tag_list.append({
-                    'id': t.id,
-                    'name': t.name,
-                    'color': t.color
-                })
-            result.append({
-                'id': activity.id,
-                'name': activity.name,
-                'tags': tag_list,  # ここで付与
-                'is_active': activity.is_active,
-                'group_id': activity.group_id,
-                'group_name': activity.group.name if activity.group else None,
-                'unit': activity.unit.value if activity.unit else None,
-                'asset_key': activity.asset_key,
-                'created_at': activity.created_at.isoformat(),
-                'last_record': last_record.isoformat() if last_record else None,
-            })
-        return jsonify(result), 200
+        metadata = get_metadata()
+        return jsonify(serialize_activities(activities, metadata)), 200
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -90,6 +71,7 @@ def update_activity(activity_id):
         activity.group_id = data['group_id']
     if 'asset_key' in data:
         activity.asset_key = data['asset_key']
+    unit_changed = False
     if 'unit' in data:
         unit_value = data['unit']
         if unit_value is None:
@@ -99,10 +81,14 @@ def update_activity(activity_id):
                 activity.unit = ActivityUnitType(unit_value)
             except ValueError:
                 return jsonify({'error': 'unit の値が不正です'}), 400
+        unit_changed = inspect(activity).attrs.unit.history.has_changes()
     if 'is_active' in data:
         activity.is_active = data['is_active']
 
     try:
+        if unit_changed:
+            # 単位が変わると集計の寄与が変わるため、このアクティビティ分を作り直す
+            rollup.rebuild_daily_rollup(activity.id)
         db.session.commit()
         return jsonify({'message': 'Activity updated'})
     except SQLAlchemyError as e:
@@ -1,40 +1,47 @@
-from flask import Blueprint, request, jsonify, current_app
-from ..discord_presence_manager import get_discord_manager_for_group
-import os
+from flask import Blueprint, request, jsonify
+from ..discord_presence_manager import get_client_id_for_group, get_presence_worker
+from ..events import get_event_bus
 
 discord_bp = Blueprint('discord', __name__)
 
-DISCORD_MANAGERS = {}
+# Discord との通信はワーカースレッド（discord_presence_manager.PresenceWorker）が行う。
+# 各エンドポイントはコマンドを受け付けたら 202 を返し、結果は /api/discord_presence/status で確認する。
+
+
+def _presence_from_request(data, group):
+    activity_name = data.get('activity_name')
+    return {
+        'state': group,
+        'large_text': activity_name,
+        'details': data.get('details'),
+        'large_image': data.get('asset_key') or "default_image",
+        'application_name': activity_name,
+    }
+
+
+def _publish(action, group, data=None):
+    """他のウィンドウに Discord 連携の開始・更新・停止を通知する（DB を介さないので直接発行する）。"""
+    data = data or {}
+    get_event_bus().publish('presence', action, {
+        'group': group,
+        'activity_name': data.get('activity_name'),
+        'details': data.get('details'),
+    })
+
 
 @discord_bp.route('/api/discord_presence/start', methods=['POST'])
 def discord_presence_start():
     data = request.get_json()
-    # 必要な情報（group, activity_name, details, asset_key）を取得
     group = data.get('group')
-    activity_name = data.get('activity_name')
-    details = data.get('details')
-    asset_key = data.get('asset_key') or "default_image"
-    # すでに接続が存在していたら重複して開始しない
-    for grp, mgr in DISCORD_MANAGERS.items():
-        if mgr.is_connected():
-            return jsonify({'error': 'Another Discord session is active, cannot start a new one'}), 400
-    manager = get_discord_manager_for_group(group)
-    if not manager:
+    client_id = get_client_id_for_group(group)
+    if not client_id:
         return jsonify({'error': f'No CLIENT_ID for group {group}'}), 400
-    try:
-        manager.connect()
-        manager.update_presence(
-            state=group,
-            large_text=activity_name,
-            details=details,
-            large_image=asset_key,
-            application_name=activity_name
-        )
-        DISCORD_MANAGERS[group] = manager
-        return jsonify({'message': 'Discord presence started'}), 200
-    except Exception as e:
-        current_app.logger.error("Error in discord_presence: %s", e, exc_info=True)
-        return jsonify({'error': str(e)}), 500
+    worker = get_presence_worker()
+    # すでに接続が存在していたら重複して開始しない
+    if not worker.start(group, client_id, _presence_from_request(data, group)):
+        return jsonify({'error': 'Another Discord session is active, cannot start a new one'}), 400
+    _publish('started', group, data)
+    return jsonify({'message': 'Discord presence start queued', 'status': worker.status()}), 202
 
 @discord_bp.route('/api/discord_presence/stop', methods=['POST'])
 def discord_presence_stop():
@@ -43,49 +50,29 @@ def discord_presence_stop():
     if not group:
         return jsonify({'error': 'Group is required'}), 400
 
-    manager = DISCORD_MANAGERS.get(group)
-    if manager:
-        try:
-            manager.close()
-            del DISCORD_MANAGERS[group]
-            return jsonify({'message': 'Discord presence stopped'}), 200
-        except Exception as e:
-            current_app.logger.error("Error in discord_presence: %s", e, exc_info=True)
-            return jsonify({'error': str(e)}), 500
-    return jsonify({'error': 'No manager found'}), 400
+    worker = get_presence_worker()
+    if not worker.stop(group):
+        return jsonify({'error': 'No manager found'}), 400
+    _publish('stopped', group)
+    return jsonify({'message': 'Discord presence stop queued', 'status': worker.status()}), 202
 
 @discord_bp.route('/api/discord_presence/status', methods=['GET'])
 def discord_presence_status():
     """
-    現在Discordに接続中かどうかを返す簡易エンドポイント。
-    全Groupを走査し、どこか is_connected=True があれば connected=True。
+    Discord 連携の状態を返す。
+    active はセッションが開始されているか（ワーカーの接続処理中も含む）、
+    state はワーカーの実際の状態（idle / connecting / connected / error）、
+    connected は state が connected か（Discord と実際に接続できているか）。
     """
-    for mgr in DISCORD_MANAGERS.values():
-        if mgr.is_connected():
-            return jsonify({'connected': True})
-    return jsonify({'connected': False})
+    status = get_presence_worker().status()
+    return jsonify(dict(status, connected=status['state'] == 'connected'))
 
 @discord_bp.route('/api/discord_presence/update', methods=['POST'])
 def discord_presence_update():
     data = request.get_json()
     group = data.get('group')
-    activity_name = data.get('activity_name')
-    details = data.get('details')
-    asset_key = data.get('asset_key') or "default_image"
-
-    mgr = DISCORD_MANAGERS.get(group)
-    if not mgr or not mgr.is_connected():
+    worker = get_presence_worker()
+    if not worker.update(group, _presence_from_request(data, group)):
         return jsonify({'error': 'No active Discord session'}), 400
-
-    try:
-        mgr.update_presence(
-            state=group,
-            large_text=activity_name,
-            details=details,
-            large_image=asset_key,
-            application_name=activity_name
-        )
-        return jsonify({'message': 'Discord presence updated'}), 200
-    except Exception as e:
-        current_app.logger.error("Update failed: %s", e, exc_info=True)
-        return jsonify({'error': str(e)}), 500
+    _publish('updated', group, data)
+    return jsonify({'message': 'Discord presence update queued', 'status': worker.status()}), 202
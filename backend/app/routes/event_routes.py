@@ -0,0 +1,74 @@
+import time
+
+from flask import Blueprint, Response, current_app, request
+from ..events import get_event_bus
+
+event_bp = Blueprint('event', __name__)
+
+# GET /api/events: 変更通知の Server-Sent Events ストリーム（app.events を参照）
+#
+# 各イベントは "event: <record|activity|tag|group|session|presence>" と
+# "data: {type, action, data}" の組で、action は created / updated / deleted など。
+# 接続直後に ready イベント（現在位置のID）を送るので、EventSource は切断されても
+# Last-Event-ID ヘッダでその続きから受け取れる（?last_event_id= でも指定できる）。
+# 続きを再送できない場合は reset イベントを送るので、クライアントは一覧を取得し直すこと。
+#
+# 接続は waitress のワーカースレッドを1つ占有するので、STREAM_MAX_SECONDS で一旦閉じ、
+# EventSource の自動再接続（retry ミリ秒後）に任せる。
+
+KEEPALIVE_SECONDS = 15
+STREAM_MAX_SECONDS = 300
+RETRY_MILLISECONDS = 3000
+
+
+def _frame(event_id, event_type, payload):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+def _stream(bus, dumps, seq, reset):
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    if reset:
+        yield _frame(bus.format_id(seq), 'reset', dumps({'type': 'reset'}))
+    else:
+        yield _frame(bus.format_id(seq), 'ready', dumps({'type': 'ready'}))
+
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, missed = bus.wait(seq, min(KEEPALIVE_SECONDS, remaining))
+        if missed:
+            # 待っている間に保持件数を超えた
+            seq = bus.last_seq
+            yield _frame(bus.format_id(seq), 'reset', dumps({'type': 'reset'}))
+            continue
+        if not events:
+            # プロキシやブラウザに切断されないよう、コメント行を送る
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            seq = event.seq
+            payload = dumps({'type': event.type, 'action': event.action, 'data': event.data})
+            yield _frame(bus.format_id(seq), event.type, payload)
+
+
+@event_bp.route('/api/events', methods=['GET'])
+def get_events():
+    bus = get_event_bus()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    seq = bus.last_seq
+    reset = False
+    if last_event_id:
+        resume_seq = bus.parse_id(last_event_id)
+        if resume_seq is not None and bus.can_resume(resume_seq):
+            seq = resume_seq
+        else:
+            # サーバーが再起動した（別の起動のID）か、保持件数を超えて取りこぼした
+            reset = True
+
+    # ストリームはリクエストのコンテキストの外で生成されるので、必要なものは先に取り出しておく
+    response = Response(_stream(bus, current_app.json.dumps, seq, reset), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
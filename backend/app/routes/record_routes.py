@@ -1,37 +1,113 @@
-from flask import Blueprint, request, jsonify, current_app
+import base64
+import binascii
+import datetime
+import io
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
-from ..models import Record
+from ..models import Activity, Record, activity_tags
+from ..queries import record_list_query
+from ..metadata_cache import get_metadata
+from ..serializers import serialize_records, serialize_records_columnar
+from ..versioning import conditional_get
 from .. import db
+from .. import rollup
+from ..denormalize import refresh_last_record_at
+from ..record_batch import BatchError, apply_batch
+from ..record_io import (
+    DEFAULT_BATCH_SIZE, EXPORT_MIMETYPES, ImportAborted, detect_format, import_records, iter_export_chunks, parse_datetime,
+    parse_record_value
+)
 
 record_bp = Blueprint('record', __name__)
 
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+LIST_FORMATS = ('rows', 'columnar')
+
+
+def _encode_cursor(created_at, record_id):
+    raw = f"{created_at.isoformat()}|{record_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    created_at, record_id = raw.rsplit('|', 1)
+    return datetime.datetime.fromisoformat(created_at), int(record_id)
+
+
+def _build_record_query(args):
+    """
+    クエリパラメータ（from, to, activity_id, group_id, tag_id）から絞り込み済みのクエリを組み立てる。
+    不正な値の場合は ValueError を送出する。
+    """
+    query = record_list_query()
+    if args.get('from'):
+        query = query.filter(Record.created_at >= parse_datetime(args['from']))
+    if args.get('to'):
+        query = query.filter(Record.created_at < parse_datetime(args['to']))
+    if args.get('activity_id'):
+        query = query.filter(Record.activity_id == int(args['activity_id']))
+    if args.get('group_id'):
+        query = query.join(Activity, Record.activity_id == Activity.id).filter(
+            Activity.group_id == int(args['group_id'])
+        )
+    if args.get('tag_id'):
+        tagged_activity_ids = db.session.query(activity_tags.c.activity_id).filter(
+            activity_tags.c.tag_id == int(args['tag_id'])
+        )
+        query = query.filter(Record.activity_id.in_(tagged_activity_ids))
+    return query
+
+
 # GET /api/records: レコード一覧の取得
+# (created_at, id) の降順でキーセットページングする。
+# ?all=1 を指定した場合は従来どおり全件を配列で返す。
+# ?format=columnar を指定すると列指向形式（serializers.serialize_records_columnar）で返す。
 @record_bp.route('/api/records', methods=['GET'])
+@conditional_get('record', 'activity', 'tag', 'activity_group')
 def get_records():
+    args = request.args
+    try:
+        query = _build_record_query(args)
+        fetch_all = args.get('all') in ('1', 'true')
+        list_format = args.get('format', 'rows')
+        if list_format not in LIST_FORMATS:
+            raise ValueError(f'format must be one of {", ".join(LIST_FORMATS)}')
+        limit = min(int(args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError('limit must be positive')
+        if args.get('cursor'):
+            cursor_created_at, cursor_id = _decode_cursor(args['cursor'])
+            query = query.filter(or_(
+                Record.created_at < cursor_created_at,
+                and_(Record.created_at == cursor_created_at, Record.id < cursor_id)
+            ))
+    except (ValueError, binascii.Error) as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
     try:
-        records = Record.query.all()
-        result = []
-        for rec in records:
-            tag_list = []
-            if rec.activity and rec.activity.tags:
-                tag_list = [{
-                    "id": t.id,
-                    "name": t.name,
-                    "color": t.color
-                } for t in rec.activity.tags]
-            result.append({
-                'id': rec.id,
-                'activity_id': rec.activity_id,
-                'value': rec.value,
-                'created_at': rec.created_at.isoformat(),
-                'unit': rec.activity.unit.value if rec.activity and rec.activity.unit else None,
-                'activity_name': rec.activity.name if rec.activity else None,
-                'activity_group': rec.activity.group.name if rec.activity and rec.activity.group else None,
-                'activity_group_id': rec.activity.group_id if rec.activity else None,
-                'tags': tag_list,
-                'memo': rec.memo
-            })
-        return jsonify(result), 200
+        metadata = get_metadata()
+        if fetch_all:
+            rows = db.session.execute(query)
+            if list_format == 'columnar':
+                return jsonify(serialize_records_columnar(rows, metadata)), 200
+            return jsonify(serialize_records(rows, metadata)), 200
+
+        # 1件多く取得して次ページの有無を判定する
+        query = query.order_by(Record.created_at.desc(), Record.id.desc()).limit(limit + 1)
+        records = db.session.execute(query).all()
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = _encode_cursor(records[-1].created_at, records[-1].id)
+        if list_format == 'columnar':
+            return jsonify(dict(serialize_records_columnar(records, metadata), next_cursor=next_cursor)), 200
+        return jsonify({
+            'records': serialize_records(records, metadata),
+            'next_cursor': next_cursor
+        }), 200
     except SQLAlchemyError as e:
         current_app.logger.error("Error in get_records: %s", e, exc_info=True)
         db.session.rollback()
@@ -43,19 +119,26 @@ def create_record():
     # 必要なフィールドが存在するか確認
     if not data or 'activity_id' not in data or 'value' not in data:
         return jsonify({'error': 'activity_id と value は必須です'}), 400
+    # daily_rollup の按分で扱えない値は書き込む前に拒否する
+    try:
+        value = parse_record_value(data['value'])
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
         record_kwargs = {
             'activity_id': data['activity_id'],
-            'value': data['value'],
+            'value': value,
             'memo': data.get('memo')
         }
         if 'created_at' in data:
-            import datetime
             record_kwargs['created_at'] = datetime.datetime.fromisoformat(data['created_at'])
 
         new_record = Record(**record_kwargs)
         db.session.add(new_record)
+        db.session.flush()
+        rollup.add_record(new_record)
+        refresh_last_record_at([new_record.activity_id])
         db.session.commit()
         return jsonify({'message': 'Record created', 'id': new_record.id}), 201
     except SQLAlchemyError as e:
@@ -72,18 +155,26 @@ def update_record(record_id):
     record = Record.query.get(record_id)
     if record is None:
         return jsonify({'error': 'Record not found'}), 404
+    if 'value' in data:
+        try:
+            value = parse_record_value(data['value'])
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
 
     try:
+        old_activity_id = record.activity_id
+        rollup.remove_record(record)
         if 'activity_id' in data:
             record.activity_id = data['activity_id']
         if 'value' in data:
-            record.value = data['value']
+            record.value = value
         if 'created_at' in data:
-            import datetime
             # ここでは ISO 8601 形式で送信されることを前提とする
             record.created_at = datetime.datetime.fromisoformat(data['created_at'])
         if 'memo' in data:
             record.memo = data['memo']
+        rollup.add_record(record)
+        refresh_last_record_at([old_activity_id, record.activity_id])
         db.session.commit()
         return jsonify({'message': 'Record updated'}), 200
     except SQLAlchemyError as e:
@@ -98,10 +189,72 @@ def delete_record(record_id):
         return jsonify({'error': 'Record not found'}), 404
 
     try:
+        rollup.remove_record(record)
         db.session.delete(record)
+        db.session.flush()
+        refresh_last_record_at([record.activity_id])
         db.session.commit()
         return jsonify({'message': 'Record deleted'}), 200
     except SQLAlchemyError as e:
         current_app.logger.error("Error in get_records: %s", e, exc_info=True)
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+# POST /api/records/batch: {operations: [...]} の一括変更（app.record_batch を参照）
+# 操作は {op: 'create', activity_id, value, created_at?, memo?} / {op: 'update', id, ...変更する項目}
+# / {op: 'delete', id}。すべて1つのトランザクションで適用し、操作ごとの結果を返す。
+# 不正な操作が1つでもあれば何も変更せず 400 を返す（results に各操作の error / skipped）。
+@record_bp.route('/api/records/batch', methods=['POST'])
+def batch_records():
+    data = request.get_json()
+    if not data or 'operations' not in data:
+        return jsonify({'error': 'operations は必須です'}), 400
+
+    try:
+        results = apply_batch(data['operations'])
+        db.session.commit()
+        return jsonify({'message': 'Batch applied', 'results': results}), 200
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'results': e.results}), 400
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in batch_records: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+# POST /api/records/bulk: CSV / NDJSON の一括インポート
+# 形式は ?format=csv|ndjson または Content-Type で指定する。
+# 途中で中断した場合は 500 と、それまでに commit した件数（inserted）などの結果を返す。
+@record_bp.route('/api/records/bulk', methods=['POST'])
+def bulk_import_records():
+    fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format には csv または ndjson を指定してください'}), 400
+
+    batch_size = request.args.get('batch_size', DEFAULT_BATCH_SIZE, type=int)
+    if batch_size <= 0:
+        return jsonify({'error': 'batch_size は正の整数で指定してください'}), 400
+
+    text_stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    try:
+        summary = import_records(text_stream, fmt, batch_size)
+        return jsonify(summary), 200
+    except ImportAborted as e:
+        # それまでのバッチは commit 済みなので、取り込んだ件数も返す
+        current_app.logger.error("Error in bulk_import_records: %s", e, exc_info=True)
+        return jsonify(dict(e.summary, error=str(e))), 500
+
+# GET /api/records/export: 全レコードを NDJSON / CSV でストリーミング出力する
+# 一覧をメモリ上に組み立てないため、履歴の量によらずメモリ使用量は一定。
+@record_bp.route('/api/records/export', methods=['GET'])
+def export_records():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({'error': 'format には csv または ndjson を指定してください'}), 400
+
+    filename = f"chronoloft-records.{fmt}"
+    return Response(
+        stream_with_context(iter_export_chunks(fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,211 @@
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from ..models import ActiveSession, Activity
+from ..metadata_cache import get_metadata
+from ..record_io import parse_datetime, parse_memo, parse_record_value
+from ..serializers import serialize_session
+from .. import db
+from .. import sessions
+
+session_bp = Blueprint('session', __name__)
+
+# ストップウォッチの計測状態（app.sessions を参照）。
+# slot は main（メインのストップウォッチ）または sub（サブストップウォッチ）。
+# 変更系のエンドポイントは変更後のセッション（停止時は作成・更新したレコード）を返す。
+
+
+def _load_session(slot):
+    """slot のセッションを返す。無ければ (None, エラーレスポンス)。"""
+    if slot not in sessions.SESSION_SLOTS:
+        return None, (jsonify({'error': f'Unknown slot: {slot}'}), 400)
+    session = sessions.get_session(slot)
+    if session is None:
+        return None, (jsonify({'error': 'No active session'}), 404)
+    return session, None
+
+
+def _session_response(session, now, code=200):
+    return jsonify({'session': serialize_session(session, get_metadata(), now)}), code
+
+
+def _parse_values(data, fields):
+    """リクエストボディのうち fields に含まれる項目を取り出す。不正な値は ValueError。"""
+    values = {}
+    if 'activity_id' in fields and 'activity_id' in data:
+        activity_id = int(data['activity_id'])
+        if db.session.get(Activity, activity_id) is None:
+            raise ValueError('Activity not found')
+        values['activity_id'] = activity_id
+    if 'started_at' in fields and data.get('started_at'):
+        values['started_at'] = parse_datetime(data['started_at'])
+    if 'created_at' in fields and data.get('created_at'):
+        values['created_at'] = parse_datetime(data['created_at'])
+    if 'value' in fields and 'value' in data:
+        values['value'] = parse_record_value(data['value'])
+    if 'memo' in fields and 'memo' in data:
+        values['memo'] = parse_memo(data['memo'])
+    return values
+
+
+# GET /api/sessions: 計測中のセッションの一覧
+@session_bp.route('/api/sessions', methods=['GET'])
+def get_sessions():
+    try:
+        now = sessions.utcnow()
+        rows = ActiveSession.query.order_by(ActiveSession.slot).all()
+        metadata = get_metadata()
+        return jsonify({
+            'now': now,
+            'sessions': [serialize_session(session, metadata, now) for session in rows],
+        }), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in get_sessions: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# POST /api/sessions: {slot, activity_id, started_at?, memo?} で計測を開始する
+@session_bp.route('/api/sessions', methods=['POST'])
+def start_session():
+    data = request.get_json()
+    if not data or 'slot' not in data or 'activity_id' not in data:
+        return jsonify({'error': 'slot と activity_id は必須です'}), 400
+    if data['slot'] not in sessions.SESSION_SLOTS:
+        return jsonify({'error': f"Unknown slot: {data['slot']}"}), 400
+
+    try:
+        values = _parse_values(data, ('activity_id', 'started_at', 'memo'))
+        now = sessions.utcnow()
+        session = sessions.start_session(data['slot'], now=now, **values)
+        db.session.commit()
+        return _session_response(session, now, 201)
+    except (ValueError, TypeError, sessions.SessionError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        # 別のウィンドウが同じ slot ですでに開始している
+        db.session.rollback()
+        return jsonify({'error': 'A session is already active for this slot'}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in start_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# PUT /api/sessions/<slot>: activity_id / started_at / memo を変更する
+@session_bp.route('/api/sessions/<slot>', methods=['PUT'])
+def update_session(slot):
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No input data provided'}), 400
+    session, error = _load_session(slot)
+    if error:
+        return error
+
+    try:
+        values = _parse_values(data, ('activity_id', 'started_at', 'memo'))
+        now = sessions.utcnow()
+        sessions.update_session(session, values, now=now)
+        db.session.commit()
+        return _session_response(session, now)
+    except (ValueError, TypeError, sessions.SessionError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in update_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@session_bp.route('/api/sessions/<slot>/pause', methods=['POST'])
+def pause_session(slot):
+    session, error = _load_session(slot)
+    if error:
+        return error
+
+    try:
+        now = sessions.utcnow()
+        sessions.pause_session(session, now=now)
+        db.session.commit()
+        return _session_response(session, now)
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in pause_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# POST /api/sessions/<slot>/resume: {count_paused?} 一時停止していた時間を含めるなら count_paused=true
+@session_bp.route('/api/sessions/<slot>/resume', methods=['POST'])
+def resume_session(slot):
+    data = request.get_json(silent=True) or {}
+    session, error = _load_session(slot)
+    if error:
+        return error
+
+    try:
+        now = sessions.utcnow()
+        sessions.resume_session(session, count_paused=bool(data.get('count_paused')), now=now)
+        db.session.commit()
+        return _session_response(session, now)
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in resume_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# POST /api/sessions/<slot>/stop: 計測を終了し、同じトランザクションでレコードを書き込む
+# ボディ（すべて省略可）:
+#   activity_id / value（分）/ created_at / memo: 書き込むレコードの値を上書きする（確認ダイアログで編集した場合）
+#   merge: false なら直前のレコードとまとめない
+#   next_activity_id: 終了と同時に同じ slot で次の計測を開始する
+@session_bp.route('/api/sessions/<slot>/stop', methods=['POST'])
+def stop_session(slot):
+    data = request.get_json(silent=True) or {}
+    session, error = _load_session(slot)
+    if error:
+        return error
+
+    try:
+        overrides = _parse_values(data, ('activity_id', 'value', 'created_at', 'memo'))
+        next_values = None
+        if data.get('next_activity_id') is not None:
+            next_values = _parse_values({'activity_id': data['next_activity_id']}, ('activity_id',))
+        now = sessions.utcnow()
+        record, merged = sessions.stop_session(session, overrides, merge=data.get('merge', True), now=now)
+        next_session = sessions.start_session(slot, now=now, **next_values) if next_values else None
+        db.session.commit()
+        return jsonify({
+            'message': 'Record merged' if merged else 'Record created',
+            'record_id': record.id,
+            'merged': merged,
+            'value': record.value,
+            'session': serialize_session(next_session, get_metadata(), now) if next_session else None,
+        }), 200
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except sessions.SessionError as e:
+        # 別のウィンドウがすでに停止・破棄していた
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in stop_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# DELETE /api/sessions/<slot>: レコードを書かずに計測を破棄する
+@session_bp.route('/api/sessions/<slot>', methods=['DELETE'])
+def cancel_session(slot):
+    session, error = _load_session(slot)
+    if error:
+        return error
+
+    try:
+        sessions.discard_session(session)
+        db.session.commit()
+        return jsonify({'message': 'Session cancelled'}), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in cancel_session: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
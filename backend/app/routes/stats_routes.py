@@ -0,0 +1,226 @@
+import datetime
+import json
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from .. import db
+from .. import rollup
+from ..versioning import conditional_get
+
+stats_bp = Blueprint('stats', __name__)
+
+PERIODS = ('day', 'week', 'month')
+MAX_RANGE_DAYS = 366 * 20
+
+# 集計キーごとの SELECT 列と JOIN 句
+GROUP_BY_SQL = {
+    'activity': (
+        "a.id AS key, a.name AS name",
+        "",
+    ),
+    'group': (
+        "g.id AS key, g.name AS name",
+        "JOIN activity_group g ON g.id = a.group_id",
+    ),
+    'tag': (
+        "t.id AS key, t.name AS name",
+        "JOIN activity_tags act ON act.activity_id = a.id JOIN tag t ON t.id = act.tag_id",
+    ),
+}
+
+# daily_rollup.local_date からバケットのラベルを作る式
+ROLLUP_BUCKET_SQL = {
+    'day': "dr.local_date",
+    # ISO週（月曜始まり）の初日
+    'week': "date(dr.local_date, '-' || ((CAST(strftime('%w', dr.local_date) AS INTEGER) + 6) % 7) || ' days')",
+    'month': "strftime('%Y-%m', dr.local_date)",
+}
+
+# julianday の基準 (1970-01-01T00:00:00Z)
+UNIX_EPOCH_JULIANDAY = 2440587.5
+
+
+def to_julianday(dt_utc):
+    """aware な UTC datetime を SQLite の julianday と同じ尺度の実数に変換する。"""
+    return dt_utc.timestamp() / 86400.0 + UNIX_EPOCH_JULIANDAY
+
+
+def bucket_label(day, period):
+    if period == 'week':
+        # ISO週（月曜始まり）の初日
+        return (day - datetime.timedelta(days=day.weekday())).isoformat()
+    if period == 'month':
+        return day.strftime('%Y-%m')
+    return day.isoformat()
+
+
+def local_day_bounds(start_date, end_date, tz):
+    """
+    start_date から end_date（両端含む）までの各ローカル日について、
+    (日付, その日の開始UTC, 翌日の開始UTC) を返す。
+    DST の切り替え日も tz に従って正しい長さになる。
+    """
+    bounds = []
+    day = start_date
+    while day <= end_date:
+        next_day = day + datetime.timedelta(days=1)
+        day_start = datetime.datetime.combine(day, datetime.time(), tzinfo=tz)
+        day_end = datetime.datetime.combine(next_day, datetime.time(), tzinfo=tz)
+        bounds.append((
+            day,
+            day_start.astimezone(datetime.timezone.utc),
+            day_end.astimezone(datetime.timezone.utc),
+        ))
+        day = next_day
+    return bounds
+
+
+def aggregate_records(start_date, end_date, tz, period, group_by):
+    """
+    records を SQLite 上でローカル日に分割して SUM/GROUP BY する。
+
+    minutes レコードは created_at を終了時刻、value 分前を開始時刻とみなし、
+    日付境界（ローカル時刻の0時）を跨ぐ場合は各日に按分する
+    （フロントエンドの forEachLocalDayMinuteSegment と同じ扱い）。
+    count レコードは created_at のローカル日に value を加算する。
+    """
+    days = [
+        [bucket_label(day, period), to_julianday(day_start), to_julianday(day_end)]
+        for day, day_start, day_end in local_day_bounds(start_date, end_date, tz)
+    ]
+    key_columns, key_joins = GROUP_BY_SQL[group_by]
+    sql = text(f"""
+        WITH days AS (
+            SELECT
+                json_extract(value, '$[0]') AS bucket,
+                json_extract(value, '$[1]') AS day_start,
+                json_extract(value, '$[2]') AS day_end
+            FROM json_each(:days)
+        ),
+        rec AS (
+            SELECT
+                r.activity_id,
+                r.value,
+                a.unit,
+                julianday(r.created_at) AS jd_end,
+                CASE WHEN a.unit = 'MINUTES' AND r.value > 0
+                     THEN julianday(r.created_at) - r.value / 1440.0
+                     ELSE julianday(r.created_at) END AS jd_start
+            FROM record r
+            JOIN activity a ON a.id = r.activity_id
+            WHERE r.created_at >= :range_start
+        )
+        SELECT
+            d.bucket AS bucket,
+            {key_columns},
+            SUM(CASE WHEN rec.unit = 'MINUTES' AND rec.value > 0
+                     THEN MAX(0, MIN(rec.jd_end, d.day_end) - MAX(rec.jd_start, d.day_start)) * 1440.0
+                     ELSE 0 END) AS minutes,
+            SUM(CASE WHEN rec.unit = 'COUNT' AND rec.jd_end >= d.day_start AND rec.jd_end < d.day_end
+                     THEN rec.value ELSE 0 END) AS count,
+            SUM(CASE WHEN rec.unit = 'MINUTES' AND rec.jd_end >= d.day_start AND rec.jd_end < d.day_end
+                     THEN 1 ELSE 0 END) AS sessions
+        FROM rec
+        JOIN days d ON rec.jd_start < d.day_end AND rec.jd_end >= d.day_start
+        JOIN activity a ON a.id = rec.activity_id
+        {key_joins}
+        GROUP BY d.bucket, key
+        ORDER BY d.bucket, key
+    """)
+    range_start = local_day_bounds(start_date, start_date, tz)[0][1]
+    rows = db.session.execute(sql, {
+        'days': json.dumps(days),
+        # minutes レコードは開始日を跨いで range に入りうるので、終了時刻での絞り込みのみ行う
+        'range_start': range_start.replace(tzinfo=None).strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    return _rows_to_buckets(rows)
+
+
+def _rows_to_buckets(rows):
+    buckets = []
+    for row in rows.mappings():
+        if not (row['minutes'] or row['count'] or row['sessions']):
+            continue
+        buckets.append({
+            'bucket': row['bucket'],
+            'key': row['key'],
+            'name': row['name'],
+            # julianday は double なので数十マイクロ秒程度の誤差を丸める
+            'minutes': round(row['minutes'] or 0, 3),
+            'count': row['count'] or 0,
+            'sessions': row['sessions'] or 0,
+        })
+    return buckets
+
+
+def aggregate_rollup(start_date, end_date, tz, period, group_by):
+    """
+    daily_rollup から集計する。計算量はレコード数ではなく日数に比例する。
+    日跨ぎの按分は daily_rollup の更新時に済んでいる。
+    """
+    key_columns, key_joins = GROUP_BY_SQL[group_by]
+    sql = text(f"""
+        SELECT
+            {ROLLUP_BUCKET_SQL[period]} AS bucket,
+            {key_columns},
+            SUM(CASE WHEN dr.unit = 'MINUTES' THEN dr.minutes ELSE 0 END) AS minutes,
+            SUM(CASE WHEN dr.unit = 'COUNT' THEN dr.count ELSE 0 END) AS count,
+            SUM(CASE WHEN dr.unit = 'MINUTES' THEN dr.record_count ELSE 0 END) AS sessions
+        FROM daily_rollup dr
+        JOIN activity a ON a.id = dr.activity_id
+        {key_joins}
+        WHERE dr.tz = :tz AND dr.local_date BETWEEN :start_date AND :end_date
+        GROUP BY bucket, key
+        ORDER BY bucket, key
+    """)
+    rows = db.session.execute(sql, {
+        'tz': str(tz),
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+    })
+    return _rows_to_buckets(rows)
+
+
+# GET /api/stats: 期間・タイムゾーンを指定した集計値の取得
+# ?from=YYYY-MM-DD&to=YYYY-MM-DD（ローカル日付、両端含む）
+# &tz=Asia/Tokyo&period=day|week|month&group_by=activity|group|tag
+@stats_bp.route('/api/stats', methods=['GET'])
+@conditional_get('record', 'activity', 'tag', 'activity_group')
+def get_stats():
+    args = request.args
+    try:
+        start_date = datetime.date.fromisoformat(args['from'])
+        end_date = datetime.date.fromisoformat(args['to'])
+        tz = ZoneInfo(args.get('tz') or 'UTC')
+    except KeyError:
+        return jsonify({'error': 'from と to は必須です'}), 400
+    except (ValueError, ZoneInfoNotFoundError) as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
+    period = args.get('period', 'day')
+    group_by = args.get('group_by', 'activity')
+    if period not in PERIODS:
+        return jsonify({'error': 'period の値が不正です'}), 400
+    if group_by not in GROUP_BY_SQL:
+        return jsonify({'error': 'group_by の値が不正です'}), 400
+    if end_date < start_date or (end_date - start_date).days > MAX_RANGE_DAYS:
+        return jsonify({'error': '期間の指定が不正です'}), 400
+
+    try:
+        # daily_rollup のタイムゾーンと一致すれば daily_rollup を使い、そうでなければ records から集計する
+        # （タイムゾーンが変わった後、起動時の作り直しが終わるまでも records から集計する）
+        if rollup.rollup_available(tz):
+            buckets = aggregate_rollup(start_date, end_date, tz, period, group_by)
+        else:
+            buckets = aggregate_records(start_date, end_date, tz, period, group_by)
+        return jsonify({
+            'period': period,
+            'group_by': group_by,
+            'tz': str(tz),
+            'buckets': buckets
+        }), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in get_stats: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,56 @@
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import Activity, Record, Tag, Tombstone
+from ..queries import activity_list_query, record_list_query
+from ..metadata_cache import get_metadata
+from ..serializers import serialize_activities, serialize_records, serialize_tag
+from ..sync import current_revision
+from .. import db
+
+sync_bp = Blueprint('sync', __name__)
+
+# GET /api/sync?since=<rev>: 指定リビジョン以降に追加・変更・削除された行を返す
+# レスポンスの revision を次回の since に渡す。since を省略（または0）すると全件を返す。
+# レコードの activity_name などはレコード側の revision を進めないので、
+# activities の変更分を使ってクライアント側で反映すること。
+@sync_bp.route('/api/sync', methods=['GET'])
+def get_sync():
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'error': 'since の値が不正です'}), 400
+
+    try:
+        # 先に現在のリビジョンを読む。以降に書き込まれた行が含まれても次回再送されるだけで取りこぼしはない
+        revision = current_revision(db.session)
+        records = db.session.execute(
+            record_list_query().filter(Record.revision > since).order_by(Record.revision, Record.id)
+        ).all()
+        activities = activity_list_query().filter(Activity.revision > since).order_by(Activity.revision, Activity.id).all()
+        tags = Tag.query.filter(Tag.revision > since).order_by(Tag.revision, Tag.id).all()
+        metadata = get_metadata()
+
+        deleted = {'record': [], 'activity': [], 'tag': []}
+        if since > 0:
+            tombstones = db.session.query(Tombstone.table_name, Tombstone.row_id).filter(
+                Tombstone.revision > since
+            ).order_by(Tombstone.revision)
+            for table_name, row_id in tombstones:
+                if table_name in deleted:
+                    deleted[table_name].append(row_id)
+
+        return jsonify({
+            'revision': revision,
+            'full': since == 0,
+            'records': serialize_records(records, metadata),
+            'activities': serialize_activities(activities, metadata),
+            'tags': [serialize_tag(t) for t in tags],
+            'deleted': {
+                'records': deleted['record'],
+                'activities': deleted['activity'],
+                'tags': deleted['tag'],
+            }
+        }), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in get_sync: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
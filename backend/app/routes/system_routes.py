@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify, current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..metadata_cache import get_metadata_cache
+from .. import db
+
+system_bp = Blueprint('system', __name__)
+
+# GET /api/health: サーバーが応答でき、DB に接続できるかを返す
+# 起動待ちや外部からの死活監視に使う。DB に接続できない場合は 503。
+@system_bp.route('/api/health', methods=['GET'])
+def get_health():
+    try:
+        db.session.execute(text('SELECT 1'))
+        return jsonify({'status': 'ok'}), 200
+    except SQLAlchemyError as e:
+        current_app.logger.error("Error in get_health: %s", e, exc_info=True)
+        db.session.rollback()
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+
+@system_bp.route('/api/system/cache_stats', methods=['GET'])
+def get_cache_stats():
+    """
+    メタデータキャッシュのヒット・ミス回数などを返す。
+    """
+    return jsonify({'metadata': get_metadata_cache().stats()}), 200
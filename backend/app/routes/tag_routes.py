@@ -1,20 +1,16 @@
 from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.exc import SQLAlchemyError
 from ..models import Tag, db
+from ..metadata_cache import get_metadata
+from ..versioning import conditional_get
 
 tag_bp = Blueprint('tag', __name__)
 
 @tag_bp.route('/api/tags', methods=['GET'])
+@conditional_get('tag')
 def get_tags():
     try:
-        tags = Tag.query.all()
-        result = []
-        for t in tags:
-            result.append({
-                'id': t.id,
-                'name': t.name,
-                'color': t.color
-            })
+        result = list(get_metadata().tags.values())
         return jsonify(result), 200
     except SQLAlchemyError as e:
         current_app.logger.error("Error in get_tags: %s", e, exc_info=True)
@@ -0,0 +1,72 @@
+import json
+import os
+import sqlite3
+
+# ====================================
+# スキーマが最新かどうかの高速判定
+# ====================================
+# 起動のたびに Alembic でマイグレーションを走査すると、Alembic の import と
+# migrations/env.py の読み込み、リビジョングラフの探索がかかる。
+# ビルド時に tools/bake_schema_head.py で head リビジョンを migrations/schema_head.json に書き出しておき、
+# DB の alembic_version がそれと一致すれば Alembic を import せずに済ませる。
+
+SCHEMA_HEAD_FILE = 'schema_head.json'
+
+
+def read_baked_head(migrations_dir):
+    """
+    焼き込まれた head リビジョンを返す。ファイルが無い場合や、
+    versions/ のリビジョン数が焼き込み時と異なる（新しいマイグレーションが追加された）場合は None。
+    """
+    try:
+        with open(os.path.join(migrations_dir, SCHEMA_HEAD_FILE), encoding='utf-8') as f:
+            baked = json.load(f)
+        versions = [
+            name for name in os.listdir(os.path.join(migrations_dir, 'versions'))
+            if name.endswith('.py')
+        ]
+    except (OSError, ValueError):
+        return None
+    if len(versions) != baked.get('revision_count'):
+        return None
+    return baked.get('head')
+
+
+def sqlite_path_from_uri(uri):
+    prefix = 'sqlite:///'
+    if not uri.startswith(prefix) or uri == prefix:
+        return None
+    return uri[len(prefix):]
+
+
+def database_at_head(db_uri, migrations_dir):
+    """DB の alembic_version が焼き込まれた head と一致すれば True。判定できない場合は False。"""
+    head = read_baked_head(migrations_dir)
+    db_path = sqlite_path_from_uri(db_uri)
+    if head is None or db_path is None or not os.path.exists(db_path):
+        return False
+    try:
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        try:
+            rows = conn.execute('SELECT version_num FROM alembic_version').fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return rows == [(head,)]
+
+
+def apply_migrations(app, migrations_dir, force=False):
+    """
+    DB を最新のスキーマにする。すでに head であれば何もしない（force=True なら常に Alembic を実行する）。
+    Alembic を実行した場合は True を返す。
+    """
+    if not force and database_at_head(app.config['SQLALCHEMY_DATABASE_URI'], migrations_dir):
+        return False
+
+    from flask_migrate import upgrade
+    from . import init_migrate
+    init_migrate(app)
+    with app.app_context():
+        upgrade(directory=migrations_dir)
+    return True
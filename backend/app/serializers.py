@@ -0,0 +1,152 @@
+import datetime
+
+from . import sessions
+
+# ====================================
+# API レスポンス用のシリアライズ
+# ====================================
+# 一覧エンドポイントと差分同期エンドポイントで同じ形の辞書を返すための共通関数。
+# アクティビティ・グループ・タグの情報は ORM のリレーションではなく
+# app.metadata_cache のスナップショットから引く。
+# datetime は JSON プロバイダ（app.json_provider）が ISO 8601 に変換するのでそのまま渡す。
+
+def serialize_tag(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color
+    }
+
+
+def serialize_activity(activity_id, last_record_at, metadata):
+    """スナップショットにない（読み込んだ後に作成された）アクティビティは None。"""
+    activity = metadata.activities.get(activity_id)
+    if activity is None:
+        return None
+    return dict(
+        activity,
+        tags=metadata.activity_tags(activity_id),
+        group_name=metadata.group_name(activity['group_id']),
+        last_record=last_record_at,
+    )
+
+
+def serialize_activities(rows, metadata):
+    """(activity_id, last_record_at) の列をアクティビティの辞書のリストにする。スナップショットにないものは飛ばす。"""
+    result = []
+    for activity_id, last_record_at in rows:
+        activity = serialize_activity(activity_id, last_record_at, metadata)
+        if activity is not None:
+            result.append(activity)
+    return result
+
+
+def _record_activity_fields(activity_id, metadata):
+    """レコードの辞書のうち、アクティビティから決まる部分。"""
+    activity = metadata.activities.get(activity_id)
+    return {
+        'unit': activity['unit'] if activity else None,
+        'activity_name': activity['name'] if activity else None,
+        'activity_group': metadata.group_name(activity['group_id']) if activity else None,
+        'activity_group_id': activity['group_id'] if activity else None,
+        'tags': metadata.activity_tags(activity_id),
+    }
+
+
+def serialize_records(rows, metadata):
+    """
+    queries.record_list_query() の結果（列のタプル）をレコードの辞書のリストにする。
+    アクティビティ由来の項目はアクティビティごとに1度だけ組み立てる。
+    """
+    fields_by_activity = {}
+    result = []
+    for record_id, activity_id, value, created_at, memo in rows:
+        fields = fields_by_activity.get(activity_id)
+        if fields is None:
+            fields = fields_by_activity[activity_id] = _record_activity_fields(activity_id, metadata)
+        result.append({
+            'id': record_id,
+            'activity_id': activity_id,
+            'value': value,
+            'created_at': created_at,
+            'memo': memo,
+            **fields
+        })
+    return result
+
+
+def serialize_session(session, metadata, now):
+    """
+    計測中のセッション。elapsed_seconds は now 時点の値で、
+    クライアントは受け取ってからの経過時間を足して表示する（一時停止中は足さない）。
+    """
+    return {
+        'id': session.id,
+        'slot': session.slot,
+        'activity_id': session.activity_id,
+        'started_at': session.started_at,
+        'paused_at': session.paused_at,
+        'is_paused': session.paused_at is not None,
+        'elapsed_seconds': sessions.elapsed_seconds(session, now),
+        'memo': session.memo,
+        **_record_activity_fields(session.activity_id, metadata),
+    }
+
+
+# ====================================
+# 列指向（struct-of-arrays）形式
+# ====================================
+# /api/records?format=columnar 用。レコードは列ごとの配列で返し、
+# created_at は UNIX 秒（UTC）にする。アクティビティ・グループ・タグは
+# レコードから参照されているものだけを id をキーにした辞書で1度だけ返す。
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def serialize_records_columnar(rows, metadata):
+    ids = []
+    activity_ids = []
+    values = []
+    created_ats = []
+    memos = []
+    for record_id, activity_id, value, created_at, memo in rows:
+        ids.append(record_id)
+        activity_ids.append(activity_id)
+        values.append(value)
+        created_ats.append((created_at - _EPOCH).total_seconds())
+        memos.append(memo)
+
+    activities = {}
+    groups = {}
+    tags = {}
+    for activity_id in set(activity_ids):
+        activity = metadata.activities.get(activity_id)
+        if activity is None:
+            continue
+        activity_tags = metadata.activity_tags(activity_id)
+        activities[activity_id] = {
+            'name': activity['name'],
+            'unit': activity['unit'],
+            'group_id': activity['group_id'],
+            'tag_ids': [tag['id'] for tag in activity_tags],
+        }
+        group = metadata.groups.get(activity['group_id'])
+        if group is not None:
+            groups[group['id']] = {'name': group['name']}
+        for tag in activity_tags:
+            tags[tag['id']] = {'name': tag['name'], 'color': tag['color']}
+
+    return {
+        'format': 'columnar',
+        'count': len(ids),
+        'columns': {
+            'id': ids,
+            'activity_id': activity_ids,
+            'value': values,
+            'created_at': created_ats,
+            'memo': memos,
+        },
+        'activities': activities,
+        'groups': groups,
+        'tags': tags,
+    }
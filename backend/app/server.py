@@ -0,0 +1,111 @@
+import logging
+import os
+
+from werkzeug.serving import make_server
+
+try:
+    import waitress
+    from waitress import wasyncore
+except ImportError:  # pragma: no cover - waitress が無い環境では開発サーバーを使う
+    waitress = None
+
+# ====================================
+# WSGI サーバーの選択
+# ====================================
+# 既定では waitress（純 Python のマルチスレッド WSGI サーバー）で配信する。
+# 環境変数 CHRONOLOFT_SERVER=werkzeug で従来の Werkzeug 開発サーバーに切り替えられる。
+# スレッド数と同時接続数の上限は CHRONOLOFT_SERVER_THREADS / CHRONOLOFT_SERVER_CONNECTION_LIMIT。
+
+SERVER_MODES = ('waitress', 'werkzeug')
+DEFAULT_MODE = 'waitress'
+DEFAULT_THREADS = 8
+DEFAULT_CONNECTION_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
+
+def server_settings():
+    """環境変数からサーバーの種類・スレッド数・接続数上限を読む。"""
+    mode = os.environ.get('CHRONOLOFT_SERVER') or DEFAULT_MODE
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown CHRONOLOFT_SERVER: {mode}")
+    return {
+        'mode': mode,
+        'threads': int(os.environ.get('CHRONOLOFT_SERVER_THREADS') or DEFAULT_THREADS),
+        'connection_limit': int(os.environ.get('CHRONOLOFT_SERVER_CONNECTION_LIMIT') or DEFAULT_CONNECTION_LIMIT),
+    }
+
+
+class _WaitressServer:
+    """
+    waitress には実行中のサーバーを止める公開 API が無い（server.close() は待ち受けソケットを閉じるだけで、
+    run() のループは開いている接続が残っている間終わらない）。そのためソケットの map を自分で渡して持っておき、
+    close() で map の全チャネルを閉じてループを終了させる。
+    使っているのは create_server(map=...)、server.trigger、server.task_dispatcher と wasyncore.close_all で、
+    requirements.txt で固定している waitress 3.0.2 で確認している。
+    """
+
+    def __init__(self, app, host, port, threads, connection_limit):
+        self._map = {}
+        self._server = waitress.create_server(
+            app, map=self._map, host=host, port=port, threads=threads, connection_limit=connection_limit
+        )
+        self.port = self._server.effective_port
+        self._running = False
+
+    def run(self):
+        self._running = True
+        self._server.run()
+
+    def close(self):
+        server = self._server
+        # イベントループ外から直接 close するとループ側で EBADF になるので、
+        # ループのスレッドで全チャネルを閉じさせてループを終了させる
+        if self._running:
+            server.trigger.pull_trigger(lambda: wasyncore.close_all(self._map))
+        else:
+            wasyncore.close_all(self._map)
+        server.task_dispatcher.shutdown()
+
+
+class _WerkzeugServer:
+    def __init__(self, app, host, port):
+        self._server = make_server(host, port, app, threaded=True)
+        self.port = self._server.port
+
+    def run(self):
+        self._server.serve_forever()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def create_server(app, host='127.0.0.1', port=5000, mode=None, threads=None, connection_limit=None):
+    """
+    ソケットを bind した状態のサーバーを返す。run() で配信を開始し、close() で停止する。
+    省略した引数は server_settings() の値を使う。
+    """
+    settings = server_settings()
+    mode = mode or settings['mode']
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode: {mode}")
+    if mode == 'waitress' and waitress is None:
+        logger.warning("waitress is not installed; falling back to the Werkzeug development server")
+        mode = 'werkzeug'
+
+    if mode == 'waitress':
+        server = _WaitressServer(
+            app, host, port,
+            threads=threads or settings['threads'],
+            connection_limit=connection_limit or settings['connection_limit'],
+        )
+    else:
+        server = _WerkzeugServer(app, host, port)
+    logger.info("Serving on http://%s:%s (%s)", host, server.port, mode)
+    return server
+
+
+def serve(app, host='127.0.0.1', port=5000, **kwargs):
+    """create_server で作ったサーバーを起動し、停止するまでブロックする。"""
+    create_server(app, host, port, **kwargs).run()
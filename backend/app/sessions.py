@@ -0,0 +1,187 @@
+import datetime
+
+from sqlalchemy import delete, func
+
+from . import db
+from . import rollup
+from .denormalize import refresh_last_record_at
+from .events import record_change
+from .models import ActiveSession, Activity, ActivityUnitType, Record
+
+# ====================================
+# 計測中のストップウォッチ（サーバー側のセッション）
+# ====================================
+# ストップウォッチの状態は active_session に1スロット1行で持ち、経過時間は常にここから求める。
+# ブラウザ（webview）を再読み込みしても、複数のウィンドウから開いても同じ状態が見える。
+# 停止すると経過時間を Record として書き込み、同じトランザクションでセッションを削除する。
+# 関数は呼び出し元のトランザクション内で実行され、commit は呼び出し元が行う。
+
+SESSION_SLOTS = ('main', 'sub')
+
+# 直前のレコードとの間隔がこれ以下で、アクティビティとメモが同じなら1つのレコードにまとめる
+# （フロントエンドの RecordContext.createRecord と同じ規則）
+MERGE_WINDOW = datetime.timedelta(minutes=5)
+
+
+class SessionError(Exception):
+    """セッションの操作が現在の状態ではできない場合に送出する。"""
+
+
+def utcnow():
+    return datetime.datetime.utcnow()
+
+
+def elapsed_seconds(session, now=None):
+    """一時停止していた時間を除いた経過秒数。一時停止中は一時停止した時点までの値。"""
+    end = session.paused_at or now or utcnow()
+    return max(0.0, (end - session.started_at).total_seconds() - session.paused_seconds)
+
+
+def get_session(slot):
+    return ActiveSession.query.filter_by(slot=slot).one_or_none()
+
+
+def start_session(slot, activity_id, started_at=None, memo=None, now=None):
+    now = now or utcnow()
+    if started_at is not None and started_at > now:
+        raise SessionError('Start time cannot be in the future')
+    session = ActiveSession(
+        slot=slot,
+        activity_id=activity_id,
+        started_at=started_at or now,
+        paused_seconds=0,
+        memo=memo,
+        updated_at=now,
+    )
+    db.session.add(session)
+    db.session.flush()
+    return session
+
+
+def update_session(session, values, now=None):
+    """activity_id / started_at / memo を変更する。開始時刻を変えると一時停止の累計はリセットする。"""
+    now = now or utcnow()
+    if 'started_at' in values:
+        started_at = values['started_at']
+        if started_at > now:
+            raise SessionError('Start time cannot be in the future')
+        session.started_at = started_at
+        session.paused_seconds = 0
+        if session.paused_at is not None:
+            session.paused_at = max(session.paused_at, started_at)
+    if 'activity_id' in values:
+        session.activity_id = values['activity_id']
+    if 'memo' in values:
+        session.memo = values['memo']
+    session.updated_at = now
+
+
+def pause_session(session, now=None):
+    if session.paused_at is not None:
+        return
+    now = now or utcnow()
+    session.paused_at = now
+    session.updated_at = now
+
+
+def resume_session(session, count_paused=False, now=None):
+    """
+    一時停止を解除する。count_paused=True の場合は一時停止していた間も経過時間に含める
+    （確認ダイアログを開いている間だけ止めていた場合など）。
+    """
+    if session.paused_at is None:
+        return
+    now = now or utcnow()
+    if not count_paused:
+        session.paused_seconds += max(0.0, (now - session.paused_at).total_seconds())
+    session.paused_at = None
+    session.updated_at = now
+
+
+def _is_minutes(activity_id):
+    unit = db.session.query(Activity.unit).filter(Activity.id == activity_id).scalar()
+    return unit == ActivityUnitType.MINUTES
+
+
+def _find_merge_candidate(activity_id, memo, start, end):
+    """[start, end] の直前 MERGE_WINDOW 以内に終わった、同じアクティビティ・メモのレコードを返す。"""
+    return (
+        Record.query
+        .filter(
+            Record.activity_id == activity_id,
+            Record.created_at >= start - MERGE_WINDOW,
+            Record.created_at <= start,
+            func.coalesce(Record.memo, '') == (memo or ''),
+            Record.value >= 0,
+        )
+        .order_by(Record.created_at.desc(), Record.id.desc())
+        .first()
+    )
+
+
+def write_session_record(activity_id, value, created_at, memo, merge=True):
+    """
+    計測結果をレコードにする。直前のレコードとまとめた場合はそのレコードを更新する。
+    (record, merged) を返す。
+    """
+    if merge and value >= 0 and _is_minutes(activity_id):
+        end = created_at
+        start = end - datetime.timedelta(minutes=value)
+        candidate = _find_merge_candidate(activity_id, memo, start, end)
+        if candidate is not None:
+            candidate_start = candidate.created_at - datetime.timedelta(minutes=candidate.value)
+            merged_start = min(candidate_start, start)
+            merged_end = max(candidate.created_at, end)
+            rollup.remove_record(candidate)
+            candidate.value = (merged_end - merged_start).total_seconds() / 60
+            candidate.created_at = merged_end
+            candidate.memo = memo
+            rollup.add_record(candidate)
+            refresh_last_record_at([activity_id])
+            return candidate, True
+
+    record = Record(activity_id=activity_id, value=value, created_at=created_at, memo=memo)
+    db.session.add(record)
+    db.session.flush()
+    rollup.add_record(record)
+    refresh_last_record_at([activity_id])
+    return record, False
+
+
+def stop_session(session, overrides=None, merge=True, now=None):
+    """
+    セッションを終了して Record を書き込む。overrides で activity_id / value（分）/ created_at / memo を上書きできる。
+    別のリクエストがすでに終了・破棄していた場合は SessionError を送出する（レコードを二重に書かない）。
+    (record, merged) を返す。
+    """
+    now = now or utcnow()
+    overrides = overrides or {}
+    ended_at = session.paused_at or now
+    values = {
+        'activity_id': session.activity_id,
+        'value': elapsed_seconds(session, now) / 60,
+        'created_at': ended_at,
+        'memo': session.memo,
+    }
+    values.update(overrides)
+
+    if not discard_session(session):
+        raise SessionError('Session has already been stopped')
+    return write_session_record(
+        values['activity_id'], values['value'], values['created_at'], values['memo'], merge=merge
+    )
+
+
+def discard_session(session):
+    """レコードを書かずにセッションを削除する。すでに削除されていた場合は False。"""
+    result = db.session.execute(
+        delete(ActiveSession)
+        .where(ActiveSession.id == session.id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.expunge(session)
+    if result.rowcount != 1:
+        return False
+    # Core の delete は ORM のイベントで拾えないので、変更通知を明示的に積む
+    record_change(db.session, 'session', 'deleted', {'id': session.id, 'slot': session.slot})
+    return True
@@ -0,0 +1,70 @@
+import datetime
+
+from sqlalchemy import select, update
+
+from . import listen_once
+from .models import Activity, Record, SyncState, Tag, Tombstone
+
+# ====================================
+# 差分同期用のリビジョン管理
+# ====================================
+# Record / Activity / Tag が追加・変更されるたびにグローバルなリビジョンを払い出して
+# 行の revision に記録し、削除時は Tombstone を残す。
+# クライアントは /api/sync?since=<rev> で前回以降の変更だけを受け取る。
+# SQLite は書き込みを直列化するため、リビジョンはコミット順に単調増加する。
+
+SYNCED_MODELS = (Record, Activity, Tag)
+
+
+def next_revision(connection):
+    """sync_state のカウンタを1つ進めて、新しいリビジョンを返す。"""
+    table = SyncState.__table__
+    result = connection.execute(
+        update(table).where(table.c.id == 1).values(revision=table.c.revision + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(id=1, revision=1))
+    return connection.execute(select(table.c.revision).where(table.c.id == 1)).scalar_one()
+
+
+def current_revision(session):
+    return session.execute(select(SyncState.revision).where(SyncState.id == 1)).scalar() or 0
+
+
+def _on_before_flush(session, flush_context, instances):
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, SYNCED_MODELS) and session.is_modified(obj)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, SYNCED_MODELS)]
+    if not changed and not deleted:
+        return
+
+    revision = next_revision(session.connection())
+    now = datetime.datetime.utcnow()
+    for obj in changed:
+        obj.revision = revision
+        obj.updated_at = now
+    for obj in deleted:
+        session.add(Tombstone(
+            table_name=obj.__tablename__,
+            row_id=obj.id,
+            revision=revision,
+            deleted_at=now,
+        ))
+
+
+def init_sync(session):
+    """セッション（scoped_session 可）にリビジョン付与のイベントリスナーを登録する。"""
+    listen_once(session, 'before_flush', _on_before_flush)
+
+
+def revision_values(session):
+    """
+    session.execute(insert/update) のように ORM を経由しない書き込みで
+    同期対象の行に設定する revision / updated_at の値を返す。
+    """
+    return {
+        'revision': next_revision(session.connection()),
+        'updated_at': datetime.datetime.utcnow(),
+    }
@@ -0,0 +1,115 @@
+import functools
+import secrets
+import threading
+from collections import defaultdict
+
+from flask import make_response, request
+from sqlalchemy import text
+
+from . import db, listen_once
+
+# ====================================
+# テーブルごとの変更カウンタと ETag
+# ====================================
+# セッションで書き込まれたテーブルを記録しておき、commit 成功時にそのテーブルの
+# バージョンを1つ進める。一覧系エンドポイントは依存するテーブルのバージョンから
+# ETag を作り、If-None-Match が一致すれば ORM に触れずに 304 を返す。
+# カウンタはプロセス内のみで保持し、再起動時は _epoch が変わるので古い ETag は一致しない。
+# 別プロセス（flask records import など）の書き込みはカウンタに現れないので、ETag には
+# DB に永続化された sync_state のリビジョン（app.sync を参照）も含める。
+
+_versions = defaultdict(int)
+_lock = threading.Lock()
+_epoch = secrets.token_hex(4)
+
+PENDING_KEY = 'changed_tables'
+
+
+def _pending_tables(session):
+    return session.info.setdefault(PENDING_KEY, set())
+
+
+def _on_after_flush(session, flush_context):
+    pending = _pending_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table:
+            pending.add(table)
+
+
+def _on_do_orm_execute(orm_execute_state):
+    # session.execute(insert/update/delete) のような ORM を経由しない書き込みも拾う
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    name = getattr(table, 'name', None)
+    if name:
+        _pending_tables(orm_execute_state.session).add(name)
+
+
+def _on_after_commit(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    with _lock:
+        for table in pending:
+            _versions[table] += 1
+
+
+def _on_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_versioning(session):
+    """セッション（scoped_session 可）に変更追跡のイベントリスナーを登録する。"""
+    listen_once(session, 'after_flush', _on_after_flush)
+    listen_once(session, 'do_orm_execute', _on_do_orm_execute)
+    listen_once(session, 'after_commit', _on_after_commit)
+    listen_once(session, 'after_rollback', _on_after_rollback)
+
+
+def bump_versions(*tables):
+    """セッションを経由しない書き込みの後などに、明示的にバージョンを進める。"""
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+
+def table_versions(*tables):
+    with _lock:
+        return tuple(_versions[table] for table in tables)
+
+
+def persisted_revision():
+    """sync_state のリビジョンを ORM を通さずに読む。Record / Activity / Tag の変更はどのプロセスからでもこれを進める。"""
+    return db.session.execute(text("SELECT revision FROM sync_state WHERE id = 1")).scalar() or 0
+
+
+def etag_for(*tables):
+    versions = '.'.join(str(version) for version in table_versions(*tables))
+    return f"{_epoch}-{versions}-{persisted_revision()}"
+
+
+def conditional_get(*tables):
+    """
+    一覧系 GET エンドポイント用のデコレータ。
+    tables のバージョンから ETag を作り、If-None-Match が一致すれば 304 を返す。
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_for(*tables)
+            # 圧縮時は弱い ETag になるので弱い比較で照合する
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                # キャッシュしてよいが、使う前に毎回再検証させる
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+"""Add sync revisions and tombstones
+
+Revision ID: 06401e1e1fc9
+Revises: ffe2c93b6c4f
+Create Date: 2026-10-17 13:20:37.118842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '06401e1e1fc9'
+down_revision = 'ffe2c93b6c4f'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ('record', 'activity', 'tag')
+
+
+def upgrade():
+    op.create_table('sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_sync_state'))
+    )
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_tombstone'))
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tombstone_revision'), ['revision'], unique=False)
+
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_revision'), ['revision'], unique=False)
+
+    # 既存の行はすべてリビジョン1として扱う（since=0 の同期で全件が返る）
+    for table in SYNCED_TABLES:
+        op.execute(f"UPDATE {table} SET revision = 1")
+    op.execute("INSERT INTO sync_state (id, revision) VALUES (1, 1)")
+
+
+def downgrade():
+    for table in reversed(SYNCED_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_revision'))
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('revision')
+
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tombstone_revision'))
+
+    op.drop_table('tombstone')
+    op.drop_table('sync_state')
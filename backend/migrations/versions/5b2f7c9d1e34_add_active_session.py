@@ -0,0 +1,36 @@
+"""Add active_session
+
+Revision ID: 5b2f7c9d1e34
+Revises: 06401e1e1fc9
+Create Date: 2026-10-17 18:42:05.513207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2f7c9d1e34'
+down_revision = '06401e1e1fc9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('active_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slot', sa.String(length=20), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('paused_at', sa.DateTime(), nullable=True),
+    sa.Column('paused_seconds', sa.Float(), server_default='0', nullable=False),
+    sa.Column('memo', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['activity_id'], ['activity.id'], name=op.f('fk_active_session_activity_id_activity')),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_active_session')),
+    sa.UniqueConstraint('slot', name=op.f('uq_active_session_slot'))
+    )
+
+
+def downgrade():
+    op.drop_table('active_session')
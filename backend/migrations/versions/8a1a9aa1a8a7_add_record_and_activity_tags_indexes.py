@@ -0,0 +1,34 @@
+"""Add record and activity_tags indexes
+
+Revision ID: 8a1a9aa1a8a7
+Revises: f168374fdcd5
+Create Date: 2026-10-17 11:02:15.274910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a1a9aa1a8a7'
+down_revision = 'f168374fdcd5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('record', schema=None) as batch_op:
+        batch_op.create_index('ix_record_activity_id_created_at', ['activity_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_record_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('activity_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_tags_tag_id', ['tag_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('activity_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_tags_tag_id')
+
+    with op.batch_alter_table('record', schema=None) as batch_op:
+        batch_op.drop_index('ix_record_created_at')
+        batch_op.drop_index('ix_record_activity_id_created_at')
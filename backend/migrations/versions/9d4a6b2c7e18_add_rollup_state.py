@@ -0,0 +1,53 @@
+"""Add rollup_state
+
+Revision ID: 9d4a6b2c7e18
+Revises: 5b2f7c9d1e34
+Create Date: 2026-10-17 19:20:41.102447
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a6b2c7e18'
+down_revision = '5b2f7c9d1e34'
+branch_labels = None
+depends_on = None
+
+
+def _built_tz(bind):
+    """
+    既存の daily_rollup がどのタイムゾーンで完全に揃っているかを推定する。
+    複数のタイムゾーンの行が混ざっている（起動時のタイムゾーンが変わった後に書き込みがあった）場合や、
+    レコードがあるのに集計が無い場合は分からないので None（次に使うときに作り直す）。
+    """
+    zones = [row[0] for row in bind.execute(sa.text("SELECT DISTINCT tz FROM daily_rollup"))]
+    if len(zones) == 1:
+        return zones[0]
+    if not zones and bind.execute(sa.text("SELECT COUNT(*) FROM record")).scalar() == 0:
+        return current_app.config.get('ROLLUP_TIMEZONE') or 'UTC'
+    return None
+
+
+def upgrade():
+    op.create_table('rollup_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tz', sa.String(length=64), nullable=False),
+    sa.Column('built_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_rollup_state'))
+    )
+    bind = op.get_bind()
+    tz = _built_tz(bind)
+    if tz is not None:
+        bind.execute(
+            sa.text("INSERT INTO rollup_state (id, tz, built_at) VALUES (1, :tz, :built_at)"),
+            {'tz': tz, 'built_at': datetime.datetime.utcnow()},
+        )
+
+
+def downgrade():
+    op.drop_table('rollup_state')
@@ -0,0 +1,107 @@
+"""Add daily_rollup table
+
+Revision ID: f168374fdcd5
+Revises: 8eabb803f8a4
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+import datetime
+from collections import defaultdict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = 'f168374fdcd5'
+down_revision = '8eabb803f8a4'
+branch_labels = None
+depends_on = None
+
+
+def _rollup_timezone():
+    name = current_app.config.get('ROLLUP_TIMEZONE') or 'UTC'
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
+
+
+def _backfill(tz):
+    """
+    既存の record から daily_rollup を作成する。
+    マイグレーション時点のスナップショットとして、app.rollup と同じ按分ロジックをここに持つ。
+    """
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT r.created_at, r.value, r.activity_id, a.unit "
+        "FROM record r JOIN activity a ON a.id = r.activity_id "
+        "WHERE a.unit IS NOT NULL"
+    ))
+    totals = defaultdict(lambda: [0.0, 0.0, 0])
+    for created_at, value, activity_id, unit in rows:
+        # 加減算は UTC で行い、日付の判定だけローカル時刻で行う
+        end_utc = _parse_datetime(created_at).replace(tzinfo=datetime.timezone.utc)
+        end_date = end_utc.astimezone(tz).date()
+        totals[(end_date, activity_id, unit)][2] += 1
+        if unit == 'COUNT':
+            totals[(end_date, activity_id, unit)][1] += value or 0
+            continue
+        if not value or value <= 0:
+            continue
+        cursor = end_utc - datetime.timedelta(minutes=value)
+        while cursor < end_utc:
+            local_date = cursor.astimezone(tz).date()
+            next_day = datetime.datetime.combine(
+                local_date + datetime.timedelta(days=1), datetime.time(), tzinfo=tz
+            ).astimezone(datetime.timezone.utc)
+            segment_end = next_day if next_day < end_utc else end_utc
+            totals[(local_date, activity_id, unit)][0] += (segment_end - cursor).total_seconds() / 60
+            cursor = segment_end
+
+    if totals:
+        bind.execute(
+            sa.text(
+                "INSERT INTO daily_rollup (tz, local_date, activity_id, unit, minutes, count, record_count) "
+                "VALUES (:tz, :local_date, :activity_id, :unit, :minutes, :count, :record_count)"
+            ),
+            [
+                {
+                    'tz': str(tz),
+                    'local_date': local_date.isoformat(),
+                    'activity_id': activity_id,
+                    'unit': unit,
+                    'minutes': minutes,
+                    'count': count,
+                    'record_count': record_count,
+                }
+                for (local_date, activity_id, unit), (minutes, count, record_count) in totals.items()
+            ],
+        )
+
+
+def upgrade():
+    op.create_table('daily_rollup',
+    sa.Column('tz', sa.String(length=64), nullable=False),
+    sa.Column('local_date', sa.Date(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('unit', sa.Enum('COUNT', 'MINUTES', name='activityunittype'), nullable=False),
+    sa.Column('minutes', sa.Float(), server_default='0', nullable=False),
+    sa.Column('count', sa.Float(), server_default='0', nullable=False),
+    sa.Column('record_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activity.id'], name=op.f('fk_daily_rollup_activity_id_activity')),
+    sa.PrimaryKeyConstraint('tz', 'local_date', 'activity_id', 'unit', name=op.f('pk_daily_rollup'))
+    )
+    _backfill(_rollup_timezone())
+
+
+def downgrade():
+    op.drop_table('daily_rollup')
@@ -0,0 +1,34 @@
+"""Add activity.last_record_at
+
+Revision ID: ffe2c93b6c4f
+Revises: 8a1a9aa1a8a7
+Create Date: 2026-10-17 11:48:03.912644
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ffe2c93b6c4f'
+down_revision = '8a1a9aa1a8a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_record_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_activity_last_record_at'), ['last_record_at'], unique=False)
+
+    # 既存レコードから最新日時を埋める
+    op.execute(
+        "UPDATE activity SET last_record_at = "
+        "(SELECT MAX(record.created_at) FROM record WHERE record.activity_id = activity.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_activity_last_record_at'))
+        batch_op.drop_column('last_record_at')
@@ -1,6 +1,11 @@
 from app import create_app
+from app.server import server_settings, serve
 
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if server_settings()['mode'] == 'werkzeug':
+        # 開発サーバーではデバッガとリローダーを有効にする
+        app.run(debug=True)
+    else:
+        serve(app, host='127.0.0.1', port=5000)
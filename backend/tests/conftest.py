@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, 'migrations')
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Activity, ActivityGroup, ActivityUnitType  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path_factory):
+    """一時ディレクトリの SQLite を head までマイグレーションしたアプリを作る。呼ぶたびに別の DB になる。"""
+    apps = []
+
+    def factory():
+        path = tmp_path_factory.mktemp('db') / 'test.db'
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(path)})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        apps.append(app)
+        return app
+
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded_app(app):
+    """グループ1つと minutes のアクティビティ1つ（id=1, name='study'）を登録したアプリ。"""
+    with app.app_context():
+        db.session.add(Activity(name='study', unit=ActivityUnitType.MINUTES, group=ActivityGroup(name='group')))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def seeded_client(seeded_app):
+    return seeded_app.test_client()
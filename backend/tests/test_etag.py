@@ -0,0 +1,30 @@
+import datetime
+import sqlite3
+
+from app import db
+
+# 一覧系エンドポイントの ETag が、このプロセスを経由しない書き込み（CLI のインポートなど）でも変わることを確認する。
+
+
+def test_etag_changes_on_out_of_process_write(seeded_app, seeded_client):
+    first = seeded_client.get('/api/records')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert seeded_client.get('/api/records', headers={'If-None-Match': etag}).status_code == 304
+
+    # 別のプロセスと同じく、アプリのセッションを通さずに DB へ直接書き込む（リビジョンも進める）
+    with seeded_app.app_context():
+        path = db.engine.url.database
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE sync_state SET revision = revision + 1 WHERE id = 1")
+        revision = conn.execute("SELECT revision FROM sync_state WHERE id = 1").fetchone()[0]
+        conn.execute(
+            "INSERT INTO record (activity_id, value, created_at, revision, updated_at) VALUES (1, 30, ?, ?, ?)",
+            (datetime.datetime(2026, 1, 1).isoformat(' '), revision, datetime.datetime(2026, 1, 1).isoformat(' ')),
+        )
+    conn.close()
+
+    second = seeded_client.get('/api/records', headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != etag
+    assert len(second.get_json()['records']) == 1
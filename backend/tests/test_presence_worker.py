@@ -0,0 +1,51 @@
+from app.discord_presence_manager import RETRY_INITIAL_DELAY, RETRY_MAX_DELAY, PresenceWorker, RateLimiter
+
+
+class FakeManager:
+    """接続はできるが、プレゼンスの更新には update_ok が True になるまで失敗する。"""
+
+    update_ok = False
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.connected = False
+
+    def connect(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def begin_session(self):
+        pass
+
+    def update_presence(self, **presence):
+        return FakeManager.update_ok
+
+    def clear_presence(self):
+        return True
+
+    def close(self):
+        self.connected = False
+
+
+def desired(new_session=False):
+    return {'group': 'g', 'client_id': 'C', 'presence': {'state': 's'}, 'new_session': new_session}
+
+
+def test_failed_update_backs_off(monkeypatch):
+    monkeypatch.setattr(FakeManager, 'update_ok', False)
+    worker = PresenceWorker(manager_factory=FakeManager, rate_limiter=RateLimiter(max_calls=1000))
+
+    waits = [worker._apply(desired(new_session=True))]
+    waits += [worker._apply(desired()) for _ in range(7)]
+    assert waits[0] == RETRY_INITIAL_DELAY
+    assert all(later >= earlier for earlier, later in zip(waits, waits[1:]))
+    assert waits[-1] == RETRY_MAX_DELAY
+    assert worker.status()['state'] == 'error'
+
+    # 更新できたら待ち時間をリセットする
+    monkeypatch.setattr(FakeManager, 'update_ok', True)
+    assert worker._apply(desired()) is None
+    monkeypatch.setattr(FakeManager, 'update_ok', False)
+    assert worker._apply(dict(desired(), presence={'state': 't'})) == RETRY_INITIAL_DELAY
@@ -0,0 +1,83 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.metadata_cache import get_metadata_cache
+from app.models import Activity, ActivityGroup, ActivityUnitType, Record, Tag
+
+# 一覧系エンドポイントの SELECT 数が行数に比例して増えない（N+1 になっていない）ことを確認する。
+# 同じ手順で件数だけを変えた2つの DB に対して、1回目のリクエスト（メタデータキャッシュが空の状態）と
+# 2回目のリクエスト（キャッシュが効いた状態）の SELECT 数を数えて比べる。
+
+LIST_ENDPOINTS = (
+    '/api/records',
+    '/api/records?all=1',
+    '/api/records?all=1&format=columnar',
+    '/api/activities',
+    '/api/tags',
+    '/api/activity_groups',
+)
+SMALL = 2
+LARGE = 20
+
+
+def seed(size):
+    """size 件ずつのグループ・タグ・アクティビティと、アクティビティごとに size 件のレコードを作る。"""
+    now = datetime.datetime(2026, 1, 1)
+    groups = [ActivityGroup(name=f'group{i}', position=i) for i in range(size)]
+    tags = [Tag(name=f'tag{i}', color='#ffffff') for i in range(size)]
+    db.session.add_all(groups + tags)
+    for i in range(size):
+        activity = Activity(
+            name=f'activity{i}',
+            unit=ActivityUnitType.MINUTES if i % 2 else ActivityUnitType.COUNT,
+            group=groups[i],
+            tags=[tags[i], tags[(i + 1) % size]],
+        )
+        db.session.add(activity)
+        for j in range(size):
+            db.session.add(Record(activity=activity, value=j + 1, created_at=now + datetime.timedelta(hours=j)))
+    db.session.commit()
+
+
+def count_selects(app, client, url):
+    selects = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(selects)
+
+
+def measure(app, size):
+    """size で seed した DB に対して、各エンドポイントの (1回目, 2回目) の SELECT 数を返す。"""
+    with app.app_context():
+        seed(size)
+    client = app.test_client()
+    counts = {}
+    for url in LIST_ENDPOINTS:
+        # 他のエンドポイントで読み込まれたキャッシュを使わないよう、毎回空にしてから測る
+        get_metadata_cache(app).invalidate()
+        counts[url] = (count_selects(app, client, url), count_selects(app, client, url))
+    return counts
+
+
+@pytest.fixture
+def counts(make_app):
+    return {size: measure(make_app(), size) for size in (SMALL, LARGE)}
+
+
+@pytest.mark.parametrize('url', LIST_ENDPOINTS)
+def test_select_count_does_not_grow_with_rows(url, counts):
+    assert counts[LARGE][url] == counts[SMALL][url]
@@ -0,0 +1,32 @@
+import pytest
+
+from app import db
+from app.models import Record
+
+# 型の誤った操作は 500 ではなく操作ごとのエラー（400）になり、バッチ全体を適用しない。
+
+
+@pytest.fixture
+def client(seeded_app):
+    with seeded_app.app_context():
+        db.session.add(Record(activity_id=1, value=10))
+        db.session.commit()
+    return seeded_app.test_client()
+
+
+@pytest.mark.parametrize('invalid', [
+    {'op': 'create', 'activity_id': 1, 'value': 5, 'created_at': 5},
+    {'op': 'update', 'id': 1, 'created_at': ['2026-01-01T00:00:00Z']},
+    {'op': 'update', 'id': 1, 'memo': {'text': 'x'}},
+    {'op': 'create', 'activity_id': 1, 'value': [5]},
+])
+def test_invalid_operation_is_reported(seeded_app, client, invalid):
+    response = client.post('/api/records/batch', json={'operations': [
+        {'op': 'create', 'activity_id': 1, 'value': 20},
+        invalid,
+    ]})
+    assert response.status_code == 400, response.get_json()
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ['skipped', 'error']
+    with seeded_app.app_context():
+        assert Record.query.count() == 1
@@ -0,0 +1,68 @@
+import io
+
+from app import db, record_io
+from app.models import Record
+from app.record_io import import_records
+
+# NDJSON では任意の JSON 値が来るので、型の誤った行も行ごとのエラーとして報告し、インポートを続ける。
+
+MALFORMED_LINES = [
+    '[1, 2]',
+    '"record"',
+    '{"activity_id": 1, "value": 10, "created_at": 5}',
+    '{"activity_id": 1, "value": 10, "created_at": ["2026-01-01"]}',
+    '{"activity_id": 1, "value": 10, "memo": {"text": "x"}}',
+    '{"activity_id": 1, "value": 10, "memo": 3}',
+    '{"activity_id": 1, "value": [10]}',
+    '{"activity_name": ["study"], "value": 10}',
+]
+
+
+def test_malformed_ndjson_rows_are_reported(seeded_app):
+    with seeded_app.app_context():
+        lines = ['{"activity_id": 1, "value": 5, "created_at": "2026-01-01T00:00:00Z", "memo": null}']
+        lines += MALFORMED_LINES
+        lines.append('{"activity_name": "study", "value": 7, "memo": "ok"}')
+
+        summary = import_records(io.StringIO('\n'.join(lines)), 'ndjson', batch_size=1)
+
+        assert summary['inserted'] == 2
+        assert summary['error_count'] == len(MALFORMED_LINES)
+        assert [error['line'] for error in summary['errors']] == list(range(2, len(MALFORMED_LINES) + 2))
+        assert [memo for memo, in db.session.query(Record.memo).order_by(Record.id)] == [None, 'ok']
+
+
+def test_non_finite_values_and_fractional_ids_are_reported(seeded_app):
+    with seeded_app.app_context():
+        csv_text = 'activity_id,value\n1,5\n1,nan\n1,inf\n1,1e999\n1,1e12\n1,6\n'
+        summary = import_records(io.StringIO(csv_text), 'csv', batch_size=2)
+        assert summary['inserted'] == 2
+        assert [error['line'] for error in summary['errors']] == [3, 4, 5, 6]
+
+        ndjson_text = '{"activity_id": 1.5, "value": 5}\n{"activity_id": 1.0, "value": 7}\n'
+        summary = import_records(io.StringIO(ndjson_text), 'ndjson')
+        assert summary['inserted'] == 1
+        assert [error['line'] for error in summary['errors']] == [1]
+        assert [value for value, in db.session.query(Record.value).order_by(Record.id)] == [5, 6, 7]
+
+
+def test_aborted_import_reports_committed_rows(seeded_app, monkeypatch):
+    flush_batch = record_io._flush_batch
+    calls = []
+
+    def failing_flush(batch, lookup):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise OverflowError('boom')
+        flush_batch(batch, lookup)
+
+    monkeypatch.setattr(record_io, '_flush_batch', failing_flush)
+    client = seeded_app.test_client()
+    response = client.post('/api/records/bulk?format=csv&batch_size=2', data='activity_id,value\n1,5\n1,5\n1,5\n1,bad\n',
+                           content_type='text/csv')
+    assert response.status_code == 500
+    body = response.get_json()
+    assert body['inserted'] == 2
+    assert body['error_count'] == 1
+    with seeded_app.app_context():
+        assert Record.query.count() == 2
@@ -0,0 +1,62 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app import db
+from app.models import ActivityUnitType, Record
+from app.rollup import MAX_RECORD_VALUE, record_contributions
+
+# daily_rollup の按分で扱えない value（有限でない・大きすぎる）は、書き込む前に 400 で拒否する。
+
+INVALID_VALUES = [1e12, -1e12, float('nan'), float('inf'), '1e999', 'nan', MAX_RECORD_VALUE + 1]
+
+
+@pytest.fixture
+def client(seeded_app):
+    with seeded_app.app_context():
+        db.session.add(Record(activity_id=1, value=10))
+        db.session.commit()
+    return seeded_app.test_client()
+
+
+def record_values(app):
+    with app.app_context():
+        return [value for value, in db.session.query(Record.value).order_by(Record.id)]
+
+
+@pytest.mark.parametrize('value', INVALID_VALUES)
+def test_create_rejects_value(seeded_app, client, value):
+    response = client.post('/api/records', json={'activity_id': 1, 'value': value})
+    assert response.status_code == 400, response.get_json()
+    assert record_values(seeded_app) == [10]
+
+
+@pytest.mark.parametrize('value', INVALID_VALUES)
+def test_update_rejects_value(seeded_app, client, value):
+    response = client.put('/api/records/1', json={'value': value})
+    assert response.status_code == 400, response.get_json()
+    assert record_values(seeded_app) == [10]
+
+
+@pytest.mark.parametrize('value', INVALID_VALUES)
+def test_batch_rejects_value(seeded_app, client, value):
+    response = client.post('/api/records/batch', json={'operations': [{'op': 'update', 'id': 1, 'value': value}]})
+    assert response.status_code == 400, response.get_json()
+    assert response.get_json()['results'][0]['status'] == 'error'
+    assert record_values(seeded_app) == [10]
+
+
+def test_largest_value_is_accepted(seeded_app, client):
+    response = client.post('/api/records', json={'activity_id': 1, 'value': MAX_RECORD_VALUE})
+    assert response.status_code == 201, response.get_json()
+    assert record_values(seeded_app) == [10, MAX_RECORD_VALUE]
+
+
+@pytest.mark.parametrize('value', [1e12, 1e300, float('nan'), float('inf')])
+@pytest.mark.parametrize('unit', [ActivityUnitType.MINUTES, ActivityUnitType.COUNT])
+def test_contributions_tolerate_stored_values(value, unit):
+    # 検証を入れる前に保存された値でも集計の作り直しが例外で止まらない
+    created_at = datetime.datetime(2026, 1, 1, 12)
+    result = record_contributions(created_at, value, unit, ZoneInfo('Asia/Tokyo'))
+    assert result[datetime.date(2026, 1, 1)][2] == 1
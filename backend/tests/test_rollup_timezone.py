@@ -0,0 +1,126 @@
+import datetime
+import sys
+import types
+from zoneinfo import ZoneInfo
+
+from flask_migrate import upgrade
+
+from conftest import MIGRATIONS_DIR
+from app import create_app, db
+from app.models import Activity, ActivityGroup, ActivityUnitType, RollupState
+from app.rollup import detect_local_timezone, sync_rollup_timezone
+from app.routes.stats_routes import aggregate_records
+
+# 起動時に検出するタイムゾーン（ROLLUP_TIMEZONE）が変わっても、daily_rollup を使った集計が
+# records から直接集計した結果と一致することを確認する。
+
+START = datetime.date(2026, 1, 1)
+END = datetime.date(2026, 1, 5)
+
+
+def seed_records(client):
+    with client.application.app_context():
+        group = ActivityGroup(name='group')
+        db.session.add(Activity(name='study', unit=ActivityUnitType.MINUTES, group=group))
+        db.session.commit()
+    # UTC で3日分。20:00 UTC は Asia/Tokyo では翌日になる
+    for day in (1, 2, 3):
+        response = client.post('/api/records', json={
+            'activity_id': 1,
+            'value': 30,
+            'created_at': f'2026-01-0{day}T20:00:00',
+        })
+        assert response.status_code == 201
+
+
+def stats(client, tz):
+    response = client.get(f'/api/stats?from={START}&to={END}&tz={tz}')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['buckets']
+
+
+def expected(app, tz):
+    with app.app_context():
+        return app.json.loads(app.json.dumps(aggregate_records(START, END, ZoneInfo(tz), 'day', 'activity')))
+
+
+def restart(app, tz):
+    """同じ DB で ROLLUP_TIMEZONE だけを変えてアプリを作り直す。"""
+    restarted = create_app({
+        'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+        'ROLLUP_TIMEZONE': tz,
+    })
+    with restarted.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    return restarted
+
+
+def dispose(app):
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_stats_after_timezone_change(make_app):
+    app = make_app()
+    app.config['ROLLUP_TIMEZONE'] = 'UTC'
+    with app.app_context():
+        # 空の DB へのマイグレーションで、その時点のタイムゾーンの集計として作られている
+        db.session.merge(RollupState(id=1, tz='UTC'))
+        db.session.commit()
+    seed_records(app.test_client())
+    assert len(stats(app.test_client(), 'UTC')) == 3
+
+    tokyo = restart(app, 'Asia/Tokyo')
+    client = tokyo.test_client()
+    # 作り直すまでは records から集計し、GET では作り直さない
+    assert stats(client, 'Asia/Tokyo') == expected(tokyo, 'Asia/Tokyo')
+    with tokyo.app_context():
+        assert db.session.get(RollupState, 1).tz == 'UTC'
+        # 起動時の作り直し
+        assert sync_rollup_timezone()
+        assert not sync_rollup_timezone()
+        assert db.session.get(RollupState, 1).tz == 'Asia/Tokyo'
+    assert stats(client, 'Asia/Tokyo') == expected(tokyo, 'Asia/Tokyo')
+    # 以前のタイムゾーンは records から集計する
+    assert stats(client, 'UTC') == expected(tokyo, 'UTC')
+
+    # 作り直した後の書き込みは Asia/Tokyo の集計に反映される
+    response = client.post('/api/records', json={'activity_id': 1, 'value': 15, 'created_at': '2026-01-04T01:00:00'})
+    assert response.status_code == 201
+    assert stats(client, 'Asia/Tokyo') == expected(tokyo, 'Asia/Tokyo')
+    dispose(tokyo)
+
+
+def test_writes_keep_built_timezone_until_rebuild(make_app):
+    app = make_app()
+    app.config['ROLLUP_TIMEZONE'] = 'UTC'
+    with app.app_context():
+        db.session.merge(RollupState(id=1, tz='UTC'))
+        db.session.commit()
+    seed_records(app.test_client())
+
+    # タイムゾーンが変わった後の書き込みも、作り直すまでは UTC の集計に反映する
+    tokyo = restart(app, 'Asia/Tokyo')
+    client = tokyo.test_client()
+    response = client.post('/api/records', json={'activity_id': 1, 'value': 15, 'created_at': '2026-01-04T01:00:00'})
+    assert response.status_code == 201
+    with tokyo.app_context():
+        assert db.session.get(RollupState, 1).tz == 'UTC'
+    back = restart(app, 'UTC')
+    assert stats(back.test_client(), 'UTC') == expected(back, 'UTC')
+    dispose(tokyo)
+    dispose(back)
+
+
+def test_detect_local_timezone_uses_tzlocal(monkeypatch):
+    # Windows では TZ も /etc/localtime も無いので、tzlocal の結果が使われること
+    fake_tzlocal = types.ModuleType('tzlocal')
+    fake_tzlocal.get_localzone_name = lambda: 'Asia/Tokyo'
+    monkeypatch.setitem(sys.modules, 'tzlocal', fake_tzlocal)
+    monkeypatch.delenv('CHRONOLOFT_TIMEZONE', raising=False)
+    monkeypatch.setenv('TZ', 'Europe/London')
+    assert detect_local_timezone() == 'Asia/Tokyo'
+
+    monkeypatch.setenv('CHRONOLOFT_TIMEZONE', 'America/New_York')
+    assert detect_local_timezone() == 'America/New_York'
@@ -0,0 +1,19 @@
+from app import db
+from app.metadata_cache import get_metadata
+from app.models import Activity, ActivityGroup, ActivityUnitType
+from app.serializers import serialize_activities, serialize_activity
+
+
+def test_activity_missing_from_snapshot_is_skipped(app):
+    with app.app_context():
+        group = ActivityGroup(name='group')
+        db.session.add(Activity(name='study', unit=ActivityUnitType.MINUTES, group=group))
+        db.session.commit()
+        metadata = get_metadata()
+        # スナップショットを取った後に作成されたアクティビティ
+        db.session.add(Activity(name='reading', unit=ActivityUnitType.MINUTES, group=group))
+        db.session.commit()
+
+        assert serialize_activity(2, None, metadata) is None
+        rows = [(1, None), (2, None)]
+        assert [activity['id'] for activity in serialize_activities(rows, metadata)] == [1]
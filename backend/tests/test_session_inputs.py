@@ -0,0 +1,36 @@
+import pytest
+
+from app.models import ActiveSession, Record
+
+# 型の誤ったリクエストボディは 500 ではなく 400 を返し、何も書き込まない。
+
+INVALID_BODIES = [
+    {'started_at': 5},
+    {'started_at': ['2026-01-01T00:00:00Z']},
+    {'memo': {'text': 'x'}},
+]
+
+
+@pytest.mark.parametrize('body', INVALID_BODIES)
+def test_start_rejects_invalid_values(seeded_app, seeded_client, body):
+    response = seeded_client.post('/api/sessions', json=dict(body, slot='main', activity_id=1))
+    assert response.status_code == 400, response.get_json()
+    with seeded_app.app_context():
+        assert ActiveSession.query.count() == 0
+
+
+@pytest.mark.parametrize('body', INVALID_BODIES)
+def test_update_rejects_invalid_values(seeded_client, body):
+    assert seeded_client.post('/api/sessions', json={'slot': 'main', 'activity_id': 1}).status_code == 201
+    response = seeded_client.put('/api/sessions/main', json=body)
+    assert response.status_code == 400, response.get_json()
+
+
+@pytest.mark.parametrize('body', [{'created_at': 5}, {'memo': ['x']}])
+def test_stop_rejects_invalid_values(seeded_app, seeded_client, body):
+    assert seeded_client.post('/api/sessions', json={'slot': 'main', 'activity_id': 1}).status_code == 201
+    response = seeded_client.post('/api/sessions/main/stop', json=body)
+    assert response.status_code == 400, response.get_json()
+    with seeded_app.app_context():
+        assert Record.query.count() == 0
+        assert ActiveSession.query.count() == 1
@@ -1,7 +1,7 @@
 import React, { useState, useRef, useMemo } from 'react';
 import { DataGrid, gridClasses } from '@mui/x-data-grid';
 import ConfirmDialog from './ConfirmDialog'
-import { Box, Collapse, IconButton, Typography, TextField } from '@mui/material';
+import { Box, Button, Collapse, IconButton, MenuItem, Typography, TextField } from '@mui/material';
 import EditIcon from '@mui/icons-material/Edit';
 import DeleteIcon from '@mui/icons-material/Delete';
 import KeyboardArrowRightIcon from '@mui/icons-material/KeyboardArrowRight';
@@ -21,7 +21,9 @@ function RecordList() {
     const { confirmDialogOpen, selectedRecordId } = state;
     const [recordToEdit, setRecordToEdit] = useState(null);
     const { state: uiState, dispatch: uiDispatch } = useUI();
-    const { records, deleteRecord, updateRecord, refreshRecords } = useRecords();
+    const { records, deleteRecord, updateRecord, applyRecordBatch } = useRecords();
+    const [rowSelectionModel, setRowSelectionModel] = useState([]);
+    const [bulkDeleteOpen, setBulkDeleteOpen] = useState(false);
     const { groups, excludedGroupIds } = useGroups();
     const { activities } = useActivities();
     const { filterState } = useFilter();
@@ -55,7 +57,6 @@ function RecordList() {
     const handleConfirmDelete = async () => {
         try {
             await deleteRecord(selectedRecordId);
-            refreshRecords();
         } catch (err) {
             console.error("Failed to delete record:", err);
         }
@@ -75,13 +76,34 @@ function RecordList() {
     const handleEditRecordSubmit = async (updatedData) => {
         try {
             await updateRecord(recordToEdit.id, updatedData);
-            refreshRecords();
             setRecordToEdit(null);
         } catch (error) {
             console.error("Failed to update record:", error);
         }
     };
 
+    // 選択した複数のレコードは /api/records/batch で1回にまとめて変更する
+    const handleBulkChangeActivity = async (activityId) => {
+        try {
+            await applyRecordBatch(
+                rowSelectionModel.map((id) => ({ op: 'update', id, activity_id: activityId }))
+            );
+            setRowSelectionModel([]);
+        } catch (err) {
+            console.error("Failed to update records:", err);
+        }
+    };
+
+    const handleConfirmBulkDelete = async () => {
+        try {
+            await applyRecordBatch(rowSelectionModel.map((id) => ({ op: 'delete', id })));
+            setRowSelectionModel([]);
+        } catch (err) {
+            console.error("Failed to delete records:", err);
+        }
+        setBulkDeleteOpen(false);
+    };
+
     const processRowUpdate = async (newRow, oldRow) => {
         try {
             // 変更が無ければ何もしない
@@ -236,13 +258,45 @@ function RecordList() {
                         }
                     }}
                 >
+                    {rowSelectionModel.length > 0 && (
+                        <Box sx={{ display: 'flex', alignItems: 'center', gap: 1, mb: 1 }}>
+                            <Typography variant='body2'>
+                                {rowSelectionModel.length}件選択中
+                            </Typography>
+                            <TextField
+                                select
+                                size='small'
+                                label='項目を変更'
+                                value=''
+                                onChange={(e) => handleBulkChangeActivity(e.target.value)}
+                                sx={{ minWidth: 200 }}
+                            >
+                                {activities.map((a) => (
+                                    <MenuItem key={a.id} value={a.id}>
+                                        {a.name}
+                                    </MenuItem>
+                                ))}
+                            </TextField>
+                            <Button
+                                size='small'
+                                color='error'
+                                startIcon={<DeleteIcon />}
+                                onClick={() => setBulkDeleteOpen(true)}
+                            >
+                                削除
+                            </Button>
+                        </Box>
+                    )}
                     <Box ref={dataGridRef} sx={{ height: 600, mb: 2 }}>
                         <DataGrid
                             rows={visibleRecords}
                             columns={columns}
                             pageSize={5}
                             rowsPerPageOptions={[5]}
-                            disableSelectionOnClick
+                            checkboxSelection
+                            disableRowSelectionOnClick
+                            rowSelectionModel={rowSelectionModel}
+                            onRowSelectionModelChange={setRowSelectionModel}
                             processRowUpdate={processRowUpdate}
                             getRowHeight={() => 'auto'}
                             sx={{
@@ -267,6 +321,13 @@ function RecordList() {
                 onConfirm={handleConfirmDelete}
                 onCancel={handleCancelDelete}
             />
+            <ConfirmDialog
+                open={bulkDeleteOpen}
+                title="Confirm Deletion"
+                content={`Are you sure you want to delete ${rowSelectionModel.length} records?`}
+                onConfirm={handleConfirmBulkDelete}
+                onCancel={() => setBulkDeleteOpen(false)}
+            />
             {/* 編集用ダイアログ */}
             {recordToEdit && (
                 <AddRecordDialog
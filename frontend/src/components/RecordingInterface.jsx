@@ -103,7 +103,7 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
         if (!activity) return;
         if (stopwatchRef.current?.isDiscordBusy) return; // Discordリクエスト中は操作を受け付けない
 
-        // ストップウォッチが動いていない場合、Discord接続中か確認し、接続中ならストップウォッチを開始しない
+        // ストップウォッチが動いていない場合、Discord連携のセッションが開始されているか（接続処理中も含む）確認し、開始されていればストップウォッチを開始しない
         // （別のウィンドウでストップウォッチが動作していると考えられるため）
         // ただし、groupにclient_idが設定されていない場合、Discord連係が無効の場合は接続をしないので判定を行わない
         const groupData = groups.find(g => g.name === activity.group_name);
@@ -112,7 +112,7 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                 try {
                     const presenceRes = await fetch('/api/discord_presence/status');
                     const presenceData = await presenceRes.json();
-                    if (presenceData.connected) {
+                    if (presenceData.active) {
                         alert("Discord presence is active. Skipping stopwatch start.");
                         return;
                     }
@@ -140,6 +140,7 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                 }
 
                 // 既に別ストップウォッチが動いている -> 一旦finishAndReset
+                // （サーバーがレコードを書き込み、同じ slot で次のアクティビティの計測を開始する）
                 const details = calculateTimeDetails(activity.id, records);
                 const nextGroup = groups.find(g => g.name === activity.group_name);
                 const newDiscordData = (discordEnabled && nextGroup?.client_id) // 連係有効かつClient IDのあるグループは連係データを組み立てる
@@ -150,10 +151,7 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                         asset_key: activity.asset_key || "default_image"
                     }
                     : null;
-                const { minutes, memo } = await stopwatchRef.current.finishAndReset(newDiscordData);
-
-                // auto モード: 既存レコードを作成
-                await createRecord({ activity_id: selectedActivity.id, value: minutes, memo });
+                await stopwatchRef.current.finishAndReset(newDiscordData, activity.id);
                 onRecordUpdate();
             }
             // 新しいActivityを選択
@@ -198,8 +196,7 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
         if (!activity || activity.unit === 'count') return;
 
         if (subStopwatchVisible && subSelectedActivity && subSelectedActivity.id !== activity.id && subStopwatchRef.current) {
-            const { minutes, memo } = await subStopwatchRef.current.finishAndReset();
-            await createRecord({ activity_id: subSelectedActivity.id, value: minutes, memo: memo });
+            await subStopwatchRef.current.finishAndReset(undefined, activity.id);
             onRecordUpdate();
         }
         setSubSelectedActivity(activity);
@@ -218,27 +215,13 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
         }
     };
 
-    // 完了時ハンドラ
-    const handleStopwatchComplete = async (minutes, memo) => {
-        if (recordSaveMode === 'auto') {
-            // 既存の自動レコード作成ロジック
-            await createRecord({
-                activity_id: selectedActivity.id,
-                value: minutes,
-                memo: memo
-            });
-            onRecordUpdate();
-            await refreshActivities();
-            localStorage.removeItem('stopwatchState');
-            setStopwatchVisible(false);
-            setActiveActivity(null);
-        } else {
-            // 確認モード：ダイアログを開く
-            setPendingRecord({ minutes, memo, activity: selectedActivity });
-            setRecordDialogActivity(selectedActivity);
-            setRecordDialogInitialDate(DateTime.local().toISO());
-            dispatch({ type: 'SET_RECORD_DIALOG', payload: true });
-        }
+    // 完了時ハンドラ（レコードは停止時にサーバーが書き込み済み）
+    // 確認モードでは Stopwatch が一時停止して onConfirmComplete を呼ぶので、ここには来ない
+    const handleStopwatchComplete = async () => {
+        onRecordUpdate();
+        await refreshActivities();
+        setStopwatchVisible(false);
+        setActiveActivity(null);
     };
 
     const handleStopwatchConfirmComplete = (minutes, memo) => {
@@ -295,7 +278,6 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                                 recordSaveMode={recordSaveMode}
                                 inlineMode={isTwoColumnLayout}
                                 onCancel={() => {
-                                    localStorage.removeItem('stopwatchState');
                                     setStopwatchVisible(false);
                                     setActiveActivity(null);
                                 }}
@@ -310,17 +292,15 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                         <SubStopwatch
                             ref={subStopwatchRef}
                             inlineMode={isTwoColumnLayout}
-                            onComplete={async (minutes, memo) => {
-                                await createRecord({ activity_id: subSelectedActivity.id, value: minutes, memo });
+                            onComplete={async () => {
                                 onRecordUpdate();
                                 await refreshActivities();
-                                    localStorage.removeItem('subStopwatchState');
                                     setSubStopwatchVisible(false);
                                 }}
                                 onCancel={() => {
-                                    localStorage.removeItem('subStopwatchState');
                                     setSubStopwatchVisible(false);
                                 }}
+                                activityId={subSelectedActivity.id}
                                 activityName={subSelectedActivity.name}
                                 activityGroup={subSelectedActivity.group_name}
                             />
@@ -455,24 +435,45 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                     }}
                     onSubmit={async (recordData) => {
                         dialogSubmitRef.current = true;
-                        const hadPendingRecord = Boolean(pendingRecord);
                         const pendingNextActivity = nextActivity;
-                        // 確認モードの場合は pendingRecord をマージ
-                        if (pendingRecord) {
-                            recordData = {
-                                activity_id: pendingRecord.activity.id,
-                                value: pendingRecord.minutes,
-                                memo: pendingRecord.memo,
-                                ...recordData,
-                            };
+                        if (!pendingRecord) {
+                            await createRecord(recordData);
+                            onRecordUpdate();
+                            await refreshActivities();
+                            dispatch({ type: 'SET_RECORD_DIALOG', payload: false });
+                            setRecordDialogInitialDate(null);
+                            return;
+                        }
+                        // 確認モード：編集した値でセッションを終了し、サーバーにレコードを書き込ませる
+                        // 予約した nextActivity があれば同じリクエストで次の計測を開始する
+                        recordData = {
+                            activity_id: pendingRecord.activity.id,
+                            value: pendingRecord.minutes,
+                            memo: pendingRecord.memo,
+                            ...recordData,
+                        };
+                        let newDiscordData = null;
+                        if (pendingNextActivity) {
+                            const details2 = calculateTimeDetails(pendingNextActivity.id, records);
+                            const groupInfo2 = groups.find(g => g.name === pendingNextActivity.group_name);
+                            newDiscordData = discordEnabled && groupInfo2?.client_id
+                                ? {
+                                    group: pendingNextActivity.group_name,
+                                    activity_name: pendingNextActivity.name,
+                                    details: details2,
+                                    asset_key: pendingNextActivity.asset_key || 'default_image'
+                                }
+                                : null;
                         }
-                        await createRecord(recordData);
+                        await stopwatchRef.current?.completeWith(
+                            recordData,
+                            pendingNextActivity ? { activityId: pendingNextActivity.id, discordData: newDiscordData } : null
+                        );
                         onRecordUpdate();
                         await refreshActivities();
                         dispatch({ type: 'SET_RECORD_DIALOG', payload: false });
                         setRecordDialogInitialDate(null);
                         setPendingRecord(null);
-                        // ダイアログ送信後に予約した nextActivity があれば再開
                         if (pendingNextActivity) {
                             setSelectedActivity(pendingNextActivity);
                             setActiveActivity(pendingNextActivity);
@@ -482,29 +483,13 @@ function RecordingInterface({ showSettingsMenu = true, showHeading = true }) {
                                     activityNameFilter: pendingNextActivity.name,
                                 }));
                             }
-                            const details2 = calculateTimeDetails(pendingNextActivity.id, records);
-                            const groupInfo2 = groups.find(g => g.name === pendingNextActivity.group_name);
-                            const newDiscordData = discordEnabled && groupInfo2?.client_id
-                                ? {
-                                    group: pendingNextActivity.group_name,
-                                    activity_name: pendingNextActivity.name,
-                                    details: details2,
-                                    asset_key: pendingNextActivity.asset_key || 'default_image'
-                                }
-                                : null;
                             setDiscordData(newDiscordData);
                             setStopwatchVisible(true);
                             setNextActivity(null);
-                            if (stopwatchRef.current?.finishAndReset) {
-                                await stopwatchRef.current.finishAndReset(newDiscordData);
-                            }
                             return;
                         }
-                        if (hadPendingRecord && stopwatchRef.current?.reset) {
-                            await stopwatchRef.current.reset();
-                            setStopwatchVisible(false);
-                            setActiveActivity(null);
-                        }
+                        setStopwatchVisible(false);
+                        setActiveActivity(null);
                     }}
                     activity={recordDialogActivity}
                     initialValue={pendingRecord?.minutes}
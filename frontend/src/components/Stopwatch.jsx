@@ -19,6 +19,7 @@ const Stopwatch = forwardRef((props, ref) => {
     const {
         displayTime,
         complete,
+        completeWith,
         pause,
         resume,
         finishAndReset,
@@ -30,10 +31,11 @@ const Stopwatch = forwardRef((props, ref) => {
         memo,
         setMemo,
         isDiscordBusy
-    } = useStopwatch('stopwatchState', props.discordData, { onComplete: props.onComplete, onCancel: props.onCancel });
+    } = useStopwatch('main', props.activityId, props.discordData, { onComplete: props.onComplete, onCancel: props.onCancel });
 
     useImperativeHandle(ref, () => ({
         complete,
+        completeWith,
         finishAndReset,
         reset,
         pause,
@@ -22,7 +22,7 @@ const SubStopwatch = forwardRef((props, ref) => {
         currentStartTime,
         memo,
         setMemo,
-    } = useStopwatch('subStopwatchState', null, { onComplete: props.onComplete, onCancel: props.onCancel }); // Discord連係はしないのでDiscordDataは不要
+    } = useStopwatch('sub', props.activityId, null, { onComplete: props.onComplete, onCancel: props.onCancel }); // Discord連係はしないのでDiscordDataは不要
 
     useImperativeHandle(ref, () => ({
         complete,
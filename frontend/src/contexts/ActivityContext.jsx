@@ -7,6 +7,7 @@ import {
     setActivityTags
 } from '../services/api';
 import useLocalStorageState from '../hooks/useLocalStorageState';
+import useServerEvents from '../hooks/useServerEvents';
 
 const ActivityContext = createContext();
 
@@ -60,6 +61,11 @@ export function ActivityProvider({ children }) {
         refreshActivities();
     }, []);
 
+    // 他のウィンドウでの変更を反映する（一覧にタグ・グループ名を含むのでそれらの変更でも取得し直す）
+    useServerEvents(['activity', 'tag', 'group'], () => {
+        refreshActivities();
+    });
+
     // activities 一覧を再取得する
     const refreshActivities = async () => {
         try {
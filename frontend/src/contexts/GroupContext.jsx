@@ -1,6 +1,7 @@
 import React, { createContext, useContext, useState, useEffect, useMemo } from 'react';
 import { fetchActivityGroups } from '../services/api';
 import useLocalStorageState from '../hooks/useLocalStorageState';
+import useServerEvents from '../hooks/useServerEvents';
 
 const GroupContext = createContext([]);
 
@@ -36,12 +37,19 @@ export function GroupProvider({ children }) {
         });
     };
 
-    useEffect(() => {
+    const refreshGroups = () => {
         fetchActivityGroups()
             .then(data => setGroups(data))
             .catch(err => console.error("Failed to fetch groups:", err));
+    };
+
+    useEffect(() => {
+        refreshGroups();
     }, []);
 
+    // 他のウィンドウでの変更を反映する
+    useServerEvents(['group'], refreshGroups);
+
 
     return (
         <GroupContext.Provider value={{
@@ -1,11 +1,15 @@
-import React, { createContext, useContext, useState, useEffect, useMemo } from 'react';
+import React, { createContext, useContext, useState, useEffect, useMemo, useRef } from 'react';
 import { DateTime } from 'luxon';
 import {
     fetchRecords as apiFetchRecords,
+    fetchSessions as apiFetchSessions,
     createRecord as apiCreateRecord,
     updateRecord as apiUpdateRecord,
-    deleteRecord as apiDeleteRecord
+    deleteRecord as apiDeleteRecord,
+    batchRecords as apiBatchRecords
 } from '../services/api';
+import { isServerEventsConnected } from '../services/events';
+import useServerEvents from '../hooks/useServerEvents';
 import { useActivities } from './ActivityContext';
 
 const RecordContext = createContext();
@@ -15,82 +19,38 @@ const MERGE_WINDOW_MINUTES = 5;
 const MERGE_WINDOW_MS = MERGE_WINDOW_MINUTES * 60 * 1000;
 const MILLIS_PER_MINUTE = 60000;
 
-const safeParseLocalStorage = (key) => {
-    if (typeof window === 'undefined') return null;
-    try {
-        const raw = localStorage.getItem(key);
-        if (!raw) return null;
-        return JSON.parse(raw);
-    } catch (error) {
-        console.error(`Error parsing localStorage key "${key}":`, error);
-        return null;
-    }
-};
-
 const formatLiveCreatedAt = (now) => {
     const iso = new Date(now).toISOString();
     return iso.replace('Z', '');
 };
 
-const buildLiveRecord = ({ activity, stopwatchState, now, idPrefix }) => {
-    if (!activity || !stopwatchState) return null;
-    if (activity.unit && activity.unit !== 'minutes') return null;
-    const startTime = Number(stopwatchState.startTime);
-    const pausedStartTime = Number(stopwatchState.pausedStartTime);
-    const displayTime = Number(stopwatchState.displayTime);
-    let elapsedMs = null;
-    let createdAtMs = null;
-
-    if (Number.isFinite(startTime) && startTime > 0) {
-        elapsedMs = Math.max(0, now - startTime);
-        createdAtMs = now;
-    } else if (
-        Number.isFinite(pausedStartTime) &&
-        pausedStartTime > 0 &&
-        Number.isFinite(displayTime) &&
-        displayTime >= 0
-    ) {
-        elapsedMs = Math.max(0, displayTime);
-        createdAtMs = pausedStartTime + elapsedMs;
-    } else {
-        return null;
-    }
-
-    const minutes = elapsedMs / 60000;
-    const activityId = activity.id;
-    if (activityId === null || activityId === undefined) return null;
+// サーバーの計測中セッション（/api/sessions）から、一覧やグラフに混ぜる仮のレコードを作る
+// elapsed_seconds は syncedAt 時点の値なので、動作中はそこからの経過時間を足す
+const buildLiveRecord = (session, now, syncedAt) => {
+    if (!session || session.unit !== 'minutes') return null;
+    const pausedAtMs = session.is_paused ? parseIsoToMs(session.paused_at) : null;
+    const elapsedMs = session.elapsed_seconds * 1000 + (session.is_paused ? 0 : Math.max(0, now - syncedAt));
+    const createdAtMs = pausedAtMs ?? now;
 
-    const activityGroupId = activity.group_id ?? activity.activity_group_id ?? null;
-    const activityGroup = activity.group_name ?? activity.activity_group ?? null;
     return {
-        id: `live-${idPrefix}-${activityId}`,
-        activity_id: activityId,
-        value: minutes,
+        id: `live-${session.slot}-${session.activity_id}`,
+        activity_id: session.activity_id,
+        value: elapsedMs / 60000,
         created_at: formatLiveCreatedAt(createdAtMs),
         unit: 'minutes',
-        activity_name: activity.name,
-        activity_group: activityGroup,
-        activity_group_id: activityGroupId,
-        tags: activity.tags || [],
-        memo: stopwatchState.memo || '',
+        activity_name: session.activity_name,
+        activity_group: session.activity_group,
+        activity_group_id: session.activity_group_id,
+        tags: session.tags || [],
+        memo: session.memo || '',
         is_live: true,
-        is_paused: !(Number.isFinite(startTime) && startTime > 0),
+        is_paused: session.is_paused,
     };
 };
 
-const buildLiveRecords = () => {
+const buildLiveRecords = (sessions, syncedAt) => {
     const now = Date.now();
-    const mainState = safeParseLocalStorage('stopwatchState');
-    const mainActivity = safeParseLocalStorage('selectedActivity');
-    const subState = safeParseLocalStorage('subStopwatchState');
-    const subActivity = safeParseLocalStorage('subSelectedActivity');
-
-    const live = [];
-    const mainRecord = buildLiveRecord({ activity: mainActivity, stopwatchState: mainState, now, idPrefix: 'main' });
-    if (mainRecord) live.push(mainRecord);
-    const subRecord = buildLiveRecord({ activity: subActivity, stopwatchState: subState, now, idPrefix: 'sub' });
-    if (subRecord) live.push(subRecord);
-    return live;
+    return sessions.map((session) => buildLiveRecord(session, now, syncedAt)).filter(Boolean);
 };
 
 const areLiveRecordsEqual = (prev, next) => {
@@ -115,6 +75,25 @@ const resolveActivityUnit = (activityId, activities, records) => {
     return record?.unit ?? null;
 };
 
+// 変更通知のレコード（テーブルの列のみ）に、/api/records と同じアクティビティ由来の項目を付ける
+// アクティビティがまだ手元に無ければ null
+const buildRecordFromEvent = (data, activities) => {
+    const activity = activities.find((item) => item.id === data.activity_id);
+    if (!activity) return null;
+    return {
+        id: data.id,
+        activity_id: data.activity_id,
+        value: data.value,
+        created_at: data.created_at,
+        memo: data.memo,
+        unit: activity.unit,
+        activity_name: activity.name,
+        activity_group: activity.group_name,
+        activity_group_id: activity.group_id,
+        tags: activity.tags ?? [],
+    };
+};
+
 const parseIsoToMs = (value) => {
     if (!value) return null;
     const dt = DateTime.fromISO(value, { zone: 'utc' });
@@ -125,12 +104,24 @@ export function RecordProvider({ children }) {
     const { activities } = useActivities();
     const [records, setRecords] = useState([]);
     const [liveRecords, setLiveRecords] = useState([]);
+    const sessionsRef = useRef({ sessions: [], syncedAt: 0 });
 
     const syncLiveRecords = () => {
-        const next = buildLiveRecords();
+        const { sessions, syncedAt } = sessionsRef.current;
+        const next = buildLiveRecords(sessions, syncedAt);
         setLiveRecords((prev) => (areLiveRecordsEqual(prev, next) ? prev : next));
     };
 
+    const refreshSessions = async () => {
+        try {
+            const data = await apiFetchSessions();
+            sessionsRef.current = { sessions: data.sessions, syncedAt: Date.now() };
+            syncLiveRecords();
+        } catch (error) {
+            console.error("Failed to fetch sessions:", error);
+        }
+    };
+
     useEffect(() => {
         refreshRecords();
     }, []);
@@ -144,6 +135,48 @@ export function RecordProvider({ children }) {
         }
     };
 
+    // 変更通知を受け取れている間は、自分の変更も通知で反映されるので取得し直さない
+    const refreshUnlessStreaming = async () => {
+        if (!isServerEventsConnected()) await refreshRecords();
+    };
+
+    // 他のウィンドウ（と自分）の変更を、一覧全体を取得し直さずに反映する
+    useServerEvents(['record', 'session', 'activity', 'tag', 'group'], (event) => {
+        if (event.type === 'reset') {
+            refreshRecords();
+            refreshSessions();
+            return;
+        }
+        if (event.type === 'session') {
+            refreshSessions();
+            return;
+        }
+        if (event.type !== 'record') {
+            // アクティビティ名・グループ・タグはレコードの表示に含まれる
+            if (event.action !== 'created') refreshRecords();
+            return;
+        }
+        if (event.action === 'deleted') {
+            setRecords((prev) => prev.filter((record) => record.id !== event.data.id));
+        } else if (event.action === 'created' || event.action === 'updated') {
+            const next = buildRecordFromEvent(event.data, activities);
+            if (!next) {
+                refreshRecords();
+                return;
+            }
+            setRecords((prev) => {
+                const index = prev.findIndex((record) => record.id === next.id);
+                if (index === -1) return [...prev, next];
+                const updated = [...prev];
+                updated[index] = next;
+                return updated;
+            });
+        } else {
+            // bulk_imported など個々の行を含まない通知
+            refreshRecords();
+        }
+    });
+
     const createRecord = async (recordData) => {
         const payload = { ...recordData };
         if (!payload.created_at) {
@@ -192,38 +225,46 @@ export function RecordProvider({ children }) {
                         updatePayload.memo = payload.memo;
                     }
                     await apiUpdateRecord(candidate.id, updatePayload);
-                    await refreshRecords();
+                    await refreshUnlessStreaming();
                     return;
                 }
             }
         }
 
         await apiCreateRecord(payload);
-        await refreshRecords();
+        await refreshUnlessStreaming();
     };
 
     const updateRecord = async (recordId, updateData) => {
         await apiUpdateRecord(recordId, updateData);
-        await refreshRecords();
+        await refreshUnlessStreaming();
     };
 
     const deleteRecord = async (recordId) => {
         await apiDeleteRecord(recordId);
-        await refreshRecords();
+        await refreshUnlessStreaming();
     };
 
+    // 複数のレコードをまとめて変更する（operations は services/api の batchRecords を参照）
+    const applyRecordBatch = async (operations) => {
+        const result = await apiBatchRecords(operations);
+        await refreshUnlessStreaming();
+        return result;
+    };
+
+    // 計測中のセッションはストップウォッチの操作時（STOPWATCH_SYNC_EVENT）と
+    // ウィンドウにフォーカスが戻ったときだけサーバーから取り直し、表示上の経過時間は手元で進める
     useEffect(() => {
-        syncLiveRecords();
+        refreshSessions();
         const timer = setInterval(syncLiveRecords, LIVE_REFRESH_MS);
-        const handleStopwatchSync = () => {
-            syncLiveRecords();
-        };
 
-        window.addEventListener(STOPWATCH_SYNC_EVENT, handleStopwatchSync);
+        window.addEventListener(STOPWATCH_SYNC_EVENT, refreshSessions);
+        window.addEventListener('focus', refreshSessions);
 
         return () => {
             clearInterval(timer);
-            window.removeEventListener(STOPWATCH_SYNC_EVENT, handleStopwatchSync);
+            window.removeEventListener(STOPWATCH_SYNC_EVENT, refreshSessions);
+            window.removeEventListener('focus', refreshSessions);
         };
     }, []);
 
@@ -240,6 +281,7 @@ export function RecordProvider({ children }) {
             createRecord,
             updateRecord,
             deleteRecord,
+            applyRecordBatch,
             refreshRecords
         }}>
             {children}
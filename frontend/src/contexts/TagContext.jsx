@@ -1,17 +1,25 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { fetchTags } from '../services/api';
+import useServerEvents from '../hooks/useServerEvents';
 
 const TagContext = createContext();
 
 export function TagProvider({ children }) {
   const [tags, setTags] = useState([]);
 
-  useEffect(() => {
+  const refreshTags = () => {
     fetchTags()
       .then(data => setTags(data))
       .catch(err => console.error("Failed to fetch tags:", err));
+  };
+
+  useEffect(() => {
+    refreshTags();
   }, []);
 
+  // 他のウィンドウでの変更を反映する
+  useServerEvents(['tag'], refreshTags);
+
   return (
     <TagContext.Provider value={{ tags, setTags }}>
       {children}
@@ -0,0 +1,22 @@
+import { useEffect, useRef } from 'react';
+import { subscribeServerEvents } from '../services/events';
+
+/**
+ * サーバーの変更通知（/api/events）を購読するカスタムフック
+ * @param {string[]} types - 購読するイベントの種類（'record' / 'activity' / 'tag' / 'group' / 'session' / 'presence'）
+ * @param {Function} handler - {type, action, data} を受け取る関数。type が 'reset' の場合は一覧を取得し直すこと
+ * @param {boolean} enabled - false の間は購読しない
+ */
+function useServerEvents(types, handler, enabled = true) {
+    // 再描画のたびに購読し直さないよう、最新の handler は ref 経由で呼ぶ
+    const handlerRef = useRef(handler);
+    handlerRef.current = handler;
+    const typesKey = types.join(',');
+
+    useEffect(() => {
+        if (!enabled) return undefined;
+        return subscribeServerEvents(typesKey.split(','), (event) => handlerRef.current(event));
+    }, [typesKey, enabled]);
+}
+
+export default useServerEvents;
@@ -1,152 +1,200 @@
 import { useState, useEffect, useRef } from 'react';
-import { startDiscordPresence, stopDiscordPresence } from '../services/api';
+import { DateTime } from 'luxon';
+import {
+    startDiscordPresence,
+    stopDiscordPresence,
+    fetchSessions,
+    startSession,
+    updateSession,
+    pauseSession,
+    resumeSession,
+    stopSession,
+    cancelSession,
+} from '../services/api';
 import { STOPWATCH_SYNC_EVENT } from '../contexts/RecordContext';
+import useServerEvents from './useServerEvents';
+
+// 以前のバージョンで localStorage に保存していた計測状態のキー（初回のみサーバーへ移行する）
+const LEGACY_STORAGE_KEYS = {
+    main: 'stopwatchState',
+    sub: 'subStopwatchState',
+};
+const MEMO_SAVE_DELAY_MS = 500;
+
+const parseUtcMillis = (value) => {
+    if (!value) return null;
+    const dt = DateTime.fromISO(value, { zone: 'utc' });
+    return dt.isValid ? dt.toMillis() : null;
+};
+
+// 読み込むだけで削除はしない（サーバーへの移行が成功してから clearLegacyState で消す）
+const readLegacyState = (slot) => {
+    const key = LEGACY_STORAGE_KEYS[slot];
+    if (!key) return null;
+    try {
+        const raw = localStorage.getItem(key);
+        return raw ? JSON.parse(raw) : null;
+    } catch (error) {
+        console.error(`Error parsing localStorage key "${key}":`, error);
+        return null;
+    }
+};
+
+const clearLegacyState = (slot) => {
+    const key = LEGACY_STORAGE_KEYS[slot];
+    if (key) localStorage.removeItem(key);
+};
+
+// 以前の状態を handleStart に渡す開始オプションに変換する
+//   動作中: { startTime: 開始時刻 }
+//   一時停止中: { startTime: null, pausedStartTime: 開始時刻, displayTime: 一時停止までの経過時間 }
+// 一時停止中は、一時停止していた間を含めないよう「今 - 経過時間」から開始して一時停止する
+const legacyStartOptions = (legacy) => {
+    const memo = legacy?.memo ?? '';
+    const startTime = Number(legacy?.startTime);
+    if (legacy?.startTime != null && Number.isFinite(startTime) && startTime > 0) {
+        return { startedAt: startTime, memo };
+    }
+    const elapsed = Number(legacy?.displayTime);
+    if (legacy?.pausedStartTime != null && Number.isFinite(elapsed) && elapsed >= 0) {
+        return { startedAt: Date.now() - elapsed, memo, paused: true };
+    }
+    return { memo };
+};
 
 /**
  * useStopwatch
  *
- * @param {string} storageKey - localStorage用のキー
+ * @param {string} slot - サーバー側のセッションの種類（'main' | 'sub'）
+ * @param {number} activityId - 計測対象のアクティビティID
  * @param {Object|null} discordData - Discord連携用データ（null可）
  * @param {Object} callbacks - { onComplete, onCancel }
  *
  * このカスタムフックではストップウォッチの管理を行う。
- * - 起動や停止、計測時間の更新
+ * 計測状態（開始時刻・一時停止・メモ）はサーバーの /api/sessions が持ち、ここでは表示用の時間だけを進める。
+ * - 起動や停止、一時停止（停止時はサーバーがレコードを書き込む）
  * - Discord連携の開始・停止
- * - localStorageに計測状態を保存・復元
+ * - 再読み込みや別ウィンドウでもサーバーから同じ状態を復元
  */
-function useStopwatch(storageKey, initialDiscordData, { onComplete, onCancel }) {
+function useStopwatch(slot, activityId, initialDiscordData, { onComplete, onCancel }) {
 
-    const [displayTime, setDisplayTime] = useState(0); // ストップウォッチの経過時間(ms)
-    const [restored, setRestored] = useState(false); // localStorageからの復元完了フラグ
-    const [currentStartTime, setCurrentStartTime] = useState(null); // 開始時刻
-    const [pausedStartTime, setPausedStartTime] = useState(null); // 一時停止時の開始時刻
-    const [memo, setMemo] = useState(''); // メモ
+    const [session, setSession] = useState(null); // サーバーのセッション
+    const [syncedAt, setSyncedAt] = useState(0); // session を受け取った時刻(ms)
+    const [now, setNow] = useState(Date.now()); // 表示更新用の現在時刻(ms)
+    const [restored, setRestored] = useState(false); // サーバーからの復元完了フラグ
+    const [memo, setMemoState] = useState(''); // メモ
     const [discordData, setDiscordData] = useState(initialDiscordData); // Discordデータ
     const [isDiscordBusy, setIsDiscordBusy] = useState(false); // DiscordAPI呼び出し中フラグ
 
-    const timerRef = useRef(null); // setIntervalのID保持
     const discordLockRef = useRef(false); // Discord連係処理のリクエストが走っているかのRef
+    const memoTimerRef = useRef(null); // メモ保存の遅延用タイマー
 
     const notifyStopwatchSync = () => {
         if (typeof window === 'undefined') return;
         window.dispatchEvent(new CustomEvent(STOPWATCH_SYNC_EVENT));
     };
 
-    const persistStopwatchState = (nextState) => {
-        localStorage.setItem(storageKey, JSON.stringify(nextState));
+    const applySession = (nextSession, { syncMemo = true } = {}) => {
+        const receivedAt = Date.now();
+        setSession(nextSession);
+        setSyncedAt(receivedAt);
+        setNow(receivedAt);
+        if (syncMemo) setMemoState(nextSession?.memo ?? '');
     };
 
-    const persistStopwatchStateAndSync = (nextState) => {
-        persistStopwatchState(nextState);
+    const applySessionAndSync = (nextSession, options) => {
+        applySession(nextSession, options);
         notifyStopwatchSync();
     };
 
-    const clearStopwatchStateAndSync = () => {
-        localStorage.removeItem(storageKey);
-        notifyStopwatchSync();
+    const loadSession = async () => {
+        const data = await fetchSessions();
+        return data.sessions.find((item) => item.slot === slot) ?? null;
     };
 
-    // 親コンポーネント側でDiscord連係対象が変わったら内部状態にも反映する
-    useEffect(() => {
-        setDiscordData(initialDiscordData);
-    }, [initialDiscordData]);
+    const flushMemoTimer = () => {
+        if (memoTimerRef.current) {
+            clearTimeout(memoTimerRef.current);
+            memoTimerRef.current = null;
+        }
+    };
 
-    // -----------------------------------------------
-    // マウント時の処理： 
-    //   localStorageから以前のストップウォッチ状態を復元（復元終了後、restored=true とする）
-    //   なければ自動でhandleStart()（ストップウォッチを開始）
-    // -----------------------------------------------
-    useEffect(() => {
-        const savedState = localStorage.getItem(storageKey);
-        if (savedState) {
-            const state = JSON.parse(savedState);
-            // 開始時刻や表示中時間をRefやstateに復元
-            setCurrentStartTime(state.startTime);
-            setDisplayTime(state.displayTime);
-            setPausedStartTime(state.pausedStartTime ?? null);
-            setMemo(state.memo);
-        } else {
-            // localStorageに何もない場合は自動で開始
-            handleStart();
+    // 他のウィンドウで停止・破棄された場合など、サーバーの状態に合わせ直す
+    const resyncFromServer = async () => {
+        try {
+            applySessionAndSync(await loadSession(), { syncMemo: !memoTimerRef.current });
+        } catch (error) {
+            console.error('Failed to fetch sessions:', error);
         }
-        setRestored(true);
-    }, [storageKey]);
+    };
 
-    // -----------------------------------------------
-    // displayTime が変わるたびにlocalStorageに最新状態を保存する
-    // -----------------------------------------------
+    // 親コンポーネント側でDiscord連係対象が変わったら内部状態にも反映する
     useEffect(() => {
-        if (!restored) return; // まだ復元が終わっていないならスキップ
-        if (currentStartTime === null && pausedStartTime === null && displayTime === 0 && memo === '') {
-            localStorage.removeItem(storageKey);
-            return;
-        }
-        persistStopwatchState({
-            startTime: currentStartTime,
-            pausedStartTime,
-            displayTime,
-            memo
-        });
-    }, [currentStartTime, pausedStartTime, displayTime, restored, memo, storageKey]);
+        setDiscordData(initialDiscordData);
+    }, [initialDiscordData]);
 
     // -----------------------------------------------
-    // ストップウォッチの稼働状態管理
+    // マウント時の処理：
+    //   サーバーから計測中のセッションを復元（復元終了後、restored=true とする）
+    //   なければ（以前の localStorage の状態があればそれを引き継いで）自動で開始
     // -----------------------------------------------
     useEffect(() => {
-        // ストップウォッチがRunningならtimerを起動
-        if (currentStartTime !== null && !timerRef.current) {
-            timerRef.current = setInterval(updateDisplayTime, 1000);
-        }
-        // 止まったらtimerをクリア
-        if (currentStartTime === null && timerRef.current) {
-            clearInterval(timerRef.current);
-            timerRef.current = null;
-        }
-
-        // アンマウントや依存変化時にtimerをクリア
-        return () => {
-            if (timerRef.current) {
-                clearInterval(timerRef.current);
-                timerRef.current = null;
+        let cancelled = false;
+        const restore = async () => {
+            try {
+                const existing = await loadSession();
+                if (cancelled) return;
+                if (existing) {
+                    clearLegacyState(slot); // サーバー側が正なので古い状態は捨てる
+                    applySession(existing);
+                } else {
+                    const started = await handleStart(undefined, false, legacyStartOptions(readLegacyState(slot)));
+                    // サーバーにセッションができてから消す（失敗した場合は次回の起動で移行し直す）
+                    if (started) clearLegacyState(slot);
+                }
+            } catch (error) {
+                console.error('Failed to restore stopwatch session:', error);
+            } finally {
+                if (!cancelled) setRestored(true);
             }
         };
-    }, [currentStartTime]);
+        restore();
+        return () => {
+            cancelled = true;
+        };
+    }, [slot]);
 
     // -----------------------------------------------
-    // ストップウォッチ起動中、currentStartTimeからの経過時間を計算して displayTimeに反映
+    // ウィンドウにフォーカスが戻ったら、別ウィンドウでの操作を反映する
     // -----------------------------------------------
-    const updateDisplayTime = () => {
-        if (currentStartTime !== null) {
-            const elapsed = Date.now() - currentStartTime;
-            setDisplayTime(elapsed);
-        }
-    };
+    useEffect(() => {
+        if (!restored) return undefined;
+        window.addEventListener('focus', resyncFromServer);
+        return () => window.removeEventListener('focus', resyncFromServer);
+    }, [restored, slot]);
+
+    // 他のウィンドウで同じ slot が操作されたら、フォーカスを待たずに反映する
+    useServerEvents(['session'], (event) => {
+        if (event.type === 'reset' || event.data?.slot === slot) resyncFromServer();
+    }, restored);
 
     // -----------------------------------------------
-    // ストップウォッチ開始
-    // currentStartTime が nullなら開始処理、そうでなければ無視
-    // Discord連携も開始し、timerをスタートする
+    // 動作中は1秒ごとに表示を更新する
     // -----------------------------------------------
-    const handleStart = async (newDiscordData, force = false) => {
-        // 強制開始無効かつ既に開始済みなら何もせずreturn
-        if (!force && currentStartTime !== null) return;
-
-        const now = Date.now();
-        setCurrentStartTime(now);
-        setPausedStartTime(null);
-        setDisplayTime(0);
-        persistStopwatchStateAndSync({
-            startTime: now,
-            pausedStartTime: null,
-            displayTime: 0,
-            memo
-        });
+    const isRunning = Boolean(session) && !session.is_paused;
+    // サーバーが返した経過時間に、受け取ってからの時間を足す（一時停止中は足さない）
+    const displayTime = session
+        ? session.elapsed_seconds * 1000 + (session.is_paused ? 0 : Math.max(0, now - syncedAt))
+        : 0;
+    const displayStartTime = session ? parseUtcMillis(session.started_at) : null;
+    const currentStartTime = isRunning ? displayStartTime : null;
+    useEffect(() => {
+        if (!isRunning) return undefined;
+        const timer = setInterval(() => setNow(Date.now()), 1000);
+        return () => clearInterval(timer);
+    }, [isRunning]);
 
-        // Discord連携を開始（新しいデータが有ればそちらを優先）
-        const discordDataToUse = newDiscordData === undefined ? discordData : newDiscordData;
-        setDiscordData(discordDataToUse);
-        await startDiscordIfNeeded(discordDataToUse);
-    };
+    useEffect(() => () => flushMemoTimer(), []);
 
     const stopDiscordIfNeeded = async () => {
         if (!discordData || discordLockRef.current) return;
@@ -179,113 +227,170 @@ function useStopwatch(storageKey, initialDiscordData, { onComplete, onCancel })
     };
 
     // -----------------------------------------------
-    // ストップウォッチ停止処理
-    //   * タイマーを止める
+    // ストップウォッチ開始
+    // セッションが既にあれば無視（force=true なら破棄して開始し直す）
+    // Discord連携も開始する（paused=true の場合は開始直後に一時停止し、Discord連携は開始しない）
+    // サーバーにこの slot のセッションがある状態になれば true を返す
+    // -----------------------------------------------
+    const handleStart = async (newDiscordData, force = false, { startedAt = null, memo: initialMemo = '', paused = false } = {}) => {
+        if (!force && session) return false;
+        if (activityId === null || activityId === undefined) return false;
+
+        try {
+            if (force && session) {
+                await cancelSession(slot).catch(() => null);
+            }
+            const data = await startSession({
+                slot,
+                activity_id: activityId,
+                started_at: startedAt ? new Date(startedAt).toISOString() : undefined,
+                memo: initialMemo,
+            });
+            applySessionAndSync(data.session);
+        } catch (error) {
+            if (error.status === 409) {
+                // 別のウィンドウで既に計測中ならその状態を使う
+                await resyncFromServer();
+                return true;
+            }
+            console.error('Failed to start stopwatch session:', error);
+            return false;
+        }
+
+        // Discord連携のデータは一時停止で開始する場合も引き継ぐ（新しいデータが有ればそちらを優先）
+        const discordDataToUse = newDiscordData === undefined ? discordData : newDiscordData;
+        setDiscordData(discordDataToUse);
+        if (paused) {
+            try {
+                applySessionAndSync((await pauseSession(slot)).session, { syncMemo: false });
+            } catch (error) {
+                console.error('Failed to pause stopwatch session:', error);
+                await resyncFromServer();
+            }
+            return true;
+        }
+        await startDiscordIfNeeded(discordDataToUse);
+        return true;
+    };
+
+    // -----------------------------------------------
+    // 計測を終了してサーバーにレコードを書き込ませる
     //   * Discord連係を止める
-    //   * localStorageを削除し、内部状態もリセット
-    //   * 経過時間(ms)を返す
+    //   * 内部状態をリセット（next_activity_id があればサーバーが次の計測を開始する）
+    //   * 停止結果（{ value, record_id, merged, session }）を返す
     // -----------------------------------------------
-    async function stopNow() {
-        // Discord停止
+    const stopOnServer = async (body) => {
+        flushMemoTimer();
         await stopDiscordIfNeeded();
-        // 経過時間(ms)計算
-        let totalElapsed = 0;
-        if (currentStartTime !== null) {
-            totalElapsed = Date.now() - Number(currentStartTime);
+        try {
+            const result = await stopSession(slot, body);
+            applySessionAndSync(result.session);
+            return result;
+        } catch (error) {
+            console.error('Failed to stop stopwatch session:', error);
+            await resyncFromServer();
+            return null;
         }
-        // リセット
-        clearStopwatchStateAndSync();
-        setCurrentStartTime(null);
-        setPausedStartTime(null);
-        setDisplayTime(0);
-        setMemo('');
-
-        return totalElapsed;
-    }
+    };
 
     // -----------------------------------------------
     // 計測完了
     // -----------------------------------------------
     const complete = async (passedMemo) => {
-        const totalElapsed = await stopNow();
-        if (onComplete) onComplete(totalElapsed / 60000, passedMemo);
+        const minutes = displayTime / 60000;
+        const result = await stopOnServer({ memo: passedMemo ?? memo });
+        if (result && onComplete) onComplete(minutes, passedMemo, result);
+    };
+
+    // -----------------------------------------------
+    // 確認ダイアログで編集した値でレコードを書き込んで完了する
+    // next を渡すと同じ slot で次の計測を開始する（{ activityId, discordData }）
+    // -----------------------------------------------
+    const completeWith = async (recordData, next = null) => {
+        const result = await stopOnServer({
+            ...recordData,
+            next_activity_id: next?.activityId ?? undefined,
+        });
+        if (result && next) {
+            setDiscordData(next.discordData ?? null);
+            await startDiscordIfNeeded(next.discordData ?? null);
+        }
+        return result;
     };
 
     // -----------------------------------------------
     // 今走っているストップウォッチを完了し、すぐ次の計測を開始する
     // -----------------------------------------------
-    const finishAndReset = async (newDiscordData) => {
+    const finishAndReset = async (newDiscordData, nextActivityId = activityId) => {
         const memoSnapshot = memo;
-        let totalElapsed = await stopNow();
-        await handleStart(newDiscordData, true);
-        return { minutes: totalElapsed / 60000, memo: memoSnapshot };
+        const result = await stopOnServer({ memo: memoSnapshot, next_activity_id: nextActivityId });
+        const discordDataToUse = newDiscordData === undefined ? discordData : newDiscordData;
+        setDiscordData(discordDataToUse);
+        await startDiscordIfNeeded(discordDataToUse);
+        return { minutes: result?.value ?? 0, memo: memoSnapshot, result };
     };
 
     // -----------------------------------------------
     // 一時停止（Confirm用）
     // -----------------------------------------------
     const pause = async () => {
-        if (currentStartTime === null) return null;
-        const startTime = Number(currentStartTime);
-        if (!Number.isFinite(startTime)) return null;
-        const elapsed = Date.now() - startTime;
-        setDisplayTime(elapsed);
-        setPausedStartTime(startTime);
-        setCurrentStartTime(null);
-        persistStopwatchStateAndSync({
-            startTime: null,
-            pausedStartTime: startTime,
-            displayTime: elapsed,
-            memo
-        });
+        if (!session || session.is_paused) return null;
+        let paused;
+        try {
+            paused = (await pauseSession(slot)).session;
+            applySessionAndSync(paused, { syncMemo: false });
+        } catch (error) {
+            console.error('Failed to pause stopwatch session:', error);
+            await resyncFromServer();
+            return null;
+        }
         await stopDiscordIfNeeded();
-        return { minutes: elapsed / 60000, memo };
+        return { minutes: paused.elapsed_seconds / 60, memo };
     };
 
     // -----------------------------------------------
     // 再開
+    // countPaused=true（既定）の場合、一時停止していた間も経過時間に含める（確認ダイアログのキャンセル）
     // -----------------------------------------------
-    const resume = async () => {
-        if (currentStartTime !== null) return;
-        if (pausedStartTime !== null) {
-            const startTime = pausedStartTime;
-            const nextDisplayTime = Date.now() - startTime;
-            setCurrentStartTime(startTime);
-            setPausedStartTime(null);
-            setDisplayTime(nextDisplayTime);
-            persistStopwatchStateAndSync({
-                startTime,
-                pausedStartTime: null,
-                displayTime: nextDisplayTime,
-                memo
-            });
-            await startDiscordIfNeeded(discordData);
+    const resume = async (countPaused = true) => {
+        if (!session || !session.is_paused) return;
+        try {
+            const data = await resumeSession(slot, countPaused);
+            applySessionAndSync(data.session, { syncMemo: false });
+        } catch (error) {
+            console.error('Failed to resume stopwatch session:', error);
+            await resyncFromServer();
             return;
         }
-        const startTime = Date.now() - displayTime;
-        setCurrentStartTime(startTime);
-        setPausedStartTime(null);
-        persistStopwatchStateAndSync({
-            startTime,
-            pausedStartTime: null,
-            displayTime,
-            memo
-        });
         await startDiscordIfNeeded(discordData);
     };
 
+    // -----------------------------------------------
+    // レコードを書かずに計測を破棄
+    // -----------------------------------------------
+    const discard = async () => {
+        flushMemoTimer();
+        await stopDiscordIfNeeded();
+        try {
+            await cancelSession(slot);
+        } catch (error) {
+            if (error.status !== 404) console.error('Failed to cancel stopwatch session:', error);
+        }
+        applySessionAndSync(null);
+    };
+
     // -----------------------------------------------
     // 完全リセット（Confirm保存後など）
     // -----------------------------------------------
     const reset = async () => {
-        await stopNow();
+        await discard();
     };
 
     // -----------------------------------------------
     // キャンセル
     // -----------------------------------------------
     const cancel = async () => {
-        await stopNow();
+        await discard();
         if (onCancel) onCancel();
     };
 
@@ -296,26 +401,36 @@ function useStopwatch(storageKey, initialDiscordData, { onComplete, onCancel })
         if (newStartTime > Date.now()) {
             throw new Error("Start time cannot be in the future");
         }
-        setCurrentStartTime(newStartTime);
-        setPausedStartTime(null);
-        // 表示用の経過時間を計算
-        const elapsed = Date.now() - newStartTime;
-        setDisplayTime(elapsed);
-        persistStopwatchStateAndSync({
-            startTime: newStartTime,
-            pausedStartTime: null,
-            displayTime: elapsed,
-            memo
-        });
+        if (!session) return;
+        updateSession(slot, { started_at: new Date(newStartTime).toISOString() })
+            .then((data) => applySessionAndSync(data.session, { syncMemo: false }))
+            .catch((error) => {
+                console.error('Failed to update start time:', error);
+                resyncFromServer();
+            });
+    };
+
+    // -----------------------------------------------
+    // メモの変更（入力が落ち着いてからサーバーに保存する）
+    // -----------------------------------------------
+    const setMemo = (value) => {
+        setMemoState(value);
+        if (!session) return;
+        flushMemoTimer();
+        memoTimerRef.current = setTimeout(() => {
+            memoTimerRef.current = null;
+            updateSession(slot, { memo: value })
+                .then(() => notifyStopwatchSync())
+                .catch((error) => console.error('Failed to save memo:', error));
+        }, MEMO_SAVE_DELAY_MS);
     };
 
-    const isRunning = (currentStartTime !== null);
-    const displayStartTime = currentStartTime ?? pausedStartTime;
     return {
         displayTime,       // 現在の経過時間（ms）
         isRunning,         // 動作中かどうか
         start: handleStart,// 手動で開始するため
         complete,          // 完了処理
+        completeWith,      // 編集した値で完了
         cancel,            // キャンセル処理
         pause,             // 一時停止
         resume,            // 再開
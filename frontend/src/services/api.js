@@ -100,7 +100,7 @@ export async function deleteActivity(activityId) {
 
 
 export async function fetchRecords() {
-    const response = await fetch('/api/records');
+    const response = await fetch('/api/records?all=1');
     if (!response.ok) {
         throw new Error('Failed to fetch records');
     }
@@ -144,6 +144,27 @@ export async function deleteRecord(recordId) {
     return response.json();
 }
 
+/**
+ * 複数のレコードの作成・更新・削除を1つのトランザクションで適用
+ * 不正な操作が1つでもあれば何も変更されず、error.results に操作ごとの結果が入る
+ * @param {Array} operations - [{ op: 'create', activity_id, value, created_at?, memo? }
+ *   | { op: 'update', id, activity_id?, value?, created_at?, memo? } | { op: 'delete', id }]
+ */
+export async function batchRecords(operations) {
+    const response = await fetch('/api/records/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ operations }),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        const error = new Error(data.error || 'Failed to apply record batch');
+        error.results = data.results;
+        throw error;
+    }
+    return data;
+}
+
 export async function startDiscordPresence(data) {
     // data はオブジェクトで、以下のキーを含むことを想定：
     // { group, activity_name, details, asset_key }
@@ -259,4 +280,77 @@ export async function setActivityTags(activityId, tagIds) {
         throw new Error(`Failed to set tags for activity (id=${activityId}): ${response.statusText}`);
     }
     return response.json();
-}
\ No newline at end of file
+}
+/**
+ * 計測中のセッション（ストップウォッチ）の一覧を取得
+ * @returns {Promise<{ now: string, sessions: Object[] }>}
+ */
+export async function fetchSessions() {
+    const response = await fetch('/api/sessions');
+    if (!response.ok) {
+        throw new Error(`Failed to fetch sessions: ${response.statusText}`);
+    }
+    return response.json();
+}
+
+async function sessionRequest(url, method, body) {
+    const response = await fetch(url, {
+        method,
+        headers: { 'Content-Type': 'application/json' },
+        body: body === undefined ? undefined : JSON.stringify(body),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        const error = new Error(data.error || `Session request failed: ${response.statusText}`);
+        error.status = response.status;
+        throw error;
+    }
+    return data;
+}
+
+/**
+ * 計測を開始
+ * @param {Object} data - { slot: 'main'|'sub', activity_id: number, started_at?: string, memo?: string }
+ */
+export async function startSession(data) {
+    return sessionRequest('/api/sessions', 'POST', data);
+}
+
+/**
+ * 計測中のセッションを変更
+ * @param {string} slot
+ * @param {Object} data - { activity_id?, started_at?, memo? }
+ */
+export async function updateSession(slot, data) {
+    return sessionRequest(`/api/sessions/${slot}`, 'PUT', data);
+}
+
+export async function pauseSession(slot) {
+    return sessionRequest(`/api/sessions/${slot}/pause`, 'POST', {});
+}
+
+/**
+ * 一時停止を解除
+ * @param {string} slot
+ * @param {boolean} countPaused - 一時停止していた間も経過時間に含める場合は true
+ */
+export async function resumeSession(slot, countPaused = false) {
+    return sessionRequest(`/api/sessions/${slot}/resume`, 'POST', { count_paused: countPaused });
+}
+
+/**
+ * 計測を終了してレコードを書き込む（サーバー側で1トランザクション）
+ * @param {string} slot
+ * @param {Object} data - { activity_id?, value?, created_at?, memo?, merge?, next_activity_id? }
+ */
+export async function stopSession(slot, data = {}) {
+    return sessionRequest(`/api/sessions/${slot}/stop`, 'POST', data);
+}
+
+/**
+ * レコードを書かずに計測を破棄
+ * @param {string} slot
+ */
+export async function cancelSession(slot) {
+    return sessionRequest(`/api/sessions/${slot}`, 'DELETE');
+}
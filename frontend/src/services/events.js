@@ -0,0 +1,58 @@
+// /api/events（Server-Sent Events）の購読
+//
+// EventSource はアプリ全体で1つだけ開き、購読者がいなくなったら閉じる。
+// 切断されてもブラウザが最後に受け取ったイベントIDを Last-Event-ID として送って再接続し、
+// サーバーはその続きから再送する。再送できない場合は 'reset' が届くので、購読者は一覧を取得し直すこと。
+
+const EVENT_TYPES = ['record', 'activity', 'tag', 'group', 'session', 'presence', 'reset'];
+
+const listeners = new Set();
+let source = null;
+
+const dispatch = (message) => {
+    let event;
+    try {
+        event = JSON.parse(message.data);
+    } catch (error) {
+        console.error('Invalid server event:', error);
+        return;
+    }
+    listeners.forEach(({ types, handler }) => {
+        if (event.type === 'reset' || types.includes(event.type)) {
+            handler(event);
+        }
+    });
+};
+
+const open = () => {
+    if (source || typeof EventSource === 'undefined') return;
+    source = new EventSource('/api/events');
+    EVENT_TYPES.forEach((type) => source.addEventListener(type, dispatch));
+};
+
+const close = () => {
+    if (!source) return;
+    source.close();
+    source = null;
+};
+
+/**
+ * types（'record' など）のイベントを購読する。handler は {type, action, data} を受け取る。
+ * 'reset' はすべての購読者に届く。戻り値は購読を解除する関数。
+ */
+export function subscribeServerEvents(types, handler) {
+    const listener = { types, handler };
+    listeners.add(listener);
+    open();
+    return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0) close();
+    };
+}
+
+/**
+ * 変更通知を受け取れる状態か。受け取れない間は、変更後に自分で一覧を取得し直す必要がある。
+ */
+export function isServerEventsConnected() {
+    return Boolean(source) && source.readyState === EventSource.OPEN;
+}
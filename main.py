@@ -1,25 +1,61 @@
 # main.py
+import sys
+
+# 起動時間の計測の基準（STARTED_AT）を持つので最初に import する
+import startup_profile
+from startup_profile import elapsed_ms, phase
+
+# --profile-startup: import と起動の各段階の所要時間を表示する
+PROFILE_STARTUP = '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    startup_profile.enable()
+
 import socket
 import threading
 import time
-import webview
-import webbrowser
-from flask_migrate import upgrade
-from backend.app import create_app, db
 import os
 
+# webview とバックエンド（Flask / SQLAlchemy）は重いので、使う直前に import する。
+# バックエンドの import はサーバースレッドで行い、webview の import と並行させる。
+
+# バックエンドの準備完了を待つ最大秒数（超えた場合はそのままウィンドウを開く）
+BACKEND_READY_TIMEOUT = 60
+# first-contentful-paint を取得できるまで待つ最大秒数
+FIRST_PAINT_TIMEOUT = 10
+
+
 def apply_all_migrations(app):
     """
-    Alembicのマイグレーションを常に実行し、
     既存DBがあればアップグレードし、空DBならテーブルを作成する。
+    DB がすでに最新のリビジョンなら Alembic は実行しない（backend/app/schema.py を参照）。
     """
+    from backend.app.schema import apply_migrations
+
     migrations_dir = os.path.join(os.path.dirname(__file__), "backend", "migrations")
-    with app.app_context():
-        try:
-            upgrade(directory=migrations_dir)
+    try:
+        if apply_migrations(app, migrations_dir):
             print("[apply_all_migrations] DB is now up-to-date.")
-        except Exception as e:
-            print(f"[apply_all_migrations] Migration failed: {e}")
+        else:
+            print("[apply_all_migrations] DB is already at head; skipped Alembic.")
+    except Exception as e:
+        print(f"[apply_all_migrations] Migration failed: {e}")
+
+
+def start_rollup_sync(app):
+    """
+    ROLLUP_TIMEZONE が daily_rollup を作ったときと変わっていれば、バックグラウンドで作り直す。
+    作り直しが終わるまでの間、/api/stats は records から直接集計するので起動は待たせない。
+    """
+    def run():
+        from backend.app.rollup import sync_rollup_timezone
+        with app.app_context():
+            try:
+                if sync_rollup_timezone():
+                    print(f"[rollup] Rebuilt daily_rollup for {app.config['ROLLUP_TIMEZONE']}.")
+            except Exception as e:
+                print(f"[rollup] Rebuilding daily_rollup failed: {e}")
+
+    threading.Thread(target=run, name='rollup-sync', daemon=True).start()
 
 
 def find_free_port(preferred_port=5180):
@@ -46,11 +82,49 @@ def find_free_port(preferred_port=5180):
         s2.close()
         return port
 
-def run_flask(port):
-    app = create_app()
-    apply_all_migrations(app)
+def run_flask(port, ready):
+    """
+    マイグレーションを適用してソケットを bind した時点で ready をセットし、配信を開始する。
+    """
+    with phase('import backend'):
+        from backend.app import create_app
+        from backend.app.server import create_server
+    with phase('app factory'):
+        app = create_app({'LAZY_MIGRATE': True})
+    for name, duration in app.extensions.get('startup_phases', []):
+        startup_profile.record_phase(f'app factory / {name}', duration)
+    with phase('migration'):
+        apply_all_migrations(app)
+    start_rollup_sync(app)
     print(app.instance_path)
-    app.run(host='127.0.0.1', port=port)
+    # 既定は waitress。CHRONOLOFT_SERVER=werkzeug で開発サーバーに切り替え
+    with phase('server bind'):
+        server = create_server(app, host='127.0.0.1', port=port)
+    ready.set()
+    server.run()
+
+
+def report_first_paint(window):
+    """
+    ページの読み込み完了後に first-contentful-paint を取得し、起動からの経過時間を表示する。
+    """
+    loaded_ms = elapsed_ms()
+    print(f"[startup] window loaded at {loaded_ms:.0f} ms")
+    deadline = time.perf_counter() + FIRST_PAINT_TIMEOUT
+    while time.perf_counter() < deadline:
+        # performance.now() 基準の FCP を、起動からの経過時間に換算する
+        paint = window.evaluate_js(
+            "(() => { const e = performance.getEntriesByName('first-contentful-paint')[0];"
+            " return e ? performance.now() - e.startTime : null; })()"
+        )
+        if paint is not None:
+            print(f"[startup] first contentful paint at {elapsed_ms() - paint:.0f} ms")
+            break
+        time.sleep(0.1)
+    else:
+        print("[startup] first contentful paint was not reported")
+    if PROFILE_STARTUP:
+        print(startup_profile.report())
     
 class ApiBridge:
     def __init__(self, app_url):
@@ -58,6 +132,7 @@ class ApiBridge:
 
     def open_in_browser(self):
         """外部ブラウザでself.app_urlを開く"""
+        import webbrowser
         webbrowser.open(self.app_url)
 
 if __name__ == '__main__':
@@ -66,20 +141,36 @@ if __name__ == '__main__':
     app_url = f"http://127.0.0.1:{port}"
 
     # Flask サーバーを別スレッドで起動
-    flask_thread = threading.Thread(target=run_flask, args=(port,))
+    backend_ready = threading.Event()
+    flask_thread = threading.Thread(target=run_flask, args=(port, backend_ready))
     flask_thread.daemon = True  # メインスレッド終了時に自動終了
     flask_thread.start()
 
-    # Flask サーバーが起動するまで少し待つ（必要に応じて調整）
-    time.sleep(2)
+    with phase('import webview'):
+        import webview
+
+    # マイグレーションが終わりリクエストを受け付けられるようになるまで待つ
+    # （起動に失敗してスレッドが終了した場合は待たない）
+    deadline = time.perf_counter() + BACKEND_READY_TIMEOUT
+    while not backend_ready.wait(0.05):
+        if not flask_thread.is_alive() or time.perf_counter() > deadline:
+            break
+    if backend_ready.is_set():
+        print(f"[startup] backend ready at {elapsed_ms():.0f} ms")
+    else:
+        print("[startup] backend failed to start; opening the window anyway")
 
     # PyWebViewでローカルのFlaskアプリを表示
     api = ApiBridge(app_url)
-    webview.create_window(
+    startup_profile.record_phase('backend ready (since process start)', elapsed_ms())
+    window = webview.create_window(
         title="Chronoloft",
         url=app_url,
         js_api=api,   # フロントエンドから呼び出すAPIを登録
         width=900,
         height=600,
     )
+    window.events.loaded += lambda: threading.Thread(
+        target=report_first_paint, args=(window,), daemon=True
+    ).start()
     webview.start()
\ No newline at end of file
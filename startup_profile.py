@@ -0,0 +1,88 @@
+# startup_profile.py
+"""
+main.py --profile-startup 用の簡易プロファイラ。
+
+enable() 以降の import を builtins.__import__ をフックして計測し、
+トップレベルのパッケージごとの所要時間（自身のみ。中で import した別パッケージの時間は除く）を集計する。
+main.py の各段階の所要時間は phase() で記録する。
+"""
+import builtins
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+STARTED_AT = time.perf_counter()
+
+_original_import = builtins.__import__
+_import_self_ms = defaultdict(float)
+_phases = []
+_local = threading.local()
+_enabled = False
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    top = name.partition('.')[0]
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    # 相対 import、読み込み済みのモジュール、同じパッケージ内の import は外側の計測に含める
+    if level or name in sys.modules or any(frame[0] == top for frame in stack):
+        return _original_import(name, globals, locals, fromlist, level)
+
+    frame = [top, 0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        stack.pop()
+        _import_self_ms[top] += elapsed - frame[1]
+        if stack:
+            stack[-1][1] += elapsed
+
+
+def enable():
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        builtins.__import__ = _timed_import
+
+
+def is_enabled():
+    return _enabled
+
+
+def elapsed_ms():
+    return (time.perf_counter() - STARTED_AT) * 1000
+
+
+def record_phase(name, duration_ms, thread_name=None):
+    if _enabled:
+        _phases.append((name, duration_ms, thread_name or threading.current_thread().name))
+
+
+@contextmanager
+def phase(name):
+    """with phase('...'): の区間の所要時間を記録する（無効時は何もしない）。"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, (time.perf_counter() - start) * 1000)
+
+
+def report(top_imports=15):
+    lines = ['[profile-startup] phases:']
+    for name, duration, thread_name in _phases:
+        lines.append(f"  {duration:8.1f} ms  {name}  ({thread_name})")
+    total_import = sum(_import_self_ms.values())
+    lines.append(f"[profile-startup] imports: {total_import:.1f} ms total (self time per top-level package)")
+    for top, duration in sorted(_import_self_ms.items(), key=lambda item: item[1], reverse=True)[:top_imports]:
+        lines.append(f"  {duration:8.1f} ms  {top}")
+    return '\n'.join(lines)
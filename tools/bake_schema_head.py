@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Alembic の head リビジョンを backend/migrations/schema_head.json に書き出す。
+
+起動時はこの値と DB の alembic_version を比べ、一致すれば Alembic を実行しない（backend/app/schema.py）。
+マイグレーションを追加したら、このスクリプトを実行し直すこと（ビルド時にも自動で実行される）。
+
+    python tools/bake_schema_head.py
+"""
+import argparse
+import json
+import os
+import sys
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, 'backend', 'migrations')
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+from app.schema import SCHEMA_HEAD_FILE  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    config = Config(os.path.join(MIGRATIONS_DIR, 'alembic.ini'))
+    config.set_main_option('script_location', MIGRATIONS_DIR)
+    script = ScriptDirectory.from_config(config)
+    heads = script.get_heads()
+    if len(heads) != 1:
+        sys.exit(f"Expected a single head revision, found {heads}")
+    revision_count = sum(1 for _ in script.walk_revisions())
+
+    path = os.path.join(MIGRATIONS_DIR, SCHEMA_HEAD_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'head': heads[0], 'revision_count': revision_count}, f, indent=2)
+        f.write('\n')
+    print(f"Baked schema head {heads[0]} ({revision_count} revisions) into {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+アクティビティ一覧のレイテンシをレコード件数ごとに計測するベンチマーク。
+
+各件数について head の一時DBを作成し、次の5つを計測する。
+
+- no index: 以前の一覧クエリ（record を外部結合して GROUP BY で最新日時を求める）を、
+  record / activity_tags のインデックスを削除した状態で実行
+- index: 同じクエリをインデックスがある状態で実行
+- head: 非正規化した Activity.last_record_at で並べ替えるクエリ
+- api: GET /api/activities をテストクライアントから呼んだ時間（シリアライズ等を含む）
+- api no index: 同じリクエストをインデックスを削除した状態で実行
+
+どちらのクエリも固定の SQL として持っているので、エンドポイントの実装が変わっても比較の条件は変わらない。
+api の2列は現在のエンドポイントの実装をそのまま計測する。
+
+    python tools/bench_activities.py --sizes 10000 100000 1000000
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, 'migrations')
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from app import create_app, db  # noqa: E402
+
+# last_record_at を非正規化する前の一覧クエリ
+LEGACY_QUERY = text(
+    "SELECT activity.id, MAX(record.created_at) AS last_record "
+    "FROM activity LEFT OUTER JOIN record ON record.activity_id = activity.id "
+    "GROUP BY activity.id ORDER BY last_record DESC"
+)
+# 非正規化した後の一覧クエリ
+HEAD_QUERY = text("SELECT id, last_record_at FROM activity ORDER BY last_record_at DESC")
+# 8a1a9aa1a8a7 で追加したインデックス
+RECORD_INDEXES = ('ix_record_activity_id_created_at', 'ix_record_created_at', 'ix_activity_tags_tag_id')
+NUM_GROUPS = 3
+NUM_ACTIVITIES = 30
+NUM_TAGS = 5
+
+
+def seed(db_path, num_records):
+    """sqlite3 で直接ダミーデータを投入する（ORM を通すと遅すぎるため）。"""
+    conn = sqlite3.connect(db_path)
+    now = datetime.datetime(2026, 1, 1)
+    conn.executemany(
+        "INSERT INTO activity_group (id, name, position) VALUES (?, ?, ?)",
+        [(i, f"group{i}", i) for i in range(1, NUM_GROUPS + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO tag (id, name, color) VALUES (?, ?, ?)",
+        [(i, f"tag{i}", '#ffffff') for i in range(1, NUM_TAGS + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO activity (id, is_active, name, unit, created_at, group_id) VALUES (?, 1, ?, ?, ?, ?)",
+        [
+            (i, f"activity{i}", 'MINUTES' if i % 4 else 'COUNT', now.isoformat(' '), i % NUM_GROUPS + 1)
+            for i in range(1, NUM_ACTIVITIES + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO activity_tags (activity_id, tag_id) VALUES (?, ?)",
+        [(i, i % NUM_TAGS + 1) for i in range(1, NUM_ACTIVITIES + 1)],
+    )
+    rng = random.Random(0)
+    span_minutes = 5 * 365 * 24 * 60
+    conn.executemany(
+        "INSERT INTO record (activity_id, value, created_at) VALUES (?, ?, ?)",
+        (
+            (
+                rng.randint(1, NUM_ACTIVITIES),
+                rng.randint(1, 180),
+                (now - datetime.timedelta(minutes=rng.randint(0, span_minutes))).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            )
+            for _ in range(num_records)
+        ),
+    )
+    conn.execute(
+        "UPDATE activity SET last_record_at = "
+        "(SELECT MAX(created_at) FROM record WHERE record.activity_id = activity.id)"
+    )
+    conn.commit()
+    conn.close()
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_query(query):
+    rows = db.session.execute(query).all()
+    assert len(rows) == NUM_ACTIVITIES, len(rows)
+
+
+def run_endpoint(client):
+    response = client.get('/api/activities')
+    assert response.status_code == 200, response.status_code
+    assert len(response.get_json()) == NUM_ACTIVITIES
+
+
+def run(num_records, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        seed(db_path, num_records)
+        client = app.test_client()
+        api = median_ms(lambda: run_endpoint(client), repeat)
+        with app.app_context():
+            head = median_ms(lambda: run_query(HEAD_QUERY), repeat)
+            indexed = median_ms(lambda: run_query(LEGACY_QUERY), repeat)
+            for name in RECORD_INDEXES:
+                db.session.execute(text(f"DROP INDEX {name}"))
+            db.session.commit()
+            no_index = median_ms(lambda: run_query(LEGACY_QUERY), repeat)
+            db.session.remove()
+        api_no_index = median_ms(lambda: run_endpoint(client), repeat)
+        with app.app_context():
+            db.engine.dispose()
+    return no_index, indexed, head, api, api_no_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'records':>10} {'no index':>10} {'index':>10} {'head':>10} {'speedup':>8}"
+        f" {'api':>10} {'api no index':>13}   (ms)"
+    )
+    for size in args.sizes:
+        no_index, indexed, head, api, api_no_index = run(size, args.repeat)
+        print(
+            f"{size:>10} {no_index:>10.1f} {indexed:>10.1f} {head:>10.1f} {no_index / head:>7.1f}x"
+            f" {api:>10.1f} {api_no_index:>13.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
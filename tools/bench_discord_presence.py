@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""
+Discord 連携（/api/discord_presence/*）のレイテンシとスループットを計測するベンチマーク。
+
+tools/fake_discord_ipc.py のフェイクサーバーを一時ディレクトリの XDG_RUNTIME_DIR に立て、
+API を呼んでから SET_ACTIVITY がフェイクサーバーに届くまでの時間（end-to-end）と、
+API 自体が返るまでの時間（http）を計測する。
+
+- latency: start / update / stop を繰り返す。最初の start だけは新規接続（ハンドシェイクあり）
+- switching: アクティビティとグループを高速に切り替え続け、受け付けた req/s と
+  実際に Discord に送られた SET_ACTIVITY の数（まとめられた数）、最終状態が正しいかを確認する
+- reconnect: セッション中にフェイクサーバー側から切断し、次の update が届くまでの時間を計測する
+
+Discord のレート制限（20 秒に 5 回）はレイテンシの計測を妨げるので、既定では無効にする。
+
+    python tools/bench_discord_presence.py --repeat 20 --response-delay 0.005
+    python tools/bench_discord_presence.py --drop-rate 0.1 --handshake-failure-rate 0.2
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from bench_activities import MIGRATIONS_DIR, seed
+from fake_discord_ipc import FakeDiscordIPCServer, ipc_path
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app import discord_presence_manager  # noqa: E402
+from app.discord_presence_manager import PresenceWorker, RateLimiter  # noqa: E402
+
+GROUPS = {'group1': '1001', 'group2': '1002', 'group3': '1003'}
+TIMEOUT = 30.0
+
+
+def set_client_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "UPDATE activity_group SET client_id = ? WHERE name = ?",
+        [(client_id, name) for name, client_id in GROUPS.items()],
+    )
+    conn.commit()
+    conn.close()
+
+
+class Bench:
+    def __init__(self, client, server):
+        self.client = client
+        self.server = server
+
+    def call(self, action, group, details=None):
+        """API を呼び、(http ms, 呼び出し前の activities の位置, 呼び出し開始時刻) を返す。"""
+        since = len(self.server.activities)
+        start = time.perf_counter()
+        response = self.client.post(f'/api/discord_presence/{action}', json={
+            'group': group,
+            'activity_name': 'bench',
+            'details': details,
+            'asset_key': 'bench',
+        })
+        http_ms = (time.perf_counter() - start) * 1000
+        assert response.status_code == 202, (response.status_code, response.get_json())
+        return http_ms, since, start
+
+    def wait_details(self, group, details, since, start):
+        client_id = GROUPS[group]
+        received_at = self.server.wait_for_activity(
+            lambda cid, activity: cid == client_id and activity and activity.get('details') == details,
+            timeout=TIMEOUT, since=since,
+        )
+        return None if received_at is None else (received_at - start) * 1000
+
+    def wait_cleared(self, group, since, start):
+        client_id = GROUPS[group]
+        received_at = self.server.wait_for_activity(
+            lambda cid, activity: cid == client_id and activity is None, timeout=TIMEOUT, since=since,
+        )
+        return None if received_at is None else (received_at - start) * 1000
+
+    def wait_idle(self):
+        deadline = time.perf_counter() + TIMEOUT
+        while time.perf_counter() < deadline:
+            status = self.client.get('/api/discord_presence/status').get_json()
+            if not status['pending'] and status['state'] in ('idle', 'connected'):
+                return status
+            time.sleep(0.005)
+        return self.client.get('/api/discord_presence/status').get_json()
+
+
+def summarize(name, http_ms, e2e_ms):
+    received = [value for value in e2e_ms if value is not None]
+    lost = len(e2e_ms) - len(received)
+    if not received:
+        print(f"{name:>14} {statistics.median(http_ms):>10.2f} {'-':>10} {'-':>10} {lost:>5}")
+        return
+    received.sort()
+    p95 = received[min(len(received) - 1, int(len(received) * 0.95))]
+    print(f"{name:>14} {statistics.median(http_ms):>10.2f} {statistics.median(received):>10.2f} "
+          f"{p95:>10.2f} {lost:>5}")
+
+
+def run_latency(bench, repeat):
+    results = {'start (cold)': ([], []), 'start (warm)': ([], []), 'update': ([], []), 'stop': ([], [])}
+    started = set()
+    names = list(GROUPS)
+    for i in range(repeat):
+        group = names[i % len(names)]
+        details = f'latency-{i}'
+        http_ms, since, start = bench.call('start', group, details)
+        key = 'start (warm)' if group in started else 'start (cold)'
+        started.add(group)
+        results[key][0].append(http_ms)
+        results[key][1].append(bench.wait_details(group, details, since, start))
+
+        details = f'latency-{i}-update'
+        http_ms, since, start = bench.call('update', group, details)
+        results['update'][0].append(http_ms)
+        results['update'][1].append(bench.wait_details(group, details, since, start))
+
+        http_ms, since, start = bench.call('stop', group)
+        results['stop'][0].append(http_ms)
+        results['stop'][1].append(bench.wait_cleared(group, since, start))
+        bench.wait_idle()
+
+    print(f"{'operation':>14} {'http p50':>10} {'e2e p50':>10} {'e2e p95':>10} {'lost':>5}   (ms)")
+    for name, (http_ms, e2e_ms) in results.items():
+        if http_ms:
+            summarize(name, http_ms, e2e_ms)
+
+
+def run_switching(bench, switches):
+    names = list(GROUPS)
+    group = names[0]
+    sent_before = len(bench.server.activities)
+    start = time.perf_counter()
+    bench.call('start', group, 'switch-0')
+    last_details = 'switch-0'
+    for i in range(1, switches):
+        if i % 10 == 0:
+            # 10 回に 1 回はグループ（client_id）ごと切り替える
+            bench.call('stop', group)
+            group = names[(names.index(group) + 1) % len(names)]
+            last_details = f'switch-{i}'
+            bench.call('start', group, last_details)
+        else:
+            last_details = f'switch-{i}'
+            bench.call('update', group, last_details)
+    http_elapsed = time.perf_counter() - start
+    settled_ms = bench.wait_details(group, last_details, sent_before, start)
+    status = bench.wait_idle()
+    # 最後に届いた SET_ACTIVITY が最後に要求した状態であること（途中の状態で止まっていないこと）
+    _, final_client_id, final_activity = bench.server.activities[-1]
+    correct = final_client_id == GROUPS[group] and (final_activity or {}).get('details') == last_details
+    received = len(bench.server.activities) - sent_before
+    bench.call('stop', group)
+    bench.wait_idle()
+
+    settled = f"{settled_ms:.1f} ms" if settled_ms is not None else 'never'
+    print(f"switches: {switches}, accepted {switches / http_elapsed:.0f} req/s, final state arrived after {settled}")
+    print(f"SET_ACTIVITY received: {received} (coalesced commands: {status['coalesced']}), "
+          f"final state correct: {correct}")
+
+
+def run_reconnect(bench, repeat):
+    group = list(GROUPS)[0]
+    http_ms, since, start = bench.call('start', group, 'reconnect-start')
+    bench.wait_details(group, 'reconnect-start', since, start)
+    http_list = []
+    e2e_list = []
+    for i in range(repeat):
+        bench.server.disconnect_all()
+        details = f'reconnect-{i}'
+        http_ms, since, start = bench.call('update', group, details)
+        http_list.append(http_ms)
+        e2e_list.append(bench.wait_details(group, details, since, start))
+    bench.call('stop', group)
+    bench.wait_idle()
+    print(f"{'operation':>14} {'http p50':>10} {'e2e p50':>10} {'e2e p95':>10} {'lost':>5}   (ms)")
+    summarize('update (drop)', http_list, e2e_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--switches', type=int, default=500)
+    parser.add_argument('--handshake-delay', type=float, default=0.0)
+    parser.add_argument('--response-delay', type=float, default=0.0)
+    parser.add_argument('--handshake-failure-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', action='store_true', help='Discord のレート制限（20 秒に 5 回）を有効にする')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # pypresence は XDG_RUNTIME_DIR 以下の discord-ipc-N に接続する
+        os.environ['XDG_RUNTIME_DIR'] = tmp_dir
+        server = FakeDiscordIPCServer(
+            ipc_path(tmp_dir),
+            handshake_delay=args.handshake_delay,
+            response_delay=args.response_delay,
+            handshake_failure_rate=args.handshake_failure_rate,
+            drop_rate=args.drop_rate,
+            error_rate=args.error_rate,
+        )
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        seed(db_path, 0)
+        set_client_ids(db_path)
+
+        rate_limiter = None if args.rate_limit else RateLimiter(max_calls=10 ** 9, period=1.0)
+        worker = discord_presence_manager._worker = PresenceWorker(rate_limiter=rate_limiter)
+        bench = Bench(app.test_client(), server)
+        try:
+            print("== latency ==")
+            run_latency(bench, args.repeat)
+            print("== switching ==")
+            run_switching(bench, args.switches)
+            print("== reconnect after Discord drops the connection ==")
+            run_reconnect(bench, args.repeat)
+            status = bench.client.get('/api/discord_presence/status').get_json()
+            print(f"handshakes: {server.handshakes}, pool: {status['pool']}, "
+                  f"updates_sent: {status['updates_sent']}, last_error: {status['last_error']}")
+        finally:
+            worker.shutdown()
+            server.close()
+            with app.app_context():
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
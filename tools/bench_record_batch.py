@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+レコードの一括変更（POST /api/records/batch）と、1件ずつの PUT / DELETE /api/records/<id> を比較するベンチマーク。
+
+同じ件数のレコードを「アクティビティの付け替え（更新）」と「削除」で変更し、所要時間を比べる。
+最後に daily_rollup を作り直して、一括変更で差分更新した集計と一致するかを確認する。
+
+    python tools/bench_record_batch.py --records 100000 --sizes 10 100 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_activities import MIGRATIONS_DIR, NUM_ACTIVITIES, seed
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import DailyRollup, Record  # noqa: E402
+from app.rollup import rebuild_daily_rollup  # noqa: E402
+
+
+def pick_ids(app, count, offset=0):
+    with app.app_context():
+        return [row.id for row in Record.query.order_by(Record.id).offset(offset).limit(count)]
+
+
+def run_single(client, ids, activity_id):
+    start = time.perf_counter()
+    for record_id in ids:
+        response = client.put(f'/api/records/{record_id}', json={'activity_id': activity_id})
+        assert response.status_code == 200, response.get_json()
+    update_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for record_id in ids:
+        response = client.delete(f'/api/records/{record_id}')
+        assert response.status_code == 200, response.get_json()
+    delete_ms = (time.perf_counter() - start) * 1000
+    return update_ms, delete_ms
+
+
+def run_batch(client, ids, activity_id):
+    start = time.perf_counter()
+    response = client.post('/api/records/batch', json={
+        'operations': [{'op': 'update', 'id': record_id, 'activity_id': activity_id} for record_id in ids],
+    })
+    assert response.status_code == 200, response.get_json()
+    update_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    response = client.post('/api/records/batch', json={
+        'operations': [{'op': 'delete', 'id': record_id} for record_id in ids],
+    })
+    assert response.status_code == 200, response.get_json()
+    delete_ms = (time.perf_counter() - start) * 1000
+    return update_ms, delete_ms
+
+
+def rollup_rows():
+    return {
+        (row.tz, row.local_date, row.activity_id, row.unit): (round(row.minutes, 6), round(row.count, 6), row.record_count)
+        for row in DailyRollup.query
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        seed(db_path, args.records)
+        with app.app_context():
+            rebuild_daily_rollup()
+            db.session.commit()
+        client = app.test_client()
+
+        print(f"{'records':>8} {'single update':>14} {'batch update':>13} {'single delete':>14} {'batch delete':>13}   (ms)")
+        for size in args.sizes:
+            activity_id = size % NUM_ACTIVITIES + 1
+            # 計測ごとに削除するので、先頭から取れば毎回まだ変更していないレコードになる
+            single_ids = pick_ids(app, size)
+            batch_ids = pick_ids(app, size, offset=size)
+            single_update, single_delete = run_single(client, single_ids, activity_id)
+            batch_update, batch_delete = run_batch(client, batch_ids, activity_id)
+            print(f"{size:>8} {single_update:>14.1f} {batch_update:>13.1f} {single_delete:>14.1f} {batch_delete:>13.1f}")
+
+        with app.app_context():
+            incremental = rollup_rows()
+            rebuild_daily_rollup()
+            db.session.commit()
+            rebuilt = rollup_rows()
+        print(f"daily_rollup matches a full rebuild: {incremental == rebuilt}")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+/api/records?all=1 相当のシリアライズ時間を計測するベンチマーク。
+
+次の方式について、DBからの読み込み・辞書の組み立て・JSONエンコードの合計時間を比べる。
+
+  orm+json      ORM インスタンス + リレーションの遅延読み込み + isoformat() + 標準 json
+                （メタデータキャッシュ導入前の GET /api/records の処理をそのまま再現した基準）
+  orm+cache     ORM インスタンス + メタデータキャッシュ（app.metadata_cache）+ 標準 json
+  tuple+json    列タプル + 標準 json
+  tuple+orjson  列タプル + orjson（app.json_provider の既定）
+  columnar      列指向形式（?format=columnar）+ orjson
+
+parse 列はクライアント側の JSON パース時間の目安として json.loads にかかった時間。
+
+    python tools/bench_serialization.py --records 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from bench_activities import MIGRATIONS_DIR, seed
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app import json_provider  # noqa: E402
+from app.metadata_cache import get_metadata  # noqa: E402
+from app.models import Record  # noqa: E402
+from app.queries import record_list_query  # noqa: E402
+from app.serializers import serialize_records, serialize_records_columnar  # noqa: E402
+
+
+def legacy_serialize_record(rec):
+    """メタデータキャッシュ導入前の GET /api/records と同じ処理（アクティビティ・グループ・タグをリレーションから引く）。"""
+    tag_list = []
+    if rec.activity and rec.activity.tags:
+        tag_list = [{
+            "id": t.id,
+            "name": t.name,
+            "color": t.color
+        } for t in rec.activity.tags]
+    return {
+        'id': rec.id,
+        'activity_id': rec.activity_id,
+        'value': rec.value,
+        'created_at': rec.created_at.isoformat(),
+        'unit': rec.activity.unit.value if rec.activity and rec.activity.unit else None,
+        'activity_name': rec.activity.name if rec.activity else None,
+        'activity_group': rec.activity.group.name if rec.activity and rec.activity.group else None,
+        'activity_group_id': rec.activity.group_id if rec.activity else None,
+        'tags': tag_list,
+        'memo': rec.memo
+    }
+
+
+def cached_serialize_record(rec, metadata):
+    activity = metadata.activities.get(rec.activity_id)
+    return {
+        'id': rec.id,
+        'activity_id': rec.activity_id,
+        'value': rec.value,
+        'created_at': rec.created_at.isoformat(),
+        'unit': activity['unit'] if activity else None,
+        'activity_name': activity['name'] if activity else None,
+        'activity_group': metadata.group_name(activity['group_id']) if activity else None,
+        'activity_group_id': activity['group_id'] if activity else None,
+        'tags': metadata.activity_tags(rec.activity_id),
+        'memo': rec.memo
+    }
+
+
+def dumps_legacy(records):
+    # 当時の jsonify（Flask の既定の JSON プロバイダ）と同じ設定
+    return json.dumps(records, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def run_orm_json(app):
+    return dumps_legacy([legacy_serialize_record(rec) for rec in Record.query.all()])
+
+
+def run_orm_cache(app):
+    metadata = get_metadata()
+    return dumps_legacy([cached_serialize_record(rec, metadata) for rec in Record.query.all()])
+
+
+def run_tuple(app):
+    rows = serialize_records(db.session.execute(record_list_query()), get_metadata())
+    return app.json.response(rows).get_data()
+
+
+def run_columnar(app):
+    body = serialize_records_columnar(db.session.execute(record_list_query()), get_metadata())
+    return app.json.response(body).get_data()
+
+
+def measure(app, fn, repeat):
+    timings = []
+    parse_timings = []
+    for _ in range(repeat):
+        with app.app_context():
+            start = time.perf_counter()
+            data = fn(app)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.remove()
+        start = time.perf_counter()
+        json.loads(data)
+        parse_timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), statistics.median(parse_timings), len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        seed(db_path, args.records)
+
+        orjson = json_provider.orjson
+        results = [
+            ('orm+json', measure(app, run_orm_json, args.repeat)),
+            ('orm+cache', measure(app, run_orm_cache, args.repeat)),
+        ]
+        json_provider.orjson = None
+        results.append(('tuple+json', measure(app, run_tuple, args.repeat)))
+        json_provider.orjson = orjson
+        if orjson is not None:
+            results.append(('tuple+orjson', measure(app, run_tuple, args.repeat)))
+        results.append(('columnar', measure(app, run_columnar, args.repeat)))
+
+        with app.app_context():
+            db.engine.dispose()
+
+    baseline = results[0][1][0]
+    print(f"records: {args.records}")
+    print(f"{'method':>14} {'time (ms)':>10} {'speedup':>8} {'parse (ms)':>11} {'bytes':>12}")
+    for name, (elapsed, parse, size) in results:
+        print(f"{name:>14} {elapsed:>10.1f} {baseline / elapsed:>7.1f}x {parse:>11.1f} {size:>12}")
+
+
+if __name__ == '__main__':
+    main()
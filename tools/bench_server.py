@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+WSGI サーバーの種類ごとのスループットを比較する負荷テスト。
+
+一時DBを作ってサーバーをスレッドで起動し、複数のクライアントスレッドから
+keep-alive 接続で一定時間リクエストを送り続けて、req/s とレイテンシを計測する。
+
+    python tools/bench_server.py --clients 1 8 32 --duration 5
+"""
+import argparse
+import http.client
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from bench_activities import MIGRATIONS_DIR, seed
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.server import SERVER_MODES, create_server  # noqa: E402
+
+
+def client_loop(port, path, deadline, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+
+def run_load(port, path, clients, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(port, path, deadline, latencies, errors))
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    return len(latencies) / duration, statistics.median(latencies) if latencies else 0, p99, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=10_000)
+    parser.add_argument('--path', default='/api/records?limit=100')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--threads', type=int, default=None, help='waitress のワーカースレッド数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        seed(db_path, args.records)
+
+        print(f"path: {args.path}")
+        print(f"{'server':>9} {'clients':>8} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+        for mode in SERVER_MODES:
+            server = create_server(app, port=0, mode=mode, threads=args.threads)
+            thread = threading.Thread(target=server.run, daemon=True)
+            thread.start()
+            try:
+                # ウォームアップ（メタデータキャッシュの読み込みなど）
+                run_load(server.port, args.path, 1, 0.5)
+                for clients in args.clients:
+                    rps, p50, p99, errors = run_load(server.port, args.path, clients, args.duration)
+                    print(f"{mode:>9} {clients:>8} {rps:>9.1f} {p50:>9.2f} {p99:>9.2f} {errors:>7}")
+            finally:
+                server.close()
+                thread.join(timeout=5)
+
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+SQLite の PRAGMA プロファイルごとに POST /api/records の書き込みスループットを計測するベンチマーク。
+
+    python tools/bench_sqlite_profiles.py --records 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, 'migrations')
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.db_tuning import SQLITE_PROFILES  # noqa: E402
+
+
+def run(profile, num_records):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+            'SQLITE_PROFILE': profile,
+        })
+        client = app.test_client()
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+        group_id = client.post('/api/activity_groups', json={'name': 'bench'}).get_json()['id']
+        activity_id = client.post('/api/activities', json={
+            'name': 'bench', 'group_id': group_id, 'unit': 'minutes'
+        }).get_json()['id']
+
+        start = time.perf_counter()
+        for i in range(num_records):
+            response = client.post('/api/records', json={
+                'activity_id': activity_id,
+                'value': 30,
+                'created_at': f"2025-01-01T00:{i % 60:02d}:00",
+            })
+            assert response.status_code == 201, response.get_json()
+        elapsed = time.perf_counter() - start
+        with app.app_context():
+            db.engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':>10} {'total (s)':>10} {'records/s':>10} {'ms/record':>10}")
+    for profile in args.profiles:
+        elapsed = run(profile, args.records)
+        print(f"{profile:>10} {elapsed:>10.2f} {args.records / elapsed:>10.0f} {elapsed * 1000 / args.records:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
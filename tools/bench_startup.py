@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+コールドスタート時間（プロセス起動から create_app とマイグレーション適用が終わるまで）を計測する。
+
+DB がすでに head の状態で、毎回 Alembic を実行する場合（always）と
+焼き込まれた head と比較してスキップする場合（fast）を、それぞれ新しいプロセスで比べる。
+
+    python tools/bench_startup.py --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, 'migrations')
+
+CHILD_SCRIPT = """
+import sys
+sys.path.insert(0, {backend_dir!r})
+from app import create_app
+from app.schema import apply_migrations
+app = create_app({{'SQLALCHEMY_DATABASE_URI': {db_uri!r}, 'LAZY_MIGRATE': True}})
+ran = apply_migrations(app, {migrations_dir!r}, force={force!r})
+print(int(ran), int('alembic' in sys.modules))
+"""
+
+
+def run_child(db_uri, force):
+    script = CHILD_SCRIPT.format(
+        backend_dir=BACKEND_DIR, db_uri=db_uri, migrations_dir=MIGRATIONS_DIR, force=force
+    )
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', script], check=True, capture_output=True, text=True
+    ).stdout.split()
+    elapsed = (time.perf_counter() - start) * 1000
+    ran, alembic_loaded = (bool(int(value)) for value in output[-2:])
+    return elapsed, ran, alembic_loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_uri = 'sqlite:///' + os.path.join(tmp_dir, 'bench.db')
+        # 1回目で head まで適用しておく
+        run_child(db_uri, force=True)
+
+        print(f"{'mode':>7} {'median (ms)':>12} {'min (ms)':>9} {'alembic run':>12} {'alembic imported':>17}")
+        for mode, force in (('always', True), ('fast', False)):
+            results = [run_child(db_uri, force) for _ in range(args.repeat)]
+            timings = [elapsed for elapsed, _, _ in results]
+            _, ran, alembic_loaded = results[-1]
+            print(f"{mode:>7} {statistics.median(timings):>12.1f} {min(timings):>9.1f} "
+                  f"{str(ran):>12} {str(alembic_loaded):>17}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Discord クライアントの代わりに IPC（Unix ソケット）で応答するフェイクサーバー。
+
+pypresence が使うハンドシェイク（op 0）と SET_ACTIVITY（op 1）、CLOSE（op 2）、PING（op 3）に応答する。
+応答の遅延と、ハンドシェイク失敗・接続切断・エラー応答の注入ができる。
+受け取った SET_ACTIVITY は activities に (時刻, client_id, activity) として記録する。
+
+単体で起動する場合（pypresence は XDG_RUNTIME_DIR 以下の discord-ipc-N を探す）:
+
+    XDG_RUNTIME_DIR=/tmp/fake-discord python tools/fake_discord_ipc.py --response-delay 0.05
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+OP_HANDSHAKE = 0
+OP_FRAME = 1
+OP_CLOSE = 2
+OP_PING = 3
+OP_PONG = 4
+
+
+class FakeDiscordIPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, path, handshake_delay=0.0, response_delay=0.0,
+                 handshake_failure_rate=0.0, drop_rate=0.0, error_rate=0.0, seed=0):
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.handshake_delay = handshake_delay
+        self.response_delay = response_delay
+        self.handshake_failure_rate = handshake_failure_rate
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.handshakes = 0
+        self.activities = []
+        self.connections = set()
+        super().__init__(path, _Handler)
+
+    def roll(self, rate):
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def record_activity(self, client_id, activity):
+        with self.condition:
+            self.activities.append((time.perf_counter(), client_id, activity))
+            self.condition.notify_all()
+
+    def wait_for_activity(self, predicate, timeout=10.0, since=None):
+        """
+        predicate(client_id, activity) を満たす SET_ACTIVITY を受け取るまで待ち、その時刻を返す。
+        since を指定すると activities のその位置以降（呼び出し前に届いたものも含む）から探す。
+        """
+        deadline = time.perf_counter() + timeout
+        with self.condition:
+            start = len(self.activities) if since is None else since
+            while True:
+                for received_at, client_id, activity in self.activities[start:]:
+                    if predicate(client_id, activity):
+                        return received_at
+                start = len(self.activities)
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def disconnect_all(self):
+        """接続中のクライアントをすべて切断する（Discord の再起動を模擬する）。"""
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        self.disconnect_all()
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def setup(self):
+        with self.server.lock:
+            self.server.connections.add(self.request)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.connections.discard(self.request)
+
+    def _read_frame(self):
+        header = self._read_exact(8)
+        if header is None:
+            return None, None
+        op, length = struct.unpack('<II', header)
+        body = self._read_exact(length)
+        if body is None:
+            return None, None
+        return op, json.loads(body.decode('utf-8'))
+
+    def _read_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _send(self, op, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.request.sendall(struct.pack('<II', op, len(body)) + body)
+
+    def handle(self):
+        try:
+            self._serve()
+        except OSError:
+            # クライアントが先に切断した（BrokenPipe など）
+            pass
+
+    def _serve(self):
+        server = self.server
+        client_id = None
+        while True:
+            try:
+                op, payload = self._read_frame()
+            except (OSError, ValueError):
+                return
+            if op is None:
+                # pypresence の test_ipc_path は接続だけして閉じる
+                return
+
+            if op == OP_HANDSHAKE:
+                time.sleep(server.handshake_delay)
+                if server.roll(server.handshake_failure_rate):
+                    return
+                client_id = payload.get('client_id')
+                with server.lock:
+                    server.handshakes += 1
+                self._send(OP_FRAME, {
+                    'cmd': 'DISPATCH',
+                    'evt': 'READY',
+                    'nonce': None,
+                    'data': {
+                        'v': 1,
+                        'config': {'cdn_host': 'cdn.discordapp.com', 'api_endpoint': '//discord.com/api'},
+                        'user': {'id': '0', 'username': 'fake', 'discriminator': '0'},
+                    },
+                })
+            elif op == OP_FRAME:
+                time.sleep(server.response_delay)
+                if server.roll(server.drop_rate):
+                    return
+                nonce = payload.get('nonce')
+                if server.roll(server.error_rate):
+                    self._send(OP_FRAME, {
+                        'cmd': payload.get('cmd'),
+                        'evt': 'ERROR',
+                        'nonce': nonce,
+                        'data': {'code': 4000, 'message': 'Injected error'},
+                    })
+                    continue
+                activity = payload.get('args', {}).get('activity')
+                if payload.get('cmd') == 'SET_ACTIVITY':
+                    server.record_activity(client_id, activity)
+                self._send(OP_FRAME, {'cmd': payload.get('cmd'), 'evt': None, 'nonce': nonce, 'data': activity})
+            elif op == OP_PING:
+                self._send(OP_PONG, payload)
+            elif op == OP_CLOSE:
+                return
+
+
+def ipc_path(runtime_dir, pipe=0):
+    return os.path.join(runtime_dir, f'discord-ipc-{pipe}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runtime-dir', default=os.environ.get('XDG_RUNTIME_DIR'))
+    parser.add_argument('--handshake-delay', type=float, default=0.0)
+    parser.add_argument('--response-delay', type=float, default=0.0)
+    parser.add_argument('--handshake-failure-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    if not args.runtime_dir:
+        parser.error('--runtime-dir or XDG_RUNTIME_DIR is required')
+
+    os.makedirs(args.runtime_dir, exist_ok=True)
+    server = FakeDiscordIPCServer(
+        ipc_path(args.runtime_dir),
+        handshake_delay=args.handshake_delay,
+        response_delay=args.response_delay,
+        handshake_failure_rate=args.handshake_failure_rate,
+        drop_rate=args.drop_rate,
+        error_rate=args.error_rate,
+    )
+    print(f"Fake Discord IPC listening on {server.path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+フロントエンドのビルド成果物（frontend/dist）の各ファイルについて、
+.gz（と brotli モジュールがあれば .br）の事前圧縮版を作成する。
+
+バックエンドはクライアントの Accept-Encoding に応じてこれらを返す（backend/app/compression.py）。
+
+    python tools/precompress_static.py [frontend/dist]
+"""
+import argparse
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DIST_DIR = os.path.join(ROOT_DIR, 'frontend', 'dist')
+COMPRESSIBLE_EXTENSIONS = ('.js', '.mjs', '.css', '.html', '.svg', '.json', '.txt', '.map', '.wasm')
+MIN_SIZE = 1024
+
+
+def _write_if_smaller(path, data, original_size):
+    # 圧縮しても小さくならないファイルは置かない（古いものがあれば消す）
+    if len(data) >= original_size:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def precompress(dist_dir):
+    written = 0
+    for dir_path, _, filenames in os.walk(dist_dir):
+        for filename in filenames:
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(dir_path, filename)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < MIN_SIZE:
+                continue
+            written += _write_if_smaller(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0), len(data))
+            if brotli is not None:
+                written += _write_if_smaller(path + '.br', brotli.compress(data, quality=11), len(data))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dist_dir', nargs='?', default=DEFAULT_DIST_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dist_dir):
+        sys.exit(f"{args.dist_dir} does not exist; run the frontend build first")
+    written = precompress(args.dist_dir)
+    if brotli is None:
+        print("brotli module not found; only .gz files were generated")
+    print(f"Wrote {written} precompressed files to {args.dist_dir}")
+
+
+if __name__ == '__main__':
+    main()